@@ -1,6 +1,13 @@
+import os
+import sys
+
 import cv2
 import numpy as np
 
+# Shared detection modules of Particle-Tracking-Velocimetry
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Particle-Tracking-Velocimetry"))
+import deteccion_hough
+
 def detect_lines_and_properties(
     path_imagen,
     roi_points=None,
@@ -8,7 +15,8 @@ def detect_lines_and_properties(
     canny_threshold2=150,
     hough_threshold=20,
     min_line_length=50,
-    max_line_gap=5
+    max_line_gap=5,
+    niveles_piramide=0
 ):
     """
     Detecta líneas en la imagen dada (usando Canny + HoughLinesP) y retorna:
@@ -17,6 +25,7 @@ def detect_lines_and_properties(
         - lengths: Lista de longitudes de cada línea.
         - scores: Lista de "confianzas" (None, pues HoughLinesP no la provee).
         - boxes: Lista de "cajas" [x1, y1, x2, y2] para cada línea detectada.
+    Con 'niveles_piramide' > 0 se usa deteccion_hough.detectar_piramide().
     """
 
     # 1) Cargar la imagen
@@ -36,6 +45,22 @@ def detect_lines_and_properties(
     else:
         gris_roi = gris
 
+    # 3.1) Modo piramidal: HoughLinesP sobre la imagen reducida y refinamiento a resolución completa
+    if niveles_piramide > 0:
+        centroids, angles, lengths, boxes = deteccion_hough.detectar_piramide(
+            gris_roi,
+            parametros=dict(
+                canny_threshold1=canny_threshold1,
+                canny_threshold2=canny_threshold2,
+                hough_threshold=hough_threshold,
+                min_line_length=min_line_length,
+                max_line_gap=max_line_gap
+            ),
+            niveles=niveles_piramide
+        )
+        centroids = [tuple(c) for c in centroids.tolist()]
+        return centroids, angles.tolist(), lengths.tolist(), [None] * len(centroids), boxes.tolist(), imagen
+
     # 4) Detectar bordes con Canny
     bordes = cv2.Canny(gris_roi, canny_threshold1, canny_threshold2, apertureSize=3)
 
@@ -115,6 +140,9 @@ if __name__ == "__main__":
         [20, 970]
     ], dtype=np.int32)
 
+    # Niveles de la pirámide (0 = HoughLinesP a resolución completa)
+    niveles_piramide = 0
+
     # Ruta de la imagen
     path_imagen = 'Particle-Tracking-Velocimetry/Dataset/25 Fibras/Cam 1/Basler_acA1440-220uc__40343408__20250123_154326693_0063.bmp'
 
@@ -126,7 +154,8 @@ if __name__ == "__main__":
         canny_threshold2=250,
         hough_threshold=40,
         min_line_length=30,
-        max_line_gap=5
+        max_line_gap=5,
+        niveles_piramide=niveles_piramide
     )
 
     # Si la imagen no se pudo cargar, detenemos
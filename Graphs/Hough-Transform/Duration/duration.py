@@ -1,8 +1,12 @@
 import json
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import metricas_tracking
+
 # Lista de concentraciones de fibra a comparar
 concentraciones = ["25", "50", "100", "200", "400", "800"]
 
@@ -20,17 +24,7 @@ def get_track_lengths(json_file):
     with open(json_file, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    track_lengths = []
-    for fiber_id, fiber_data in data.items():
-        # Omite llaves especiales
-        if fiber_id in ("ruta", "fibras_por_frame"):
-            continue
-
-        frames_info = fiber_data.get("frame", [])
-        track_length = len(frames_info)
-        track_lengths.append(track_length)
-
-    return np.array(track_lengths)
+    return metricas_tracking.tabla_tracks(data)["largo"]
 
 def main():
     plt.figure(figsize=(8, 5))
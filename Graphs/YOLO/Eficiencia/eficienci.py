@@ -1,6 +1,10 @@
 import json
 import matplotlib.pyplot as plt
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import metricas_tracking
 
 # Lista de concentraciones a comparar
 concentraciones = ["25", "50", "100", "200", "400", "800"]
@@ -15,31 +19,11 @@ def compute_fibers_tracked_by_frame(datos):
       - fibras_acumuladas_eje_y[i] = cuántas fibras han aparecido
         en frame <= frames_eje_x[i].
     """
-    fibra_min_frame = {}
-    max_frame_global = 0
-
-    for key, value in datos.items():
-        if key in ("ruta", "fibras_por_frame"):
-            continue
-
-        lista_frames = value.get("frame", [])
-        if not lista_frames:
-            continue
-
-        frames_planos = [f[0] for f in lista_frames]
-        min_fr = min(frames_planos)
-        fibra_min_frame[key] = min_fr
-        max_frame_global = max(max_frame_global, max(frames_planos))
-
-    frames_eje_x = []
-    fibras_acumuladas_eje_y = []
-
-    for f in range(1, max_frame_global + 1):
-        count = sum(1 for fr in fibra_min_frame.values() if fr <= f)
-        frames_eje_x.append(f)
-        fibras_acumuladas_eje_y.append(count)
-
-    return frames_eje_x, fibras_acumuladas_eje_y
+    # Curva de primera aparición con bincount + cumsum (Graphs/metricas_tracking.py)
+    frames_eje_x, fibras_acumuladas_eje_y = metricas_tracking.curva_primera_aparicion(
+        metricas_tracking.tabla_tracks(datos)
+    )
+    return frames_eje_x.tolist(), fibras_acumuladas_eje_y.tolist()
 
 def get_normalized_track_curve(concentracion):
     """
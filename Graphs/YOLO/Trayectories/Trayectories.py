@@ -1,65 +1,39 @@
-import json
 import os
-import numpy as np
-import matplotlib.pyplot as plt
+import sys
+
+# Capa de gráficas compartida (Graphs/figuras.py): backend Agg, una LineCollection por corrida
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import figuras
 
 # Lista de concentraciones a procesar
 concentraciones = ["25", "50", "100", "200", "400", "800"]
 
 # Directorio base (ajusta según tu estructura)
-base_dir = "Particle-Tracking-Velocimetry\\YOLO"
-
-def plot_trajectories_for_concentration(concentracion):
-    """
-    Carga el archivo JSON filtrado correspondiente a 'concentracion'
-    y genera un gráfico con todas sus trayectorias, guardándolo en un .png.
-    """
-    # Construimos la ruta del archivo para la concentración dada
-    archivo_fibras_filtrado = os.path.join(base_dir, f"fibras_{concentracion}_filtrado.json")
-
-    # Carga de datos
-    with open(archivo_fibras_filtrado, "r", encoding="utf-8") as f:
-        data = json.load(f)
-
-    # Configuramos la figura
-    plt.figure(figsize=(8, 8))
-    plt.xlim(0, 1024)
-    plt.ylim(1024, 0)  # Invertimos el eje Y
+base_dir = os.path.join("Particle-Tracking-Velocimetry", "YOLO")
 
-    # Recorremos todas las fibras (excepto metadatos) y graficamos
-    for fiber_id, fiber_data in data.items():
-        if fiber_id in ("ruta", "fibras_por_frame"):
-            continue
+# Carpeta de salida de las imágenes
+carpeta_salida = "Graphs/YOLO/Trayectories/Graphs"
 
-        centroids = fiber_data.get("centroide", [])
-        if not centroids:
-            continue
+procesos = None  # Procesos en paralelo (None = todas las CPUs)
 
-        centroids = np.array(centroids)
-        x_coords = centroids[:, 0]
-        y_coords = centroids[:, 1]
-
-        # Dibuja la trayectoria como una línea
-        plt.plot(x_coords, y_coords, linewidth=1, alpha=0.6)
-
-    # Etiquetas y títulos
-    plt.title(f"Trayectorias Trackeadas (fibras_{concentracion})")
-    plt.xlabel("X (píxeles)")
-    plt.ylabel("Y (píxeles)")
-    plt.grid(True)
-
-    plt.tight_layout()
-    
-    # Guardamos la figura con un nombre que incluya la concentración
-    nombre_salida = f"Graphs/YOLO/Trayectories/Graphs/trayectorias_{concentracion}.png"
-    plt.savefig(nombre_salida, dpi=300)
-    plt.close()  # Cerramos la figura para liberar memoria
+def tarea_trayectorias(concentracion):
+    """
+    Tarea de figuras.renderizar() que carga el JSON filtrado de 'concentracion' y
+    guarda todas sus trayectorias en un .png.
+    """
+    return figuras.trayectorias, {
+        "ruta_json": os.path.join(base_dir, f"fibras_{concentracion}_filtrado.json"),
+        "ruta_salida": os.path.join(carpeta_salida, f"trayectorias_{concentracion}.png"),
+        "titulo": f"Trayectorias Trackeadas (fibras_{concentracion})",
+    }
 
 def main():
-    # Iteramos sobre la lista de concentraciones y generamos un gráfico por cada una
-    for conc in concentraciones:
-        print(f"Generando gráfico de trayectorias para concentración: {conc}")
-        plot_trajectories_for_concentration(conc)
+    # Un gráfico por concentración, generados en paralelo
+    print(f"Generando gráficos de trayectorias para concentraciones: {', '.join(concentraciones)}")
+    resultado = figuras.renderizar([tarea_trayectorias(conc) for conc in concentraciones], procesos)
+    for ruta, segundos in resultado["figuras"]:
+        print(f"    {ruta} ({segundos:.2f} s)")
+    print(f"Tiempo total de generación: {resultado['segundos']:.2f} s")
 
 if __name__ == "__main__":
     main()
@@ -1,6 +1,13 @@
 import json
+import os
+import sys
+
 import numpy as np
 
+# Suavizado por lotes sobre todas las fibras (Particle-Tracking-Velocimetry/suavizado.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "..", "Particle-Tracking-Velocimetry"))
+import suavizado
+
 # =============================================================================
 # 1) PARÁMETROS INICIALES
 # =============================================================================
@@ -12,46 +19,56 @@ dt = 1.0 / fps
 # Tamaño de la ventana de suavizado por convolución
 window_size = 5
 
+# "media_movil": diferencias entre frames suavizadas con media móvil (la ventana se
+# reduce en los extremos de cada fibra en lugar de rellenar con ceros).
+# "savgol": derivada de Savitzky-Golay de las posiciones (una velocidad por frame).
+metodo = "media_movil"
+orden_savgol = 2
+
 # =============================================================================
 # 2) FUNCIONES AUXILIARES
 # =============================================================================
 
-def smooth_signal(signal, window_size=5):
+def apilar(data, clave, columnas):
     """
-    Suaviza una señal usando un filtro de media móvil.
-    
+    Junta la clave dada de todas las fibras en un único buffer.
+
     Args:
-        signal (np.ndarray): Señal de entrada a suavizar.
-        window_size (int): Tamaño de la ventana de la media móvil.
-        
+        data (dict): JSON de fibras.
+        clave (str): "centroide" o "angulo".
+        columnas (int): Valores por muestra (2 para centroides, 1 para ángulos).
+
     Returns:
-        np.ndarray: Señal suavizada.
+        tuple: IDs de las fibras, valores (N, columnas) y offsets (K + 1,) de cada fibra.
     """
-    # Si la señal es muy corta, se retorna tal cual para evitar errores
-    if len(signal) < 2:
-        return signal
-
-    window = np.ones(int(window_size)) / float(window_size)
-    return np.convolve(signal, window, mode="same")
+    ids, bloques = [], []
+    for fiber_id, fiber_data in data.items():
+        # Omitimos claves que no son fibras
+        if fiber_id in ["ruta", "fibras_por_frame"] or clave not in fiber_data:
+            continue
+        ids.append(fiber_id)
+        # Los ángulos pueden venir como [[angulo1], [angulo2], ...] o como lista plana
+        bloques.append(np.asarray(fiber_data[clave], dtype=float).reshape(-1, columnas))
+    valores = np.concatenate(bloques) if bloques else np.zeros((0, columnas))
+    return ids, valores, suavizado.offsets_desde_largos([len(b) for b in bloques])
 
-def angular_difference(angle1, angle2):
+def velocidades(valores, offsets, angular=False):
     """
-    Calcula la diferencia angular más pequeña entre angle1 y angle2,
-    resultando en un valor en el rango [-180, 180].
-    
-    Args:
-        angle1 (float): Primer ángulo en grados.
-        angle2 (float): Segundo ángulo en grados.
-        
+    Velocidad suavizada de todas las fibras a la vez según `metodo`.
+
     Returns:
-        float: Diferencia angular en grados.
+        tuple: Velocidades (M, columnas) y sus offsets por fibra.
     """
-    diff = angle1 - angle2
-    while diff > 180:
-        diff -= 360
-    while diff <= -180:
-        diff += 360
-    return diff
+    if metodo == "savgol":
+        if angular:
+            valores = suavizado.desenrollar(valores, offsets)
+        return suavizado.savgol(valores, offsets, window_size, orden_savgol, derivada=1, dt=dt), offsets
+
+    diferencias, offsets = suavizado.diferencias(valores, offsets)
+    if angular:
+        # Diferencia angular más pequeña, en el rango (-180, 180]
+        diferencias = suavizado.diferencia_angular(diferencias, 0.0)
+    return suavizado.media_movil(diferencias / dt, offsets, window_size, borde="reducir"), offsets
 
 # =============================================================================
 # 3) FUNCIÓN PRINCIPAL: PROCESAMIENTO Y GUARDADO
@@ -59,8 +76,8 @@ def angular_difference(angle1, angle2):
 
 def convolutionated(fibras):
     """
-    Lee un JSON de fibras, calcula y suaviza (por convolución) 
-    tanto la velocidad lineal como la velocidad angular de cada fibra,
+    Lee un JSON de fibras, calcula y suaviza (por convolución o Savitzky-Golay)
+    tanto la velocidad lineal como la velocidad angular de todas las fibras,
     y finalmente guarda un nuevo JSON con esos valores.
     """
 
@@ -76,67 +93,26 @@ def convolutionated(fibras):
     # ----------------------------------------------------------------------------
     # 3.2) PROCESAMIENTO DE CADA FIBRA: VELOCIDAD LINEAL Y ANGULAR
     # ----------------------------------------------------------------------------
-    for fiber_id, fiber_data in data.items():
-        # Omitimos claves que no son fibras
-        if fiber_id in ["ruta", "fibras_por_frame"]:
-            continue
-        
-        # -------------------------
-        # Velocidad lineal
-        # -------------------------
-        if "centroide" in fiber_data:
-            centroids = np.array(fiber_data["centroide"])  # cada elemento es [x, y]
-            if centroids.shape[0] > 1:
-                x = centroids[:, 0]
-                y = centroids[:, 1]
-                
-                # Diferencias entre frames consecutivos
-                dx = np.diff(x)
-                dy = np.diff(y)
-                
-                # Velocidades
-                vx = dx / dt
-                vy = dy / dt
-                
-                # Suavizado
-                vx_smooth = smooth_signal(vx, window_size)
-                vy_smooth = smooth_signal(vy, window_size)
-                
-                # Guardamos en el JSON como listas
-                fiber_data["velocidad_x_convolucionada"] = vx_smooth.tolist()
-                fiber_data["velocidad_y_convolucionada"] = vy_smooth.tolist()
-            else:
-                # Si no hay suficiente longitud para calcular diffs
-                fiber_data["velocidad_x_convolucionada"] = []
-                fiber_data["velocidad_y_convolucionada"] = []
-        
-        # -------------------------
-        # Velocidad angular
-        # -------------------------
-        if "angulo" in fiber_data:
-            # Asumiendo que "angulo" es lista de listas: [ [angulo1], [angulo2], ... ]
-            angles_raw = fiber_data["angulo"]
-            if angles_raw and isinstance(angles_raw[0], list):
-                # Extraemos solo el primer valor de cada sublista como ángulo
-                angles = np.array([item[0] for item in angles_raw])
-            else:
-                # O si "angulo" es simplemente una lista de valores
-                angles = np.array(angles_raw)
-            
-            if len(angles) > 1:
-                angular_velocities = [
-                    angular_difference(angles[i + 1], angles[i]) / dt
-                    for i in range(len(angles) - 1)
-                ]
-                angular_velocities = np.array(angular_velocities)
-                
-                # Suavizado
-                angular_velocities_smooth = smooth_signal(angular_velocities, window_size)
-                
-                # Guardamos en el JSON
-                fiber_data["velocidad_angular_convolucionada"] = angular_velocities_smooth.tolist()
-            else:
-                fiber_data["velocidad_angular_convolucionada"] = []
+    # Todas las fibras se procesan juntas en un único buffer; las fibras de un solo
+    # frame quedan con listas vacías
+    # -------------------------
+    # Velocidad lineal
+    # -------------------------
+    ids, centroids, offsets = apilar(data, "centroide", 2)
+    v, offsets_v = velocidades(centroids, offsets)
+    for k, fiber_id in enumerate(ids):
+        a, b = offsets_v[k], offsets_v[k + 1] if offsets[k + 1] - offsets[k] > 1 else offsets_v[k]
+        data[fiber_id]["velocidad_x_convolucionada"] = v[a:b, 0].tolist()
+        data[fiber_id]["velocidad_y_convolucionada"] = v[a:b, 1].tolist()
+
+    # -------------------------
+    # Velocidad angular
+    # -------------------------
+    ids, angles, offsets = apilar(data, "angulo", 1)
+    omega, offsets_omega = velocidades(angles, offsets, angular=True)
+    for k, fiber_id in enumerate(ids):
+        a, b = offsets_omega[k], offsets_omega[k + 1] if offsets[k + 1] - offsets[k] > 1 else offsets_omega[k]
+        data[fiber_id]["velocidad_angular_convolucionada"] = omega[a:b, 0].tolist()
     
     # ----------------------------------------------------------------------------
     # 3.3) GUARDADO DE RESULTADOS
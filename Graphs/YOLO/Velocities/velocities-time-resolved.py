@@ -0,0 +1,66 @@
+import json
+import os
+import sys
+
+import numpy as np
+
+# Módulos compartidos por las gráficas (Graphs/campo_temporal.py)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+import campo_temporal
+
+# Lista de concentraciones sobre las que iterar
+concentracion_fibras_list = ["25", "50", "100", "200", "400", "800"]
+
+# Grilla y extensión de la imagen, iguales a las de velocities-heatmap.py
+GRID_SIZE = (100, 100)
+EXTENT = [0, 1024, 0, 1024]
+
+# Ventana deslizante (frames) y avance entre ventanas consecutivas
+VENTANA_FRAMES = 200
+PASO_FRAMES = 20
+
+# Canal del campo -> clave del JSON convolucionado
+CANALES = {
+    "vx": "velocidad_x_convolucionada",
+    "vy": "velocidad_y_convolucionada",
+    "omega": "velocidad_angular_convolucionada",
+}
+
+carpeta_salida = "Graphs/YOLO/Velocities/Fields"
+
+def campos_concentracion(concentracion_fibras):
+    """
+    Calcula los campos promedio (vx, vy, omega) por ventana deslizante para la
+    concentración dada y los guarda como fields_<concentración>.npy (T, Gx, Gy, C).
+    """
+    # ----------------------------------------------------------------------------
+    # 1) Carga de datos
+    # ----------------------------------------------------------------------------
+    json_file = f"Graphs/YOLO/Velocities/fibers_{concentracion_fibras}_convolutionated.json"
+    with open(json_file, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # ----------------------------------------------------------------------------
+    # 2) Campos por ventana (actualización incremental)
+    # ----------------------------------------------------------------------------
+    muestras = {canal: campo_temporal.extraer_muestras(data, clave) for canal, clave in CANALES.items()}
+    ruta = os.path.join(carpeta_salida, f"fields_{concentracion_fibras}.npy")
+    campos, inicios = campo_temporal.campos_por_ventana(
+        muestras, GRID_SIZE, VENTANA_FRAMES, PASO_FRAMES, EXTENT, ruta=ruta
+    )
+
+    # ----------------------------------------------------------------------------
+    # 3) Resumen: rapidez media y celdas con datos por ventana
+    # ----------------------------------------------------------------------------
+    rapidez = np.hypot(campos[..., 0], campos[..., 1])
+    with np.errstate(all="ignore"):
+        rapidez_media = np.nanmean(rapidez.reshape(len(inicios), -1), axis=1)
+    cobertura = np.isfinite(rapidez).reshape(len(inicios), -1).mean(axis=1)
+    print(f"{len(inicios)} ventanas de {VENTANA_FRAMES} frames guardadas en {ruta}")
+    for inicio, v, c in list(zip(inicios, rapidez_media, cobertura))[:: max(len(inicios) // 10, 1)]:
+        print(f"    frames {inicio:>6}-{inicio + VENTANA_FRAMES - 1:<6} rapidez media {v:9.2f} px/s, celdas con datos {c:6.1%}")
+
+if __name__ == "__main__":
+    for fibras in concentracion_fibras_list:
+        print(f"\n=== Procesando concentración de fibras: {fibras} ===\n")
+        campos_concentracion(fibras)
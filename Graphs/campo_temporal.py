@@ -0,0 +1,147 @@
+# === TIME-RESOLVED VELOCITY FIELDS ===
+#
+# Mean velocity fields over a sliding window of frames instead of the whole recording.
+# The per-cell count and sum of every channel are kept as running totals: when the
+# window advances, the samples of the frames that enter are added and those of the
+# frames that leave are subtracted, so every sample is touched twice however long the
+# window is. The fields are written as one (T, Gx, Gy, C) float32 array (NaN on empty
+# cells) that can be memory-mapped back for animations and statistics, plus a small JSON
+# file with its axes.
+
+import json
+import os
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+import grilla
+
+CLAVES_OMITIDAS = ["ruta", "fibras_por_frame"]
+
+
+def extraer_muestras(data, clave):
+    """
+    Frame, centroid and value of every sample of one key (e.g.
+    "velocidad_x_convolucionada") over all the fibers of a tracking JSON.
+
+    The i-th value of a fiber is assigned to its i-th frame and centroid.
+
+    Returns:
+        tuple: Arrays frames, x, y and valores of the same length.
+    """
+    columnas = [[], [], [], []]
+    for fiber_id, fiber_data in data.items():
+        if fiber_id in CLAVES_OMITIDAS:
+            continue
+        frames = np.asarray(fiber_data.get("frame", []), dtype=np.int64).reshape(-1)
+        centroids = np.asarray(fiber_data.get("centroide", []), dtype=float).reshape(-1, 2)
+        valores = np.asarray(fiber_data.get(clave, []), dtype=float).reshape(-1)
+        n = min(len(frames), len(centroids), len(valores))
+        if n == 0:
+            continue
+        for columna, serie in zip(columnas, [frames[:n], centroids[:n, 0], centroids[:n, 1], valores[:n]]):
+            columna.append(serie)
+    return tuple(np.concatenate(c) if c else np.zeros(0) for c in columnas)
+
+
+def _por_frame(frames, x, y, valores, forma, extension):
+    # Samples inside the grid sorted by frame, with their flat cell index
+    celda = grilla.indices_celda(x, y, forma, extension)
+    dentro = celda >= 0
+    orden = np.argsort(frames[dentro], kind="stable")
+    return frames[dentro][orden], celda[dentro][orden], np.asarray(valores, dtype=float)[dentro][orden]
+
+
+def ventanas(primer_frame, ultimo_frame, ventana, paso=1):
+    """
+    First frame of every window [inicio, inicio + ventana) that fits in the recording
+    (at least one window, even if the recording is shorter).
+    """
+    return np.arange(primer_frame, max(ultimo_frame - ventana + 1, primer_frame) + 1, paso)
+
+
+def campos_por_ventana(muestras, forma, ventana, paso=1, extension=grilla.EXTENSION, conteo_minimo=1, ruta=None):
+    """
+    Mean of every channel per cell over sliding windows of frames, updated incrementally.
+
+    Args:
+        muestras (dict): Channel name -> (frames, x, y, valores) arrays, as returned by
+            extraer_muestras. Channels may come from different sample sets.
+        forma (tuple): Grid size (gx, gy).
+        ventana (int): Frames per window.
+        paso (int): Frames the window advances each step.
+        extension (tuple): Grid extent [x0, x1, y0, y1].
+        conteo_minimo (int): Cells with fewer samples of a channel are NaN for it.
+        ruta (str): Optional .npy path; the fields are written there through a memory
+            map (with its axes in a .json next to it) instead of being held in memory.
+
+    Returns:
+        tuple:
+            campos (np.ndarray): (T, gx, gy, C) float32 means (NaN on empty cells).
+            inicios (np.ndarray): (T,) first frame of every window.
+    """
+    nombres = list(muestras)
+    canales = [_por_frame(*muestras[n], forma, extension) for n in nombres]
+    todos = np.concatenate([c[0] for c in canales]) if canales else np.zeros(0, dtype=np.int64)
+    inicios = ventanas(int(todos.min()), int(todos.max()), ventana, paso) if todos.size else np.zeros(0, dtype=np.int64)
+
+    dimensiones = (len(inicios), *forma, len(nombres))
+    if ruta is None:
+        campos = np.empty(dimensiones, dtype=np.float32)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+        campos = open_memmap(ruta, mode="w+", dtype=np.float32, shape=dimensiones)
+
+    n_celdas = forma[0] * forma[1]
+    conteos = np.zeros((len(nombres), n_celdas), dtype=np.int64)
+    sumas = np.zeros((len(nombres), n_celdas))
+    hasta = [0] * len(nombres)  # Samples of each channel already added
+    desde = [0] * len(nombres)  # Samples of each channel already subtracted
+    for t, inicio in enumerate(inicios):
+        for c, (frames, celda, valores) in enumerate(canales):
+            # Frames entering [.., inicio + ventana) and leaving [.., inicio)
+            fin = np.searchsorted(frames, inicio + ventana, side="left")
+            salida = np.searchsorted(frames, inicio, side="left")
+            if fin > hasta[c]:
+                entra = slice(hasta[c], fin)
+                conteos[c] += np.bincount(celda[entra], minlength=n_celdas)
+                sumas[c] += np.bincount(celda[entra], weights=valores[entra], minlength=n_celdas)
+                hasta[c] = fin
+            if salida > desde[c]:
+                sale = slice(desde[c], salida)
+                conteos[c] -= np.bincount(celda[sale], minlength=n_celdas)
+                sumas[c] -= np.bincount(celda[sale], weights=valores[sale], minlength=n_celdas)
+                desde[c] = salida
+            # Emptied cells restart from an exact zero (no rounding residue)
+            sumas[c][conteos[c] == 0] = 0.0
+
+        media = sumas / np.maximum(conteos, 1)
+        media[conteos < conteo_minimo] = np.nan
+        campos[t] = media.T.reshape(*forma, len(nombres))
+
+    if ruta is not None:
+        campos.flush()
+        ejes = {
+            "canales": nombres,
+            "inicios": inicios.tolist(),
+            "ventana": ventana,
+            "paso": paso,
+            "forma": list(forma),
+            "extension": list(extension),
+        }
+        with open(os.path.splitext(ruta)[0] + ".json", "w", encoding="utf-8") as f:
+            json.dump(ejes, f, indent=4)
+    return campos, inicios
+
+
+def cargar(ruta):
+    """
+    Fields written by campos_por_ventana, memory-mapped read-only, and their axes.
+
+    Returns:
+        tuple: (T, gx, gy, C) np.memmap and the dict of axes ("canales", "inicios",
+            "ventana", "paso", "forma", "extension").
+    """
+    with open(os.path.splitext(ruta)[0] + ".json", "r", encoding="utf-8") as f:
+        ejes = json.load(f)
+    return np.load(ruta, mmap_mode="r"), ejes
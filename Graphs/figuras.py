@@ -0,0 +1,198 @@
+# === FIGURE RENDERING ===
+#
+# Shared plotting layer of the graph scripts. Matplotlib is forced to the headless Agg
+# backend and every figure is closed as soon as it is saved (figura()), so looping
+# over concentrations does not accumulate open figures. All the trajectories of a run
+# are drawn as one LineCollection built from the flat TrackSet arrays (one artist
+# instead of one plt.plot line per fiber), and the velocity heatmaps come from the
+# binned (grilla.py) or kernel (campo_kernel.py) fields. Every figure is an
+# independent task (function, arguments), so renderizar() can spread the figures of
+# several concentrations, backends and quantities over worker processes.
+
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection
+from matplotlib.colors import TwoSlopeNorm
+
+import campo_kernel
+import grilla
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Particle-Tracking-Velocimetry"))
+import tracks
+
+# Heatmap quantity -> (JSON keys averaged together, key of the quantity, colorbar
+# label, title, output file prefix)
+CANTIDADES = {
+    "vx": (
+        ("velocidad_x_convolucionada", "velocidad_y_convolucionada"), "velocidad_x_convolucionada",
+        "Average Velocity in X (units/s)", "Average Velocity in X", "average_velocity_x",
+    ),
+    "vy": (
+        ("velocidad_x_convolucionada", "velocidad_y_convolucionada"), "velocidad_y_convolucionada",
+        "Average Velocity in Y (units/s)", "Average Velocity in Y", "average_velocity_y",
+    ),
+    "omega": (
+        ("velocidad_angular_convolucionada",), "velocidad_angular_convolucionada",
+        "Average Angular Velocity (degrees/s)", "Average Angular Velocity", "average_angular_velocity",
+    ),
+}
+
+
+# --------------------------------------------------------------------------------
+# 1) FIGURES
+# --------------------------------------------------------------------------------
+
+@contextmanager
+def figura(ruta, figsize=(8, 8), dpi="figure"):
+    """
+    Figure and axes that are saved to `ruta` (folders created) when the block ends
+    and always closed, also when the block raises.
+    """
+    fig, ax = plt.subplots(figsize=figsize)
+    try:
+        yield fig, ax
+        fig.tight_layout()
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        fig.savefig(ruta, dpi=dpi)
+    finally:
+        plt.close(fig)
+
+
+@lru_cache(maxsize=1)
+def _cargar(ruta):
+    # Tasks of the same JSON that land on the same worker parse it once
+    with open(ruta, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+# --------------------------------------------------------------------------------
+# 2) TRAJECTORIES
+# --------------------------------------------------------------------------------
+
+def coleccion_trayectorias(conjunto, linewidth=1, alpha=0.6):
+    """
+    One LineCollection with the centroid path of every track of a TrackSet, colored
+    with the property cycle as consecutive plt.plot calls would be.
+    """
+    conjunto = conjunto.filtrar(conjunto.largos() > 0)
+    segmentos = np.split(conjunto["centroide"], conjunto.offsets[1:-1])
+    ciclo = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+    colores = [ciclo[k % len(ciclo)] for k in range(len(segmentos))]
+    return LineCollection(segmentos, colors=colores, linewidths=linewidth, alpha=alpha)
+
+
+def trayectorias(ruta_json, ruta_salida, titulo, extension=grilla.EXTENSION, dpi=300):
+    """
+    Saves the trajectories of every fiber of a tracking JSON (Y axis inverted, as in
+    the image).
+
+    Returns:
+        str: ruta_salida.
+    """
+    conjunto = tracks.TrackSet.desde_json(_cargar(ruta_json), columnas=("centroide",))
+    x0, x1, y0, y1 = extension
+    with figura(ruta_salida, figsize=(8, 8), dpi=dpi) as (_, ax):
+        ax.add_collection(coleccion_trayectorias(conjunto))
+        ax.set_xlim(x0, x1)
+        ax.set_ylim(y1, y0)
+        ax.set_title(titulo)
+        ax.set_xlabel("X (píxeles)")
+        ax.set_ylabel("Y (píxeles)")
+        ax.grid(True)
+    return ruta_salida
+
+
+# --------------------------------------------------------------------------------
+# 3) VELOCITY HEATMAPS
+# --------------------------------------------------------------------------------
+
+def campo_promedio(x, y, canales, forma, extension=grilla.EXTENSION, ancho_kernel=None, adaptativo=False):
+    """
+    Mean field of every channel: per-cell averages, or the Gaussian-kernel estimate
+    when ancho_kernel is given. Cells without data are masked.
+    """
+    if ancho_kernel is None:
+        return grilla.medias(grilla.acumular(x, y, canales, forma, extension))
+    return campo_kernel.interpolar(x, y, canales, forma, extension, ancho=ancho_kernel, adaptativo=adaptativo)["campo"]
+
+
+def mapa_calor(campo, ruta_salida, etiqueta, titulo, extension=grilla.EXTENSION, dpi="figure"):
+    """
+    Saves a masked (gx, gy) field with a diverging colormap centered on 0.
+    """
+    norm = TwoSlopeNorm(vmin=np.min(campo), vcenter=0, vmax=np.max(campo))
+    with figura(ruta_salida, figsize=(10, 8), dpi=dpi) as (fig, ax):
+        imagen = ax.imshow(campo.T, origin="upper", extent=extension, aspect="auto", cmap="coolwarm", norm=norm)
+        fig.colorbar(imagen, ax=ax, label=etiqueta)
+        ax.set_title(titulo)
+        ax.set_xlabel("Centroid X Position")
+        ax.set_ylabel("Centroid Y Position")
+        ax.grid(False)
+    return ruta_salida
+
+
+def velocidad(ruta_json, cantidad, carpeta_salida, concentracion, forma, extension=grilla.EXTENSION,
+              ancho_kernel=None, adaptativo=False):
+    """
+    Saves the average heatmap of one quantity of CANTIDADES ("vx", "vy" or "omega")
+    of a convolutionated velocities JSON as <prefix>_<concentracion>.png.
+
+    Returns:
+        str: Path of the figure.
+    """
+    claves, clave, etiqueta, titulo, prefijo = CANTIDADES[cantidad]
+    # Every fiber is cut to the common length of its centroids and velocities
+    conjunto = tracks.TrackSet.desde_json(_cargar(ruta_json), columnas=("centroide",) + claves)
+    x, y = conjunto["centroide"][:, 0], conjunto["centroide"][:, 1]
+    campo = campo_promedio(x, y, {c: conjunto[c] for c in claves}, forma, extension, ancho_kernel, adaptativo)[clave]
+    return mapa_calor(
+        campo,
+        os.path.join(carpeta_salida, f"{prefijo}_{concentracion}.png"),
+        etiqueta,
+        f"{titulo} (Reduced Grid) - Fibras {concentracion}",
+        extension,
+    )
+
+
+# --------------------------------------------------------------------------------
+# 4) PARALLEL RENDERING
+# --------------------------------------------------------------------------------
+
+def _ejecutar(tarea):
+    funcion, argumentos = tarea
+    inicio = time.perf_counter()
+    ruta = funcion(**argumentos)
+    return ruta, time.perf_counter() - inicio
+
+
+def renderizar(tareas, procesos=None):
+    """
+    Renders independent figures in worker processes.
+
+    Args:
+        tareas (list): (function, keyword arguments) of every figure, e.g.
+            (trayectorias, {"ruta_json": ..., "ruta_salida": ..., "titulo": ...}).
+        procesos (int): Worker processes (None = all CPUs, 1 = in this process).
+
+    Returns:
+        dict: "figuras" (list of (path, seconds) in task order) and "segundos" (total
+        wall time).
+    """
+    inicio = time.perf_counter()
+    if procesos == 1 or len(tareas) < 2:
+        figuras = [_ejecutar(t) for t in tareas]
+    else:
+        with ProcessPoolExecutor(max_workers=procesos) as pool:
+            figuras = list(pool.map(_ejecutar, tareas))
+    return {"figuras": figuras, "segundos": time.perf_counter() - inicio}
@@ -0,0 +1,130 @@
+# === BINNED STATISTICS ===
+#
+# Per-cell statistics of scattered samples (fiber centroids with their velocities)
+# on a regular grid. The cell of every sample is computed once and all the sums
+# (count, and sum and sum of squares of every channel) come out of a single
+# np.bincount call. A fine grid can then be reduced to coarser ones without
+# touching the samples again.
+
+import numpy as np
+
+# Image extent [x0, x1, y0, y1] of the recordings (pixels)
+EXTENSION = (0, 1024, 0, 1024)
+
+
+def indices_celda(x, y, forma, extension=EXTENSION):
+    """
+    Flat cell index (ix * gy + iy) of each sample, or -1 outside the extent.
+
+    Cells are half-open except the last one of each axis, which includes the
+    upper edge (same as np.histogram2d).
+    """
+    gx, gy = forma
+    x0, x1, y0, y1 = extension
+    ix = np.floor((np.asarray(x, dtype=float) - x0) / (x1 - x0) * gx).astype(np.int64)
+    iy = np.floor((np.asarray(y, dtype=float) - y0) / (y1 - y0) * gy).astype(np.int64)
+    ix[ix == gx] = gx - 1
+    iy[iy == gy] = gy - 1
+    dentro = (ix >= 0) & (ix < gx) & (iy >= 0) & (iy < gy)
+    return np.where(dentro, ix * gy + iy, -1)
+
+
+def acumular(x, y, canales, forma, extension=EXTENSION, pesos=None):
+    """
+    Count, sum and sum of squares of every channel per grid cell, in one pass.
+
+    Args:
+        x, y (array_like): Sample positions.
+        canales (dict): Channel name -> (N,) values (e.g. {"vx": ..., "vy": ...}).
+        forma (tuple): Grid size (gx, gy).
+        extension (tuple): Grid extent [x0, x1, y0, y1].
+        pesos (array_like): Optional (N,) sample weights (default 1).
+
+    Returns:
+        dict: Statistics with keys "forma", "extension", "conteo" (gx, gy), and
+            "suma" / "suma2" (channel -> (gx, gy)).
+    """
+    indice = indices_celda(x, y, forma, extension)
+    dentro = indice >= 0
+    indice = indice[dentro]
+    pesos = np.ones(indice.size) if pesos is None else np.asarray(pesos, dtype=float)[dentro]
+    nombres = list(canales)
+    valores = np.array([np.asarray(canales[n], dtype=float)[dentro] for n in nombres]).reshape(len(nombres), -1)
+
+    # Rows: weights, then weight * value and weight * value^2 of each channel
+    filas = np.concatenate([pesos[None, :], pesos * valores, pesos * valores ** 2])
+    n_celdas = forma[0] * forma[1]
+    desplazamiento = np.arange(len(filas), dtype=np.int64)[:, None] * n_celdas
+    sumas = np.bincount(
+        (indice[None, :] + desplazamiento).ravel(), weights=filas.ravel(), minlength=len(filas) * n_celdas
+    ).reshape(len(filas), *forma)
+
+    k = len(nombres)
+    return {
+        "forma": tuple(forma),
+        "extension": tuple(extension),
+        "conteo": sumas[0],
+        "suma": dict(zip(nombres, sumas[1:1 + k])),
+        "suma2": dict(zip(nombres, sumas[1 + k:])),
+    }
+
+
+def reducir(estadisticas, factor):
+    """
+    Statistics of a grid `factor` times coarser (per axis, an int or (fx, fy)),
+    by adding blocks of cells. The grid size must be divisible by the factor.
+    """
+    fx, fy = (factor, factor) if np.isscalar(factor) else factor
+    gx, gy = estadisticas["forma"]
+    if gx % fx or gy % fy:
+        raise ValueError(f"Grid {gx}x{gy} is not divisible by {fx}x{fy}")
+
+    def bloques(a):
+        return a.reshape(gx // fx, fx, gy // fy, fy).sum(axis=(1, 3))
+
+    return {
+        "forma": (gx // fx, gy // fy),
+        "extension": estadisticas["extension"],
+        "conteo": bloques(estadisticas["conteo"]),
+        "suma": {n: bloques(a) for n, a in estadisticas["suma"].items()},
+        "suma2": {n: bloques(a) for n, a in estadisticas["suma2"].items()},
+    }
+
+
+def medias(estadisticas, conteo_minimo=1):
+    """
+    Per-cell mean of every channel, masked where the count is below conteo_minimo.
+
+    Returns:
+        dict: Channel -> np.ma.MaskedArray (gx, gy).
+    """
+    conteo = estadisticas["conteo"]
+    vacia = conteo < conteo_minimo
+    divisor = np.where(vacia, 1.0, conteo)
+    return {n: np.ma.masked_where(vacia, s / divisor) for n, s in estadisticas["suma"].items()}
+
+
+def varianzas(estadisticas, conteo_minimo=2):
+    """
+    Per-cell (population) variance of every channel, masked where the count is below
+    conteo_minimo.
+
+    Returns:
+        dict: Channel -> np.ma.MaskedArray (gx, gy).
+    """
+    conteo = estadisticas["conteo"]
+    vacia = conteo < conteo_minimo
+    divisor = np.where(vacia, 1.0, conteo)
+    resultado = {}
+    for n, s in estadisticas["suma"].items():
+        media = s / divisor
+        varianza = np.clip(estadisticas["suma2"][n] / divisor - media ** 2, 0, None)
+        resultado[n] = np.ma.masked_where(vacia, varianza)
+    return resultado
+
+
+def conteo(estadisticas):
+    """
+    Samples per cell, masked where there are none.
+    """
+    return np.ma.masked_where(estadisticas["conteo"] == 0, estadisticas["conteo"])
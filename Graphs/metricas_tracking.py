@@ -0,0 +1,212 @@
+# === TRACKING-QUALITY METRICS ===
+#
+# Track statistics of the fibras_{n}_filtrado.json results, computed from flat arrays
+# (first and last frame, length and gaps of every track, and all the (track, frame)
+# observations) with bincount / cumsum instead of per-frame loops over the fibers:
+# first-appearance curve, track-length distribution and survival function,
+# fragmentation, and active tracks per detection on every frame. evaluar_todo() runs
+# every concentration of both detector backends in one call.
+
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "Particle-Tracking-Velocimetry"))
+import tracks
+
+CLAVES_OMITIDAS = ("ruta", "fibras_por_frame")
+
+CONCENTRACIONES = ["25", "50", "100", "200", "400", "800"]
+BACKENDS = {
+    "YOLO": os.path.join("Particle-Tracking-Velocimetry", "YOLO"),
+    "Hough-Transform": os.path.join("Particle-Tracking-Velocimetry", "Hough-Transform"),
+}
+
+
+def cargar(backend, concentracion, base_dirs=None):
+    """
+    Filtered tracking JSON of one backend and concentration.
+    """
+    base_dir = (base_dirs or BACKENDS)[backend]
+    with open(os.path.join(base_dir, f"fibras_{concentracion}_filtrado.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def tabla_tracks(datos, incluir_propagados=False):
+    """
+    Flat arrays describing every track of a tracking JSON. Observations propagated
+    with optical flow are left out unless incluir_propagados is set, so the active
+    tracks of a frame are compared with real detections only.
+
+    Returns:
+        dict:
+            - inicio, fin, largo, huecos (n_tracks,): First and last frame, number of
+              observations and number of frame jumps larger than one.
+            - frames (n_observaciones,): Frame of every observation of every track.
+            - detecciones (n_frames,): Detections per frame ("fibras_por_frame").
+    """
+    if not incluir_propagados:
+        datos = tracks.sin_propagados(datos)
+    conjunto = tracks.TrackSet.desde_json(datos, columnas=("frame",))
+    conjunto = conjunto.filtrar(conjunto.largos() > 0)
+    largo = conjunto.largos()
+    frames = conjunto["frame"]
+    inicio = conjunto.minimo("frame")
+    fin = conjunto.maximo("frame")
+
+    # Gaps: consecutive observations of the same track more than one frame apart
+    saltos, offsets = conjunto.diferencias("frame")
+    huecos = np.bincount(np.repeat(np.arange(len(largo)), np.diff(offsets))[saltos > 1], minlength=len(largo))
+
+    return {
+        "inicio": inicio,
+        "fin": fin,
+        "largo": largo,
+        "huecos": huecos,
+        "frames": frames,
+        "detecciones": np.asarray(datos.get("fibras_por_frame", []), dtype=np.int64),
+    }
+
+
+def _n_frames(tabla):
+    return int(max(tabla["frames"].max(initial=0), len(tabla["detecciones"])))
+
+
+def curva_primera_aparicion(tabla):
+    """
+    Tracks that have appeared at or before every frame 1..last observed frame (the
+    range of the efficiency plot, without trailing frames that only have detections).
+
+    Returns:
+        tuple: (frames, acumulado) arrays.
+    """
+    n = int(tabla["frames"].max(initial=0))
+    acumulado = np.cumsum(np.bincount(tabla["inicio"], minlength=n + 1))[1:]
+    return np.arange(1, n + 1), acumulado
+
+
+def distribucion_largos(tabla, ancho_bin=1):
+    """
+    Histogram of track lengths with bins [k * ancho_bin, (k + 1) * ancho_bin).
+
+    Returns:
+        tuple: (bordes (K + 1,), conteos (K,)) arrays.
+    """
+    conteos = np.bincount(tabla["largo"] // ancho_bin)
+    return np.arange(len(conteos) + 1) * ancho_bin, conteos
+
+
+def supervivencia(tabla):
+    """
+    Fraction of tracks longer than L frames, for L = 0..max length.
+
+    Returns:
+        tuple: (largos, fraccion) arrays.
+    """
+    largo = tabla["largo"]
+    if not largo.size:
+        return np.zeros(1, dtype=np.int64), np.zeros(1)
+    conteos = np.bincount(largo)
+    return np.arange(len(conteos)), 1.0 - np.cumsum(conteos) / largo.size
+
+
+def activos_por_frame(tabla):
+    """
+    Tracks observed on every frame 1..n_frames.
+    """
+    n = _n_frames(tabla)
+    return np.bincount(tabla["frames"], minlength=n + 1)[1:]
+
+
+def activos_por_deteccion(tabla):
+    """
+    Ratio of observed tracks to detections on every frame (NaN without detections).
+    The filtered results drop short tracks, so the ratio falls below 1 where the
+    tracker loses fibers or creates tracks that are filtered out.
+    """
+    activos = activos_por_frame(tabla).astype(float)
+    detecciones = np.zeros(len(activos))
+    n = min(len(activos), len(tabla["detecciones"]))
+    detecciones[:n] = tabla["detecciones"][:n]
+    return np.divide(activos, detecciones, out=np.full(len(activos), np.nan), where=detecciones > 0)
+
+
+def resumir(tabla, total_fibras=None):
+    """
+    Scalar metrics of one result.
+
+    Args:
+        tabla (dict): Output of tabla_tracks.
+        total_fibras (int): Real number of fibers (the concentration), for the
+            tracks-per-fiber fragmentation.
+
+    Returns:
+        dict: Track counts, length statistics, fragmentation and detection ratios.
+    """
+    largo = tabla["largo"]
+    razon = activos_por_deteccion(tabla)
+    r = {
+        "tracks": int(largo.size),
+        "observaciones": int(largo.sum()),
+        "frames": _n_frames(tabla),
+        "largo_medio": float(largo.mean()) if largo.size else 0.0,
+        "largo_mediano": float(np.median(largo)) if largo.size else 0.0,
+        "huecos_por_track": float(tabla["huecos"].mean()) if largo.size else 0.0,
+        "fraccion_tracks_con_huecos": float((tabla["huecos"] > 0).mean()) if largo.size else 0.0,
+        "activos_por_deteccion_medio": float(np.nanmean(razon)) if np.isfinite(razon).any() else None,
+    }
+    if total_fibras:
+        r["tracks_por_fibra"] = r["tracks"] / total_fibras
+    return r
+
+
+def metricas(datos, total_fibras=None, ancho_bin=1):
+    """
+    Every metric of one tracking JSON: the summary plus the curves as lists.
+    """
+    tabla = tabla_tracks(datos)
+    frames, acumulado = curva_primera_aparicion(tabla)
+    bordes, conteos = distribucion_largos(tabla, ancho_bin)
+    largos, fraccion = supervivencia(tabla)
+    return {
+        "resumen": resumir(tabla, total_fibras),
+        "primera_aparicion": {"frame": frames.tolist(), "acumulado": acumulado.tolist()},
+        "distribucion_largos": {"bordes": bordes.tolist(), "conteos": conteos.tolist()},
+        "supervivencia": {"largo": largos.tolist(), "fraccion": fraccion.tolist()},
+        "activos_por_deteccion": [None if np.isnan(v) else float(v) for v in activos_por_deteccion(tabla)],
+    }
+
+
+def _evaluar(tarea):
+    backend, concentracion, base_dirs, ancho_bin = tarea
+    try:
+        datos = cargar(backend, concentracion, base_dirs)
+    except FileNotFoundError:
+        return backend, concentracion, None
+    return backend, concentracion, metricas(datos, int(concentracion), ancho_bin)
+
+
+def evaluar_todo(concentraciones=CONCENTRACIONES, backends=None, ancho_bin=1, procesos=None):
+    """
+    Metrics of every concentration of every backend, one result file per worker process.
+
+    Args:
+        concentraciones (list): Concentrations (also the real number of fibers).
+        backends (dict): Backend name -> folder with the fibras_{n}_filtrado.json files.
+        ancho_bin (int): Bin width of the length distribution.
+        procesos (int): Worker processes (None = all CPUs).
+
+    Returns:
+        dict: backend -> concentration -> metrics (missing files are skipped).
+    """
+    backends = backends or BACKENDS
+    tareas = [(b, c, backends, ancho_bin) for b in backends for c in concentraciones]
+    resultados = {b: {} for b in backends}
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        for backend, concentracion, m in pool.map(_evaluar, tareas):
+            if m is not None:
+                resultados[backend][concentracion] = m
+    return resultados
@@ -0,0 +1,92 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import figuras
+import metricas_tracking
+
+# =============================================================================
+# 1) PARÁMETROS
+# =============================================================================
+# Todas las figuras independientes (trayectorias y mapas de velocidad) de cada
+# backend y concentración, generadas en un solo pool de procesos. Las rutas de salida
+# son las mismas de Trayectories.py y velocities-heatmap.py de cada backend.
+concentraciones = metricas_tracking.CONCENTRACIONES
+backends = metricas_tracking.BACKENDS   # Backend -> carpeta de los fibras_{n}_filtrado.json
+
+# Figuras por backend y concentración: "trayectorias" y las de figuras.CANTIDADES
+cantidades = ["trayectorias", "vx", "vy", "omega"]
+
+# Mapas de velocidad (iguales a velocities-heatmap.py)
+GRID_SIZE = (100, 100)
+EXTENT = [0, 1024, 0, 1024]
+ANCHO_KERNEL = None
+KERNEL_ADAPTATIVO = False
+
+procesos = None  # Procesos en paralelo (None = todas las CPUs, 1 = secuencial)
+
+ruta_reporte = "Graphs/render_figures.json"
+
+# =============================================================================
+# 2) TAREAS
+# =============================================================================
+
+def tareas_backend(backend, concentracion):
+    """
+    Tareas de figuras.renderizar() de un backend y concentración, omitiendo las que
+    no tienen su JSON de entrada.
+    """
+    tareas = []
+    for cantidad in cantidades:
+        if cantidad == "trayectorias":
+            ruta_json = os.path.join(backends[backend], f"fibras_{concentracion}_filtrado.json")
+            tarea = (figuras.trayectorias, {
+                "ruta_json": ruta_json,
+                "ruta_salida": f"Graphs/{backend}/Trayectories/Graphs/trayectorias_{concentracion}.png",
+                "titulo": f"Trayectorias Trackeadas (fibras_{concentracion})",
+            })
+        else:
+            ruta_json = f"Graphs/{backend}/Velocities/fibers_{concentracion}_convolutionated.json"
+            tarea = (figuras.velocidad, {
+                "ruta_json": ruta_json,
+                "cantidad": cantidad,
+                "carpeta_salida": f"Graphs/{backend}/Velocities/Graphs",
+                "concentracion": concentracion,
+                "forma": GRID_SIZE,
+                "extension": EXTENT,
+                "ancho_kernel": ANCHO_KERNEL,
+                "adaptativo": KERNEL_ADAPTATIVO,
+            })
+        if os.path.exists(ruta_json):
+            tareas.append(tarea)
+        else:
+            print(f"Sin datos para {backend} {concentracion} {cantidad}: {ruta_json}")
+    return tareas
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    tareas = [t for backend in backends for conc in concentraciones for t in tareas_backend(backend, conc)]
+    print(f"Generando {len(tareas)} figuras")
+    resultado = figuras.renderizar(tareas, procesos)
+
+    suma = sum(segundos for _, segundos in resultado["figuras"])
+    for ruta, segundos in resultado["figuras"]:
+        print(f"    {ruta} ({segundos:.2f} s)")
+    print(f"Tiempo total de generación: {resultado['segundos']:.2f} s (suma por figura {suma:.2f} s)")
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "procesos": procesos,
+            "segundos_total": resultado["segundos"],
+            "segundos_suma_figuras": suma,
+            "figuras": [{"ruta": ruta, "segundos": segundos} for ruta, segundos in resultado["figuras"]],
+        }, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import metricas_tracking
+
+# =============================================================================
+# 1) PARÁMETROS
+# =============================================================================
+concentraciones = ["25", "50", "100", "200", "400", "800"]
+
+# Ancho de los intervalos de la distribución de longitudes (frames)
+bin_width = 20
+
+procesos = None  # Procesos en paralelo (None = todas las CPUs)
+
+ruta_reporte = "Graphs/tracking_metrics.json"
+
+# =============================================================================
+# 2) MAIN
+# =============================================================================
+
+def main():
+    resultados = metricas_tracking.evaluar_todo(concentraciones, ancho_bin=bin_width, procesos=procesos)
+
+    for backend, por_concentracion in resultados.items():
+        print(f"\n=== {backend} ===")
+        if not por_concentracion:
+            print("    Sin resultados filtrados")
+        for conc, m in por_concentracion.items():
+            r = m["resumen"]
+            razon = r["activos_por_deteccion_medio"]
+            print(
+                f"    {conc:>4} fibras: {r['tracks']:>6} tracks ({r['tracks_por_fibra']:6.2f} por fibra), "
+                f"largo medio {r['largo_medio']:7.1f} frames, huecos/track {r['huecos_por_track']:5.2f}, "
+                f"activos/detección {'-' if razon is None else f'{razon:.3f}'}"
+            )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=4)
+    print(f"\nReporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
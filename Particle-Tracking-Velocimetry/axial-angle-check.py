@@ -0,0 +1,43 @@
+import tracking
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Near-vertical fiber whose axial (mask) angle flips sign between frames. Compared
+# modulo 180 (periodo_angulo = 180, as the YOLO ptv() does with propiedades_mascara)
+# it must stay one track; modulo 360 every flip starts a new one.
+ANGULOS_VERTICAL = [89.5, -89.7, 89.8, -89.6, 89.9, -89.5]
+CENTROIDE = (500.0, 300.0)  # Moves one pixel down per frame
+LARGO = 80.0
+
+# =============================================================================
+# 2) RUN
+# =============================================================================
+
+def tracks_fibra_vertical(periodo_angulo):
+    """
+    Number of tracks the tracker makes of the fiber of ANGULOS_VERTICAL, comparing
+    angles with the given period.
+    """
+    anterior = tracking.periodo_angulo
+    tracking.configurar(periodo_angulo=periodo_angulo)
+    try:
+        estado = tracking.nuevo_estado()
+        for idx, angulo in enumerate(ANGULOS_VERTICAL):
+            tracking.procesar_frame(estado, idx, [(CENTROIDE[0], CENTROIDE[1] + idx)], [angulo], [LARGO])
+    finally:
+        tracking.configurar(periodo_angulo=anterior)
+    return len(estado["dictionary"])
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    axial, circular = tracks_fibra_vertical(180), tracks_fibra_vertical(360)
+    print(f"Fibra vertical: {axial} track(s) con periodo 180, {circular} con periodo 360")
+    if axial != 1:
+        raise RuntimeError(f"The near-vertical fiber was split into {axial} tracks with periodo_angulo = 180")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# === TRACK QUERIES ===
+#
+# Lazy queries over a fibras_{n}.json tracking result. The first time a file is opened
+# it is parsed once and a per-track summary index (length, first / last frame,
+# bounding box, mean speed, mean angle, and the byte span of the track in the JSON) is
+# saved next to it as fibras_{n}.indice.npz. Filters are then evaluated on the index
+# arrays only, and just the tracks that pass are read back, each with one json.loads()
+# of its span of the memory-mapped file (or copied byte for byte when writing a
+# filtered file). The index is rebuilt when the JSON changes (size or modification time).
+
+import json
+import mmap
+import os
+import re
+from json.decoder import scanstring
+
+import numpy as np
+
+import tracks
+
+CLAVES_OMITIDAS = tracks.CLAVES_OMITIDAS
+CAMPOS_RESUMEN = (
+    "largo", "primer_frame", "ultimo_frame",
+    "x_min", "x_max", "y_min", "y_max",
+    "velocidad_media", "angulo_medio",
+)
+
+_ESPACIO = re.compile(r"[ \t\n\r]*")
+
+
+# --------------------------------------------------------------------------------
+# 1) INDEX
+# --------------------------------------------------------------------------------
+
+def ruta_indice(ruta_json):
+    """
+    Path of the summary index of a tracking JSON (fibras_800.json -> fibras_800.indice.npz).
+    """
+    return os.path.splitext(ruta_json)[0] + ".indice.npz"
+
+
+def _entradas(texto):
+    # (key, value, start, end) of every top-level entry of a JSON object, with the
+    # character span of the value
+    decodificador = json.JSONDecoder()
+    i = _ESPACIO.match(texto, 0).end()
+    if texto[i:i + 1] != "{":
+        raise ValueError("The tracking file is not a JSON object")
+    i = _ESPACIO.match(texto, i + 1).end()
+    while texto[i] != "}":
+        clave, i = scanstring(texto, i + 1)
+        i = _ESPACIO.match(texto, i).end() + 1   # ':'
+        i = _ESPACIO.match(texto, i).end()
+        valor, fin = decodificador.raw_decode(texto, i)
+        yield clave, valor, i, fin
+        i = _ESPACIO.match(texto, fin).end()
+        if texto[i] == ",":
+            i = _ESPACIO.match(texto, i + 1).end()
+
+
+def resumir(datos):
+    """
+    Summary arrays of every track of a tracking JSON (dict), in key order.
+
+    Returns:
+        dict: ids and the CAMPOS_RESUMEN arrays (K,). Speeds are centroid displacement
+        per frame (pixels / frame), angles the circular mean in degrees; fields that need
+        samples a track does not have are NaN.
+    """
+    por_frame = tracks.TrackSet.desde_json(datos, columnas=("frame",))
+    geometria = tracks.TrackSet.desde_json(datos, columnas=("frame", "centroide", "angulo"))
+    desplazamientos, offsets = geometria.diferencias("centroide")
+    saltos, _ = geometria.diferencias("frame")
+    pasos = tracks.TrackSet(geometria.ids, offsets, {
+        "velocidad": np.linalg.norm(desplazamientos, axis=1) / np.maximum(saltos, 1),
+    })
+    radianes = np.deg2rad(geometria["angulo"])
+    direcciones = tracks.TrackSet(geometria.ids, geometria.offsets, {
+        "coseno": np.cos(radianes), "seno": np.sin(radianes),
+    })
+
+    esquinas_min = geometria.minimo("centroide")
+    esquinas_max = geometria.maximo("centroide")
+    return {
+        "ids": por_frame.ids,
+        "largo": por_frame.largos(),
+        "primer_frame": por_frame.minimo("frame").astype(float),
+        "ultimo_frame": por_frame.maximo("frame").astype(float),
+        "x_min": esquinas_min[:, 0].astype(float),
+        "x_max": esquinas_max[:, 0].astype(float),
+        "y_min": esquinas_min[:, 1].astype(float),
+        "y_max": esquinas_max[:, 1].astype(float),
+        "velocidad_media": pasos.media("velocidad"),
+        "angulo_medio": np.rad2deg(np.arctan2(direcciones.media("seno"), direcciones.media("coseno"))),
+    }
+
+
+def construir_indice(ruta_json):
+    """
+    Parses a tracking JSON once and saves its summary index with the byte span of every
+    entry.
+
+    Returns:
+        dict: The index (see abrir()).
+    """
+    estado = os.stat(ruta_json)
+    with open(ruta_json, "rb") as f:
+        contenido = f.read()
+    texto = contenido.decode("utf-8")
+    ascii_puro = len(texto) == len(contenido)
+
+    datos, spans = {}, {}
+    caracter, byte = 0, 0
+    for clave, valor, inicio, fin in _entradas(texto):
+        if not ascii_puro:
+            # Character offsets to byte offsets, encoding only the text between spans
+            inicio_b = byte + len(texto[caracter:inicio].encode("utf-8"))
+            fin_b = inicio_b + len(texto[inicio:fin].encode("utf-8"))
+            caracter, byte = fin, fin_b
+            inicio, fin = inicio_b, fin_b
+        datos[clave] = valor
+        spans[clave] = (inicio, fin)
+
+    indice = resumir(datos)
+    indice["inicio_bytes"] = np.array([spans[k][0] for k in indice["ids"].tolist()], dtype=np.int64)
+    indice["fin_bytes"] = np.array([spans[k][1] for k in indice["ids"].tolist()], dtype=np.int64)
+    especiales = [k for k in CLAVES_OMITIDAS if k in spans]
+    indice["claves_especiales"] = np.array(especiales, dtype=str)
+    indice["spans_especiales"] = np.array([spans[k] for k in especiales], dtype=np.int64).reshape(-1, 2)
+    indice["tamano"] = np.int64(estado.st_size)
+    indice["modificado_ns"] = np.int64(estado.st_mtime_ns)
+    np.savez(ruta_indice(ruta_json), **indice)
+    return indice
+
+
+def cargar_indice(ruta_json, reconstruir=False):
+    """
+    Summary index of a tracking JSON, rebuilt when missing or out of date.
+    """
+    ruta = ruta_indice(ruta_json)
+    if not reconstruir and os.path.exists(ruta):
+        with np.load(ruta) as archivo:
+            indice = {k: archivo[k] for k in archivo.files}
+        estado = os.stat(ruta_json)
+        if int(indice["tamano"]) == estado.st_size and int(indice["modificado_ns"]) == estado.st_mtime_ns:
+            return indice
+    return construir_indice(ruta_json)
+
+
+# --------------------------------------------------------------------------------
+# 2) QUERIES
+# --------------------------------------------------------------------------------
+
+def abrir(ruta_json, reconstruir=False):
+    """
+    Query over every track of a tracking JSON.
+    """
+    indice = cargar_indice(ruta_json, reconstruir)
+    return Consulta(ruta_json, indice, np.ones(len(indice["ids"]), dtype=bool))
+
+
+class Consulta:
+    """
+    Lazy selection of the tracks of one file. Filters only combine boolean masks over
+    the index; samples are read when fibras(), track_set() or guardar() is called.
+    """
+
+    def __init__(self, ruta_json, indice, mascara):
+        self.ruta_json = ruta_json
+        self.indice = indice
+        self.mascara = mascara
+
+    def __len__(self):
+        return int(np.count_nonzero(self.mascara))
+
+    def filtrar(self, largo_minimo=None, largo_maximo=None, frames=None, region=None,
+                velocidad_minima=None, velocidad_maxima=None, ids=None):
+        """
+        Query with the tracks that also pass every given condition.
+
+        Args:
+            largo_minimo, largo_maximo (int): Bounds on the number of observations.
+            frames (tuple): (first, last) frame window; keeps tracks observed at some
+                frame of the window according to their first and last frame.
+            region (tuple): (x_min, x_max, y_min, y_max); keeps tracks whose bounding box
+                overlaps the region.
+            velocidad_minima, velocidad_maxima (float): Bounds on the mean speed (pixels / frame).
+            ids (iterable): Track IDs to keep.
+
+        Returns:
+            Consulta: New query (this one is not modified).
+        """
+        r = self.indice
+        m = self.mascara.copy()
+        if largo_minimo is not None:
+            m &= r["largo"] >= largo_minimo
+        if largo_maximo is not None:
+            m &= r["largo"] <= largo_maximo
+        if frames is not None:
+            m &= (r["primer_frame"] <= frames[1]) & (r["ultimo_frame"] >= frames[0])
+        if region is not None:
+            x0, x1, y0, y1 = region
+            m &= (r["x_max"] >= x0) & (r["x_min"] <= x1) & (r["y_max"] >= y0) & (r["y_min"] <= y1)
+        if velocidad_minima is not None:
+            m &= r["velocidad_media"] >= velocidad_minima
+        if velocidad_maxima is not None:
+            m &= r["velocidad_media"] <= velocidad_maxima
+        if ids is not None:
+            m &= np.isin(r["ids"], np.asarray([str(i) for i in ids], dtype=str))
+        return Consulta(self.ruta_json, self.indice, m)
+
+    def donde(self, predicado):
+        """
+        Query with the tracks where predicado(index) (a (K,) boolean array computed from
+        the summary arrays) is True.
+        """
+        return Consulta(self.ruta_json, self.indice, self.mascara & np.asarray(predicado(self.indice), dtype=bool))
+
+    def ids(self):
+        return self.indice["ids"][self.mascara].tolist()
+
+    def resumen(self):
+        """
+        Summary arrays (ids and CAMPOS_RESUMEN) of the selected tracks.
+        """
+        return {k: self.indice[k][self.mascara] for k in ("ids",) + CAMPOS_RESUMEN}
+
+    def fibras(self, especiales=False):
+        """
+        Entries of the selected tracks, read from the file ({fiber_id: fiber_data}, in
+        file order). With especiales=True, "ruta" and "fibras_por_frame" come first, as
+        in the tracking JSON.
+        """
+        r = self.indice
+        salida = {}
+        with open(self.ruta_json, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            if especiales:
+                for clave, (a, b) in zip(r["claves_especiales"].tolist(), r["spans_especiales"].tolist()):
+                    salida[clave] = json.loads(datos[a:b])
+            for k in np.flatnonzero(self.mascara):
+                salida[str(r["ids"][k])] = json.loads(datos[r["inicio_bytes"][k]:r["fin_bytes"][k]])
+        return salida
+
+    def track_set(self, columnas=("frame", "centroide", "angulo", "largo_maximo")):
+        """
+        TrackSet of the selected tracks.
+        """
+        return tracks.TrackSet.desde_json(self.fibras(), columnas)
+
+    def guardar(self, ruta):
+        """
+        Writes the selected tracks (and "ruta" / "fibras_por_frame") as a tracking JSON.
+
+        The entries are copied byte for byte from the original file instead of being
+        decoded and encoded again; for files written by json.dump(indent=4) the result
+        is identical to dumping the filtered dict the same way.
+        """
+        r = self.indice
+        seleccion = np.flatnonzero(self.mascara)
+        entradas = list(zip(r["claves_especiales"].tolist(), *r["spans_especiales"].T.tolist())) + list(zip(
+            r["ids"][seleccion].tolist(), r["inicio_bytes"][seleccion].tolist(), r["fin_bytes"][seleccion].tolist(),
+        ))
+        with open(self.ruta_json, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos, \
+                open(ruta, "wb") as salida:
+            salida.write(b"{")
+            for n, (clave, a, b) in enumerate(entradas):
+                salida.write((",\n    " if n else "\n    ").encode("utf-8"))
+                salida.write(json.dumps(clave, ensure_ascii=False).encode("utf-8") + b": ")
+                salida.write(datos[a:b])
+            salida.write(b"\n}" if entradas else b"}")
@@ -0,0 +1,432 @@
+# === HOUGH DETECTION ===
+#
+# Canny + HoughLinesP detection of the Hough-Transform ptv(), on whole arrays, plus
+# a track-guided mode that only looks at small windows around the position each
+# tracked fiber is predicted at. Full-frame detection is kept for a periodic sweep
+# that picks up the fibers entering the field. A coarse-to-fine mode runs Hough on a
+# downsampled image and refines the candidates at full resolution. All of them can
+# remove the static background of the recording (see fondo.py) before Canny.
+
+import atexit
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import fondo
+import tracking
+
+# Parameters used by the Hough-Transform ptv()
+PARAMETROS_HOUGH = dict(
+    canny_threshold1=100,
+    canny_threshold2=250,
+    hough_threshold=40,
+    min_line_length=30,
+    max_line_gap=5
+)
+
+# Extra pixels around each predicted fiber, on top of variacion_x / variacion_y
+MARGEN_VENTANA = 8
+
+# Border added around each window so Canny sees the full Sobel neighborhood
+BORDE_CANNY = 3
+
+# Above this fraction of the image the windows save little Canny work and the Hough
+# cost is the same (it grows with the edge pixels, all on fibers), so the full frame is used
+FRACCION_MAXIMA_LOCAL = 0.5
+
+# Windows are processed in a thread pool (OpenCV releases the GIL) from this count on
+VENTANAS_PARALELO = 16
+
+
+def _propiedades(lineas, dx=0, dy=0):
+    """
+    Centroid, angle, length and end points of HoughLinesP lines, as detect_lines_and_properties().
+    """
+    x1, y1, x2, y2 = (lineas.reshape(-1, 4) + [dx, dy, dx, dy]).T.astype(float)
+    centroids = np.stack([(x1 + x2) / 2.0, (y1 + y2) / 2.0], axis=1)
+    angles = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+    lengths = np.sqrt((x2 - x1) ** 2 + (y2 - y1) ** 2)
+    boxes = np.stack([x1, y1, x2, y2], axis=1).astype(int)
+    return centroids, angles, lengths, boxes
+
+
+def _vacio():
+    return np.zeros((0, 2)), np.zeros(0), np.zeros(0), np.zeros((0, 4), dtype=int)
+
+
+def _hough(bordes, parametros):
+    return cv2.HoughLinesP(
+        bordes,
+        1,
+        np.pi / 180,
+        threshold=parametros["hough_threshold"],
+        minLineLength=parametros["min_line_length"],
+        maxLineGap=parametros["max_line_gap"]
+    )
+
+
+def mascara_roi(forma, roi):
+    """
+    uint8 mask (255 inside) of the ROI polygon, or None without ROI.
+    """
+    if roi is None:
+        return None
+    mascara = np.zeros(forma[:2], dtype=np.uint8)
+    cv2.fillPoly(mascara, [roi], 255)
+    return mascara
+
+
+def detectar(gris, roi=None, parametros=PARAMETROS_HOUGH, fondo_estatico=None, umbral_fondo=fondo.UMBRAL_PRIMER_PLANO):
+    """
+    Full-frame detection: the background is removed and the ROI masked, then Canny +
+    HoughLinesP.
+
+    Args:
+        gris (np.ndarray): Grayscale image.
+        roi (np.ndarray): ROI polygon (pts), or None for the whole image.
+        parametros (dict): Canny and Hough parameters (see PARAMETROS_HOUGH).
+        fondo_estatico (np.ndarray): Background of the recording (fondo.cargar_o_estimar()), or None.
+        umbral_fondo (int): Foreground threshold (gray levels) of fondo.primer_plano().
+
+    Returns:
+        centroids (np.ndarray): (N, 2) line centers.
+        angles (np.ndarray): (N,) angles (degrees).
+        lengths (np.ndarray): (N,) lengths.
+        boxes (np.ndarray): (N, 4) end points [x1, y1, x2, y2].
+    """
+    if fondo_estatico is not None:
+        gris = fondo.primer_plano(gris, fondo_estatico, umbral_fondo)
+    mascara = mascara_roi(gris.shape, roi)
+    if mascara is not None:
+        gris = cv2.bitwise_and(gris, mascara)
+    bordes = cv2.Canny(gris, parametros["canny_threshold1"], parametros["canny_threshold2"], apertureSize=3)
+    lineas = _hough(bordes, parametros)
+    if lineas is None:
+        return _vacio()
+    return _propiedades(lineas)
+
+
+# Pyramid mode: HoughLinesP on a downsampled image finds the candidates, which are
+# refined at full resolution inside a band around each one
+NIVELES_PIRAMIDE = 1           # Halvings of the image before the coarse Hough
+FRACCION_LARGO_GRUESO = 2 / 3  # Fraction of min_line_length required of the coarse pieces
+SEMIANCHO_BANDA = 3            # Half-width (full-resolution pixels) of the refinement band, beyond the coarse error
+EXTENSION_BANDA = 4            # Band extension (full-resolution pixels) past the coarse end points
+FRACCION_EXTREMO = 0.3         # The fiber ends where its profile drops below this fraction of the maximum
+BLOQUE_REFINADO = 128          # Candidates refined at once
+DISTANCIA_DUPLICADO = 4.0      # Refined segments closer than this (pixels) ...
+ANGULO_DUPLICADO = 5.0         # ... and within this angle (degrees) are the same fiber
+
+
+def _parametros_gruesos(parametros, escala):
+    # Votes and lengths are counted in pixels, so they shrink with the image. Fibers
+    # break up more at low resolution, so the coarse pass accepts shorter pieces with
+    # wider gaps and the refinement recovers the full length
+    return dict(
+        parametros,
+        hough_threshold=max(int(round(parametros["hough_threshold"] / escala)), 1),
+        min_line_length=max(int(round(parametros["min_line_length"] * FRACCION_LARGO_GRUESO / escala)), 1),
+        max_line_gap=int(np.ceil(parametros["max_line_gap"] / escala)) + 1,
+    )
+
+
+def fusionar_duplicados(centroids, angles, lengths, boxes, distancia=DISTANCIA_DUPLICADO, angulo=ANGULO_DUPLICADO):
+    """
+    Keeps the longest of the segments that describe the same fiber: centroids closer
+    than `distancia` pixels and directions within `angulo` degrees.
+    """
+    if len(centroids) < 2:
+        return centroids, angles, lengths, boxes
+    orden = np.argsort(-lengths)
+    c = centroids[orden].astype(np.float32)
+    dx = c[:, 0][:, None] - c[:, 0][None, :]
+    dy = c[:, 1][:, None] - c[:, 1][None, :]
+    i, j = np.nonzero(np.triu(dx * dx + dy * dy < distancia ** 2, 1))
+    # Direction only matters modulo 180 degrees: compare the doubled angles
+    doble = np.radians(2 * angles[orden])
+    paralelo = np.cos(doble[i] - doble[j]) > np.cos(np.radians(2 * angulo))
+    # Segment j is dropped when a longer one (earlier in the order) duplicates it
+    duplicado = np.zeros(len(orden), dtype=bool)
+    duplicado[j[paralelo]] = True
+    quedan = np.sort(orden[~duplicado])
+    return centroids[quedan], angles[quedan], lengths[quedan], boxes[quedan]
+
+
+def refinar_segmentos(gris, boxes, semiancho=SEMIANCHO_BANDA, extension=EXTENSION_BANDA,
+                      fraccion_extremo=FRACCION_EXTREMO):
+    """
+    Refines the centroid, angle and end points of candidate segments at full resolution.
+
+    The image is sampled (bilinear) on an oriented grid around every candidate at
+    once: 1-pixel steps along the segment, up to `extension` past its ends, and
+    across it up to `semiancho`. The intensity above the band border (the local
+    background) weights the samples; their second moments give the centroid and the
+    angle, and the along-segment profile gives the ends.
+
+    Args:
+        gris (np.ndarray): Full-resolution grayscale image (fibers brighter than the background).
+        boxes (np.ndarray): (K, 4) candidate segments [x1, y1, x2, y2] in full-resolution pixels.
+
+    Returns:
+        centroids, angles, lengths, boxes: As detectar(). Candidates without signal in
+        their band keep their coarse values.
+    """
+    boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+    if not len(boxes):
+        return _vacio()
+
+    # Candidates are refined in blocks of similar length, so the grid of each block
+    # is padded to a length close to that of all its candidates
+    orden = np.argsort(np.hypot(boxes[:, 2] - boxes[:, 0], boxes[:, 3] - boxes[:, 1]))
+    partes = [
+        _refinar_bloque(gris, boxes[orden[i:i + BLOQUE_REFINADO]], semiancho, extension, fraccion_extremo)
+        for i in range(0, len(orden), BLOQUE_REFINADO)
+    ]
+    inversa = np.argsort(orden)
+    return tuple(np.concatenate(parte)[inversa] for parte in zip(*partes))
+
+
+def _refinar_bloque(gris, boxes, semiancho, extension, fraccion_extremo):
+
+    x1, y1, x2, y2 = boxes.T
+    centro = np.stack([(x1 + x2) / 2, (y1 + y2) / 2], axis=1)
+    largo = np.hypot(x2 - x1, y2 - y1)
+    rad = np.arctan2(y2 - y1, x2 - x1)
+    u = np.stack([np.cos(rad), np.sin(rad)], axis=1)
+    n = np.stack([-u[:, 1], u[:, 0]], axis=1)
+
+    # Oriented sampling grid shared by all candidates, (K, nt, nw)
+    mitad = int(np.ceil(largo.max() / 2)) + extension
+    t = np.arange(-mitad, mitad + 1, dtype=np.float32)
+    w = np.arange(-semiancho, semiancho + 1, dtype=np.float32)
+    valido = np.abs(t)[None, :] <= largo[:, None] / 2 + extension
+    k, nt, nw = len(boxes), len(t), len(w)
+    mapas = [
+        (c[:, None, None] + t[None, :, None] * a[:, None, None] + w[None, None, :] * b[:, None, None])
+        .astype(np.float32).reshape(k, nt * nw)
+        for c, a, b in ((centro[:, 0], u[:, 0], n[:, 0]), (centro[:, 1], u[:, 1], n[:, 1]))
+    ]
+    muestras = cv2.remap(gris, mapas[0], mapas[1], cv2.INTER_LINEAR, borderMode=cv2.BORDER_REPLICATE)
+    muestras = muestras.reshape(k, nt, nw).astype(np.float32)
+
+    # Local background: mean of the two band borders over the valid part of the segment
+    borde = (muestras[:, :, [0, -1]].sum(axis=2) * valido).sum(axis=1) / (2 * valido.sum(axis=1))
+    peso = np.clip(muestras - borde[:, None, None], 0, None) * valido[:, :, None]
+
+    # Weighted second moments in the (along, across) frame of each candidate, from the
+    # along-segment profiles of the weight and of its first and second moments across
+    perfil = peso.sum(axis=2)
+    perfil_w = peso @ w
+    perfil_ww = peso @ (w * w)
+    total = perfil.sum(axis=1)
+    con_senal = total > 0
+    total = np.where(con_senal, total, 1.0)
+    mt = perfil @ t / total
+    mw = perfil_w.sum(axis=1) / total
+    dt = t[None, :] - mt[:, None]
+    stt = (perfil * dt ** 2).sum(axis=1)
+    sww = perfil_ww.sum(axis=1) - total * mw ** 2
+    stw = (dt * (perfil_w - mw[:, None] * perfil)).sum(axis=1)
+    giro = 0.5 * np.arctan2(2 * stw, stt - sww)
+
+    # Ends: first and last positions where the along-segment profile is strong enough
+    fuerte = perfil >= fraccion_extremo * perfil.max(axis=1, keepdims=True)
+    t0 = t[fuerte.argmax(axis=1)]
+    t1 = t[nt - 1 - fuerte[:, ::-1].argmax(axis=1)]
+
+    nuevo_rad = rad + giro
+    nuevo_u = np.stack([np.cos(nuevo_rad), np.sin(nuevo_rad)], axis=1)
+    nuevo_centro = centro + ((t0 + t1) / 2)[:, None] * u + mw[:, None] * n
+    nuevo_largo = t1 - t0
+
+    centro = np.where(con_senal[:, None], nuevo_centro, centro)
+    largo = np.where(con_senal, nuevo_largo, largo)
+    rad = np.where(con_senal, nuevo_rad, rad)
+    u = np.where(con_senal[:, None], nuevo_u, u)
+    medio = largo[:, None] / 2 * u
+    extremos = np.round(np.hstack([centro - medio, centro + medio])).astype(int)
+    return centro, np.degrees(rad), largo, extremos
+
+
+def detectar_piramide(gris, roi=None, parametros=PARAMETROS_HOUGH, niveles=NIVELES_PIRAMIDE,
+                      fondo_estatico=None, umbral_fondo=fondo.UMBRAL_PRIMER_PLANO):
+    """
+    Coarse-to-fine detection: Canny + HoughLinesP on the image downsampled `niveles`
+    times by 2, then refinement of the candidates at full resolution (see
+    refinar_segmentos()). Hough works on 4**niveles times fewer edge pixels.
+
+    Args:
+        gris (np.ndarray): Grayscale image.
+        roi (np.ndarray): ROI polygon (pts), or None.
+        parametros (dict): Full-resolution Canny and Hough parameters; votes, lengths
+            and gaps are scaled to the coarse image.
+        niveles (int): Pyramid levels (0 = full resolution, same as detectar()).
+        fondo_estatico (np.ndarray): Background of the recording, or None.
+        umbral_fondo (int): Foreground threshold (gray levels).
+
+    Returns:
+        centroids, angles, lengths, boxes: As detectar().
+    """
+    if niveles <= 0:
+        return detectar(gris, roi, parametros, fondo_estatico, umbral_fondo)
+    if fondo_estatico is not None:
+        gris = fondo.primer_plano(gris, fondo_estatico, umbral_fondo)
+    mascara = mascara_roi(gris.shape, roi)
+    if mascara is not None:
+        gris = cv2.bitwise_and(gris, mascara)
+
+    grueso = gris
+    for _ in range(niveles):
+        grueso = cv2.pyrDown(grueso)
+    escala = 2 ** niveles
+    gruesos = _parametros_gruesos(parametros, escala)
+    bordes = cv2.Canny(grueso, gruesos["canny_threshold1"], gruesos["canny_threshold2"], apertureSize=3)
+    lineas = _hough(bordes, gruesos)
+    if lineas is None:
+        return _vacio()
+
+    # Coarse pixel centers back to full resolution. Both edges of a fiber give a
+    # candidate, so duplicates are dropped before and after the refinement
+    candidatos = fusionar_duplicados(*_propiedades(lineas.reshape(-1, 4) * escala + (escala - 1) // 2))[3]
+    refinados = refinar_segmentos(gris, candidatos, semiancho=SEMIANCHO_BANDA + escala)
+    return fusionar_duplicados(*refinados)
+
+
+def ventanas_previstas(estado, forma, margen=MARGEN_VENTANA):
+    """
+    Search windows around the predicted segment of every tracked fiber, merged into
+    disjoint regions.
+
+    Returns:
+        regiones (list): (x0, y0, x1, y1, mascara) of each region, where mascara is the
+            uint8 union of the windows inside its bounding box.
+        pixeles (int): Pixels covered by the windows.
+    """
+    alto, ancho = forma[:2]
+    centroides, angulos, largos = tracking.fibras_previstas(estado)
+    if not len(centroides):
+        return [], 0
+
+    rad = np.radians(angulos)
+    semiancho = np.abs(largos / 2 * np.cos(rad)) + tracking.variacion_x + margen
+    semialto = np.abs(largos / 2 * np.sin(rad)) + tracking.variacion_y + margen
+    x0 = np.clip(np.floor(centroides[:, 0] - semiancho), 0, ancho).astype(int)
+    x1 = np.clip(np.ceil(centroides[:, 0] + semiancho) + 1, 0, ancho).astype(int)
+    y0 = np.clip(np.floor(centroides[:, 1] - semialto), 0, alto).astype(int)
+    y1 = np.clip(np.ceil(centroides[:, 1] + semialto) + 1, 0, alto).astype(int)
+
+    # Overlapping windows become one region, so no edge pixel is searched twice.
+    # Labels are propagated over the overlap graph until every group has its minimum
+    solapan = ((x0[:, None] < x1[None, :]) & (x0[None, :] < x1[:, None])
+               & (y0[:, None] < y1[None, :]) & (y0[None, :] < y1[:, None]))
+    etiquetas = np.arange(len(x0))
+    while True:
+        nuevas = np.where(solapan, etiquetas[None, :], len(x0)).min(axis=1)
+        if np.array_equal(nuevas, etiquetas):
+            break
+        etiquetas = nuevas
+
+    regiones, pixeles = [], 0
+    for k in np.unique(etiquetas):
+        grupo = np.flatnonzero(etiquetas == k)
+        rx0, ry0 = x0[grupo].min(), y0[grupo].min()
+        rx1, ry1 = x1[grupo].max(), y1[grupo].max()
+        sub = np.zeros((ry1 - ry0, rx1 - rx0), dtype=np.uint8)
+        for i in grupo:
+            sub[y0[i] - ry0:y1[i] - ry0, x0[i] - rx0:x1[i] - rx0] = 255
+        pixeles += int(np.count_nonzero(sub))
+        regiones.append((rx0, ry0, rx1, ry1, sub))
+    return regiones, pixeles
+
+
+def _detectar_region(gris, mascara_roi_completa, region, parametros, fondo_estatico, umbral_fondo):
+    x0, y0, x1, y1, sub = region
+    alto, ancho = gris.shape[:2]
+    bx0, by0 = max(x0 - BORDE_CANNY, 0), max(y0 - BORDE_CANNY, 0)
+    bx1, by1 = min(x1 + BORDE_CANNY, ancho), min(y1 + BORDE_CANNY, alto)
+
+    recorte = gris[by0:by1, bx0:bx1]
+    if fondo_estatico is not None:
+        recorte = fondo.primer_plano(recorte, fondo_estatico[by0:by1, bx0:bx1], umbral_fondo)
+    if mascara_roi_completa is not None:
+        recorte = cv2.bitwise_and(recorte, mascara_roi_completa[by0:by1, bx0:bx1])
+    bordes = cv2.Canny(recorte, parametros["canny_threshold1"], parametros["canny_threshold2"], apertureSize=3)
+
+    # Keep only the edges inside the windows of this region
+    ventana = np.zeros_like(bordes)
+    ventana[y0 - by0:y1 - by0, x0 - bx0:x1 - bx0] = sub
+    bordes &= ventana
+
+    lineas = _hough(bordes, parametros)
+    if lineas is None:
+        return None
+    return _propiedades(lineas, bx0, by0)
+
+
+_POOLS = {}
+
+
+def _pool(hilos):
+    # One pool per thread count, kept for the whole run and shut down at exit
+    if hilos not in _POOLS:
+        _POOLS[hilos] = ThreadPoolExecutor(max_workers=hilos)
+    return _POOLS[hilos]
+
+
+@atexit.register
+def _cerrar_pools():
+    while _POOLS:
+        _POOLS.popitem()[1].shutdown(wait=True, cancel_futures=True)
+
+
+def detectar_local(gris, estado, roi=None, parametros=PARAMETROS_HOUGH, margen=MARGEN_VENTANA, hilos=None,
+                   fondo_estatico=None, umbral_fondo=fondo.UMBRAL_PRIMER_PLANO):
+    """
+    Track-guided detection: Canny + HoughLinesP only inside the windows around the
+    predicted position of the fibers tracked in the previous image. Regions are
+    processed in a thread pool when there are many of them. When the windows cover
+    more than FRACCION_MAXIMA_LOCAL of the image the full frame is searched instead.
+
+    Args:
+        gris (np.ndarray): Grayscale image.
+        estado (dict): Tracking state (see tracking.nuevo_estado()).
+        roi (np.ndarray): ROI polygon (pts), or None.
+        parametros (dict): Canny and Hough parameters.
+        margen (int): Extra window margin (pixels) on top of the gating tolerance.
+        hilos (int): Threads of the pool (None = ThreadPoolExecutor default).
+        fondo_estatico (np.ndarray): Background of the recording, or None.
+        umbral_fondo (int): Foreground threshold (gray levels).
+
+    Returns:
+        centroids, angles, lengths, boxes: As detectar().
+        pixeles (int): Pixels searched (to compare with the ROI area).
+    """
+    regiones, pixeles = ventanas_previstas(estado, gris.shape, margen)
+    if not regiones:
+        return (*_vacio(), 0)
+    if pixeles > FRACCION_MAXIMA_LOCAL * gris.shape[0] * gris.shape[1]:
+        return (*detectar(gris, roi, parametros, fondo_estatico, umbral_fondo), gris.shape[0] * gris.shape[1])
+    mascara_completa = mascara_roi(gris.shape, roi)
+
+    def tarea(region):
+        return _detectar_region(gris, mascara_completa, region, parametros, fondo_estatico, umbral_fondo)
+
+    if len(regiones) >= VENTANAS_PARALELO and hilos != 1:
+        resultados = list(_pool(hilos).map(tarea, regiones))
+    else:
+        resultados = [tarea(region) for region in regiones]
+
+    resultados = [r for r in resultados if r is not None]
+    if not resultados:
+        return (*_vacio(), pixeles)
+    centroids, angles, lengths, boxes = (np.concatenate(partes) for partes in zip(*resultados))
+    return centroids, angles, lengths, boxes, pixeles
+
+
+def es_barrido_completo(idx, estado, cada):
+    """
+    True when image idx (zero-based) must run the full-frame detection: every `cada`
+    images, and whenever no fiber is being tracked.
+    """
+    return cada <= 1 or idx % cada == 0 or not estado["fibras_imagen_actual"]
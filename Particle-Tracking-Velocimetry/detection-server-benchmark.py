@@ -0,0 +1,160 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import servidor_deteccion
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Per-run startup with and without the server. The cold run is what ptv() pays
+# today: a fresh interpreter imports the detector stack, creates the detector and
+# detects its first frame. The warm run is a fresh interpreter that imports only the
+# client, connects to the server and gets the same frame detected. Throughput is then
+# measured with several clients sending one frame per request, which the server
+# coalesces into batches.
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+ruta_pesos = os.path.join(DIRECTORIO, "YOLO", "Yolo-Model", "best.pt")
+
+# (type, options) of detectores.crear() tried in order; the first one that can be
+# created here is benchmarked
+configuraciones = [
+    ("yolo", dict(ruta_pesos=ruta_pesos, backend="pytorch")),
+    ("yolo", dict(ruta_pesos=ruta_pesos, backend="onnxruntime")),
+    ("hough", dict()),
+]
+
+N_ARRANQUES = 3                 # Cold / warm runs timed (the median is reported)
+CLIENTES = [1, 2, 4]            # Concurrent clients of the throughput test
+FRAMES_POR_CLIENTE = 40
+N_FIBRAS = 200
+
+ruta_socket = os.path.join(tempfile.gettempdir(), "ptv-deteccion-benchmark.sock")
+ruta_reporte = "Particle-Tracking-Velocimetry/detection_server_benchmark.json"
+
+# =============================================================================
+# 2) HELPERS
+# =============================================================================
+
+def cronometrar(codigo):
+    """
+    Wall time (seconds) of a fresh interpreter running `codigo`, or None if it fails.
+    """
+    inicio = time.perf_counter()
+    proceso = subprocess.run([sys.executable, "-c", codigo], cwd=DIRECTORIO, capture_output=True, text=True)
+    if proceso.returncode != 0:
+        print(proceso.stderr.strip().splitlines()[-1])
+        return None
+    return time.perf_counter() - inicio
+
+
+def codigo_frio(tipo, opciones, ruta_imagen):
+    return (
+        "import cv2, detectores\n"
+        f"d = detectores.crear({tipo!r}, **{opciones!r})\n"
+        f"imagen = cv2.imread({ruta_imagen!r})\n"
+        "d['detectar_lote']([imagen if d['entrada'] == 'bgr' else cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)])\n"
+    )
+
+
+def codigo_caliente(ruta_imagen):
+    return (
+        "import servidor_deteccion\n"
+        f"c = servidor_deteccion.conectar({ruta_socket!r})\n"
+        f"servidor_deteccion.detectar(c, rutas=[{ruta_imagen!r}])\n"
+        "servidor_deteccion.cerrar(c)\n"
+    )
+
+
+def codigo_servidor(tipo, opciones):
+    return (
+        "import servidor_deteccion\n"
+        f"servidor_deteccion.servir({ruta_socket!r}, {tipo!r}, **{opciones!r})\n"
+    )
+
+
+def rendimiento(frames, n_clientes):
+    """
+    Frames per second served to n_clientes threads, each with its own connection,
+    sending its frames one per request through shared memory.
+    """
+    clientes = [servidor_deteccion.conectar(ruta_socket) for _ in range(n_clientes)]
+
+    def enviar_frames(cliente):
+        for frame in frames[:FRAMES_POR_CLIENTE]:
+            servidor_deteccion.detectar(cliente, frames=[frame])
+
+    hilos = [threading.Thread(target=enviar_frames, args=(c,)) for c in clientes]
+    inicio = time.perf_counter()
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+    segundos = time.perf_counter() - inicio
+    for c in clientes:
+        servidor_deteccion.cerrar(c)
+    return n_clientes * FRAMES_POR_CLIENTE / segundos
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    imagenes, _ = video_sintetico.generar_video(N_FIBRAS, FRAMES_POR_CLIENTE, fondo=video_sintetico.fondo_estructurado())
+    frames = [cv2.cvtColor(g, cv2.COLOR_GRAY2BGR) for g in imagenes]
+    with tempfile.TemporaryDirectory() as carpeta:
+        ruta_imagen = os.path.join(carpeta, "frame.jpg")
+        cv2.imwrite(ruta_imagen, frames[0])
+
+        for tipo, opciones in configuraciones:
+            print(f"--- {tipo} {opciones}")
+            frio = []
+            while len(frio) < N_ARRANQUES and None not in frio:
+                frio.append(cronometrar(codigo_frio(tipo, opciones, ruta_imagen)))
+            if None not in frio:
+                break
+            print("omitido")
+        else:
+            print("Ningún detector disponible")
+            return
+
+        servidor = subprocess.Popen([sys.executable, "-c", codigo_servidor(tipo, opciones)], cwd=DIRECTORIO)
+        try:
+            inicio = time.perf_counter()
+            servidor_deteccion.cerrar(servidor_deteccion.conectar(ruta_socket, espera_s=300))
+            arranque_servidor = time.perf_counter() - inicio
+            caliente = [cronometrar(codigo_caliente(ruta_imagen)) for _ in range(N_ARRANQUES)]
+            por_clientes = {n: rendimiento(frames, n) for n in CLIENTES}
+        finally:
+            servidor.send_signal(signal.SIGINT)
+            servidor.wait()
+
+    print(f"Arranque del servidor (una vez): {arranque_servidor:.2f} s")
+    print(f"Ejecución en frío:    {np.median(frio):.2f} s")
+    print(f"Cliente del servidor: {np.median(caliente):.2f} s")
+    for n, fps in por_clientes.items():
+        print(f"{n} cliente(s): {fps:6.1f} frames/s")
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "tipo": tipo,
+            "opciones": opciones,
+            "segundos_arranque_servidor": arranque_servidor,
+            "segundos_frio": frio,
+            "segundos_cliente": caliente,
+            "frames_por_segundo": por_clientes,
+        }, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
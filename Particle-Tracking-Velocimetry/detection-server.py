@@ -0,0 +1,36 @@
+import logging
+
+import servidor_deteccion
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Detector held warm by the server (type and options of detectores.crear()). Clients
+# connect with servidor_deteccion.conectar(ruta_socket); the YOLO ptv() notebook does
+# it when its socket_servidor variable is set to this path.
+ruta_socket = servidor_deteccion.RUTA_SOCKET
+tipo = "yolo"
+opciones = dict(
+    ruta_pesos="Particle-Tracking-Velocimetry/YOLO/Yolo-Model/best.pt",
+    backend="pytorch",   # "pytorch", "onnxruntime" or "openvino"
+    int8=False,
+    mascaras=False,
+)
+
+tamano_lote = servidor_deteccion.TAMANO_LOTE        # Most frames per detection call
+espera_lote_ms = servidor_deteccion.ESPERA_LOTE_MS  # Wait for other requests to share a batch
+
+nivel_log = "INFO"
+
+# =============================================================================
+# 2) MAIN
+# =============================================================================
+
+def main():
+    logging.basicConfig(level=nivel_log, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    servidor_deteccion.servir(
+        ruta_socket, tipo, tamano_lote=tamano_lote, espera_lote_ms=espera_lote_ms, **opciones
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import deteccion_hough
+import metricas_deteccion
+import yolo_inferencia
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Labeled splits the detectors are scored on
+splits = ["valid", "test"]
+
+# (name, backend, options) of every detector configuration. Hough options are the
+# Canny / Hough parameters, the pyramid levels (0 = full resolution) and whether the
+# parallel segments of the same fiber are merged (deteccion_hough.fusionar_duplicados());
+# YOLO options are the ONNX export of the fine-tuned weights and the inference backend.
+PARAMETROS_ORIGINALES = dict(   # Defaults of detect_lines_and_properties()
+    canny_threshold1=50,
+    canny_threshold2=150,
+    hough_threshold=20,
+    min_line_length=50,
+    max_line_gap=5
+)
+ruta_pesos = "Particle-Tracking-Velocimetry/YOLO/Yolo-Model/best.pt"
+
+configuraciones = [
+    ("hough-ptv", "hough", dict(parametros=deteccion_hough.PARAMETROS_HOUGH, niveles=0, fusionar=False)),
+    ("hough-ptv-fusionado", "hough", dict(parametros=deteccion_hough.PARAMETROS_HOUGH, niveles=0, fusionar=True)),
+    ("hough-piramide", "hough", dict(parametros=deteccion_hough.PARAMETROS_HOUGH, niveles=1, fusionar=False)),
+    ("hough-original", "hough", dict(parametros=PARAMETROS_ORIGINALES, niveles=0, fusionar=False)),
+    ("yolo-onnxruntime-fp32", "yolo", dict(backend="onnxruntime", int8=False, mascaras=True)),
+    ("yolo-onnxruntime-int8", "yolo", dict(backend="onnxruntime", int8=True, mascaras=True)),
+]
+
+# Largest mean segment-to-polygon distance of a match (pixels)
+UMBRAL_DISTANCIA = metricas_deteccion.UMBRAL_SEGMENTO
+
+IMAGENES_POR_TAREA = 8   # Images per process-pool task
+HILOS_YOLO = 1           # Intra-op threads per YOLO worker (processes already use the CPUs)
+procesos = None          # Worker processes (None = all CPUs)
+
+ruta_reporte = "Particle-Tracking-Velocimetry/detector_accuracy_benchmark.json"
+
+# =============================================================================
+# 2) DETECTORS (run in the worker processes)
+# =============================================================================
+
+_SESIONES = {}
+
+
+def _detector(backend, opciones):
+    """
+    Returns detectar(imagen BGR) -> (segments (N, 4), angles (N,), boxes, scores).
+    """
+    if backend == "hough":
+        def detectar(imagen):
+            gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+            if opciones["niveles"] > 0:
+                detecciones = deteccion_hough.detectar_piramide(gris, parametros=opciones["parametros"],
+                                                                niveles=opciones["niveles"])
+            else:
+                detecciones = deteccion_hough.detectar(gris, parametros=opciones["parametros"])
+            if opciones["fusionar"]:
+                detecciones = deteccion_hough.fusionar_duplicados(*detecciones)
+            _, angles, _, boxes = detecciones
+            boxes = np.asarray(boxes, dtype=float).reshape(-1, 4)
+            return boxes, np.asarray(angles, dtype=float), None, None
+        return detectar
+
+    if backend == "yolo":
+        clave = (opciones["backend"], opciones["int8"])
+        if clave not in _SESIONES:
+            ruta_onnx = yolo_inferencia.exportar_onnx(ruta_pesos, int8=opciones["int8"])
+            _SESIONES[clave] = yolo_inferencia.crear_sesion(ruta_onnx, opciones["backend"], hilos=HILOS_YOLO)
+        sesion = _SESIONES[clave]
+
+        def detectar(imagen):
+            boxes, scores, propiedades = yolo_inferencia.predecir(sesion, imagen, mascaras=opciones["mascaras"])
+            return metricas_deteccion.segmentos_desde_propiedades(propiedades), propiedades[:, 2], boxes, scores
+        return detectar
+
+    raise ValueError(f"Unknown detector backend: {backend}")
+
+
+def ejecutar_tarea(tarea):
+    """
+    Runs one configuration over a chunk of images.
+
+    Returns:
+        list: (segments, angles, boxes, scores, milliseconds) of every image, or the
+        error message when the backend is not available.
+    """
+    backend, opciones, rutas = tarea
+    try:
+        detectar = _detector(backend, opciones)
+    except (ImportError, FileNotFoundError, OSError) as e:
+        return f"{type(e).__name__}: {e}"
+    salidas = []
+    for ruta in rutas:
+        imagen = cv2.imread(ruta)
+        inicio = time.perf_counter()
+        segmentos, angulos, boxes, scores = detectar(imagen)
+        salidas.append((segmentos, angulos, boxes, scores, (time.perf_counter() - inicio) * 1e3))
+    return salidas
+
+# =============================================================================
+# 3) GROUND TRUTH
+# =============================================================================
+
+def cargar_verdad():
+    """
+    Image paths, labeled polygons with their axis angles, and label boxes of the splits.
+    """
+    rutas, verdades, cajas = [], [], []
+    for split in splits:
+        for ruta_imagen, ruta_etiqueta in metricas_deteccion.listar_split(split):
+            alto, ancho = cv2.imread(ruta_imagen, cv2.IMREAD_UNCHANGED).shape[:2]
+            poligonos = metricas_deteccion.leer_etiquetas(ruta_etiqueta, ancho, alto)
+            boxes = metricas_deteccion.cajas_desde_poligonos(poligonos)
+            angulos = yolo_inferencia.propiedades_desde_poligonos(poligonos, boxes)[:, 2]
+            rutas.append(ruta_imagen)
+            verdades.append((poligonos, angulos))
+            cajas.append(boxes)
+    return rutas, verdades, cajas
+
+# =============================================================================
+# 4) MAIN
+# =============================================================================
+
+def main():
+    rutas, verdades, cajas = cargar_verdad()
+    print(f"{len(rutas)} imágenes etiquetadas ({', '.join(splits)}), {sum(len(p) for p, _ in verdades)} fibras")
+
+    # Every (configuration, chunk) pair is one task, so all configurations share the pool
+    tareas, origen = [], []
+    for k, (_, backend, opciones) in enumerate(configuraciones):
+        for a in range(0, len(rutas), IMAGENES_POR_TAREA):
+            tareas.append((backend, opciones, rutas[a:a + IMAGENES_POR_TAREA]))
+            origen.append(k)
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(ejecutar_tarea, tareas))
+
+    filas = []
+    for k, (nombre, backend, opciones) in enumerate(configuraciones):
+        partes = [r for r, o in zip(resultados, origen) if o == k]
+        errores = [r for r in partes if isinstance(r, str)]
+        if errores:
+            print(f"{nombre}: omitido ({errores[0]})")
+            filas.append({"configuracion": nombre, "backend": backend, "omitido": errores[0]})
+            continue
+        salidas = [s for r in partes for s in r]
+        latencias = np.array([s[4] for s in salidas])
+        fila = {
+            "configuracion": nombre,
+            "backend": backend,
+            "latencia_media_ms": float(latencias.mean()),
+            "latencia_p95_ms": float(np.percentile(latencias, 95)),
+            "detecciones_por_imagen": float(np.mean([len(s[0]) for s in salidas])),
+            **metricas_deteccion.evaluar_segmentos([(s[0], s[1]) for s in salidas], verdades, UMBRAL_DISTANCIA),
+        }
+        if backend == "yolo":
+            # Detectors with boxes and scores also get the box mAP of yolo-backend-benchmark.py
+            fila["cajas"] = metricas_deteccion.evaluar_cajas([(s[2], s[3]) for s in salidas], cajas)
+        filas.append(fila)
+
+    # --- Table: speed against accuracy ---
+    print(f"\n{'configuración':<24}{'ms/img':>8}{'p95 ms':>8}{'det/img':>9}{'precisión':>11}{'recall':>8}"
+          f"{'F1':>7}{'err. ángulo':>13}")
+    for fila in filas:
+        if "omitido" in fila:
+            continue
+        error = fila["error_angular_medio"]
+        print(
+            f"{fila['configuracion']:<24}{fila['latencia_media_ms']:>8.1f}{fila['latencia_p95_ms']:>8.1f}"
+            f"{fila['detecciones_por_imagen']:>9.1f}{fila['precision']:>11.3f}{fila['recall']:>8.3f}"
+            f"{fila['f1']:>7.3f}{'-' if error is None else f'{error:.1f}°':>13}"
+        )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"splits": splits, "umbral_distancia_px": UMBRAL_DISTANCIA, "configuraciones": filas}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import json
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import detectores
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# A synthetic recording is written as JPG frames (the Dataset recordings are not in the
+# repository) and the detectors are run on it two ways: one full pass per detector,
+# each decoding the frames again, and a single detectores.ejecutar() pass that decodes
+# every frame once and runs the detectors concurrently on the shared buffers.
+N_FIBRAS = 200
+N_FRAMES = 120
+TAMANO_LOTE = detectores.TAMANO_LOTE
+
+ruta_pesos = "Particle-Tracking-Velocimetry/YOLO/Yolo-Model/best.pt"
+
+# (name, type, options) of the detectors compared on the same recording
+configuraciones = [
+    ("hough", "hough", dict()),
+    ("hough-piramide", "hough", dict(niveles_piramide=1)),
+    ("yolo-onnxruntime", "yolo", dict(ruta_pesos=ruta_pesos, backend="onnxruntime")),
+]
+
+ruta_reporte = "Particle-Tracking-Velocimetry/detectores_benchmark.json"
+
+# =============================================================================
+# 2) HELPERS
+# =============================================================================
+
+def escribir_video(carpeta):
+    imagenes, _ = video_sintetico.generar_video(N_FIBRAS, N_FRAMES, fondo=video_sintetico.fondo_estructurado())
+    rutas = []
+    for idx, gris in enumerate(imagenes):
+        ruta = os.path.join(carpeta, f"frame_{idx:05d}.jpg")
+        cv2.imwrite(ruta, cv2.cvtColor(gris, cv2.COLOR_GRAY2BGR))
+        rutas.append(ruta)
+    return rutas
+
+
+def crear_detectores():
+    """
+    Detectors of the configurations that can be created here (weights and runtime available).
+    """
+    creados = []
+    for nombre, tipo, opciones in configuraciones:
+        try:
+            creados.append(detectores.crear(tipo, nombre, **opciones))
+        except (ImportError, FileNotFoundError, OSError) as e:
+            print(f"{nombre}: omitido ({type(e).__name__}: {e})")
+    return creados
+
+
+def pasada(rutas, lista):
+    """
+    Runs detectores.ejecutar() over the recording.
+
+    Returns:
+        tuple: (seconds, {detector name: detection array of the whole recording}).
+    """
+    inicio = time.perf_counter()
+    partes = {d["nombre"]: [] for d in lista}
+    for _, salida in detectores.ejecutar(rutas, lista, tamano_lote=TAMANO_LOTE):
+        for nombre, detecciones in salida.items():
+            partes[nombre].append(detecciones)
+    return time.perf_counter() - inicio, {n: np.concatenate(p) for n, p in partes.items()}
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    lista = crear_detectores()
+    with tempfile.TemporaryDirectory() as carpeta:
+        rutas = escribir_video(carpeta)
+
+        # One pass per detector, as running each notebook separately
+        separadas, resultados = {}, {}
+        for detector in lista:
+            segundos, salida = pasada(rutas, [detector])
+            separadas[detector["nombre"]] = segundos
+            resultados.update(salida)
+            print(f"{detector['nombre']:<20} pasada propia: {segundos:6.2f} s, "
+                  f"{len(salida[detector['nombre']]) / len(rutas):.1f} detecciones/frame")
+
+        # Every detector on one shared decode pass
+        compartida, salida = pasada(rutas, lista)
+        iguales = all(np.array_equal(salida[n], resultados[n], equal_nan=True) for n in salida)
+
+        # Decode cost alone
+        inicio = time.perf_counter()
+        for ruta in rutas:
+            cv2.cvtColor(cv2.imread(ruta), cv2.COLOR_BGR2GRAY)
+        decodificacion = time.perf_counter() - inicio
+
+    total_separadas = sum(separadas.values())
+    print(f"\nDecodificación sola: {decodificacion:.2f} s ({len(rutas)} frames)")
+    print(f"Pasadas separadas:  {total_separadas:.2f} s")
+    print(f"Pasada compartida:  {compartida:.2f} s (x{total_separadas / compartida:.2f}), "
+          f"detecciones idénticas: {iguales}")
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "frames": len(rutas),
+            "fibras": N_FIBRAS,
+            "detectores": [d["nombre"] for d in lista],
+            "segundos_decodificacion": decodificacion,
+            "segundos_pasadas_separadas": separadas,
+            "segundos_pasada_compartida": compartida,
+            "detecciones_identicas": iguales,
+        }, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
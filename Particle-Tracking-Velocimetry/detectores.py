@@ -0,0 +1,253 @@
+# === DETECTORS ===
+#
+# Common interface of the fiber detectors used by the ptv() notebooks. A detector is a
+# dict with its name, the input it needs ("gris" or "bgr"), the period of its angles
+# and a "detectar_lote" callable that maps a list of decoded frames to one detection
+# array per frame, all with the COLUMNAS layout. Detectors are created by type from a registry (Hough and
+# YOLO here; registrar() adds more). ejecutar() decodes every frame of a recording
+# once and feeds the same read-only buffers to several detectors at the same time,
+# one thread per detector (cv2 and the inference runtimes release the GIL), so
+# comparing detectors on one recording costs a single decode pass.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+import deteccion_hough
+import fondo
+import yolo_inferencia
+
+# Detection array: one row per detection. The segment is the fiber end points for Hough
+# and the bounding box for YOLO (as the "boxes" of the notebooks); Hough has no score (NaN)
+COLUMNAS = ("frame", "cx", "cy", "angulo", "largo", "x1", "y1", "x2", "y2", "score")
+FRAME, CX, CY, ANGULO, LARGO, X1, Y1, X2, Y2, SCORE = range(len(COLUMNAS))
+
+TAMANO_LOTE = 8   # Frames decoded and detected at once by ejecutar()
+
+_TIPOS = {}
+
+
+# --------------------------------------------------------------------------------
+# 1) DETECTION ARRAYS
+# --------------------------------------------------------------------------------
+
+def tabla(propiedades, boxes, scores=None, frame=0):
+    """
+    Detection array of one frame from an (N, 4) [cx, cy, angle, length] table, the
+    (N, 4) segments and the (N,) scores (None = NaN).
+    """
+    propiedades = np.asarray(propiedades, dtype=np.float64).reshape(-1, 4)
+    salida = np.empty((len(propiedades), len(COLUMNAS)))
+    salida[:, FRAME] = frame
+    salida[:, CX:LARGO + 1] = propiedades
+    salida[:, X1:Y2 + 1] = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    salida[:, SCORE] = np.nan if scores is None else np.asarray(scores, dtype=np.float64)
+    return salida
+
+
+def vacio():
+    return np.zeros((0, len(COLUMNAS)))
+
+
+def por_frame(detecciones, frames):
+    """
+    Splits a batched detection array (sorted by frame) into one array per frame.
+    """
+    cortes = np.searchsorted(detecciones[:, FRAME], np.asarray(frames)[1:], side="left")
+    return np.split(detecciones, cortes)
+
+
+def propiedades(detecciones):
+    """
+    (centroids, angles, max_lengths, boxes) lists of one frame, as the notebooks pass
+    them to tracking.procesar_frame() and draw them (integer end points).
+    """
+    return (
+        detecciones[:, CX:CY + 1].tolist(),
+        detecciones[:, ANGULO].tolist(),
+        detecciones[:, LARGO].tolist(),
+        np.round(detecciones[:, X1:Y2 + 1]).astype(int).tolist(),
+    )
+
+
+# --------------------------------------------------------------------------------
+# 2) REGISTRY
+# --------------------------------------------------------------------------------
+
+def registrar(tipo, constructor):
+    """
+    Registers a detector type: constructor(**opciones) -> detector dict (see crear()).
+    """
+    _TIPOS[tipo] = constructor
+
+
+def tipos():
+    return sorted(_TIPOS)
+
+
+def crear(tipo, nombre=None, **opciones):
+    """
+    Creates a detector of a registered type ("hough", "yolo", ...).
+
+    Returns:
+        dict: "nombre", "tipo", "entrada" ("gris" or "bgr"), "periodo_angulo" (360,
+        or 180 for axial angles such as the mask angles; see tracking.configurar())
+        and "detectar_lote", a callable that maps a list of frames to a list of
+        (N, len(COLUMNAS)) arrays.
+    """
+    if tipo not in _TIPOS:
+        raise ValueError(f"Unknown detector type: {tipo} (registered: {', '.join(tipos())})")
+    detector = _TIPOS[tipo](**opciones)
+    detector.setdefault("periodo_angulo", 360)
+    detector["tipo"] = tipo
+    detector["nombre"] = nombre or tipo
+    return detector
+
+
+def _hough(roi=None, parametros=deteccion_hough.PARAMETROS_HOUGH, niveles_piramide=0,
+           fondo_estatico=None, umbral_fondo=fondo.UMBRAL_PRIMER_PLANO, fusionar=False):
+    def detectar_lote(grises):
+        salidas = []
+        for gris in grises:
+            centroids, angles, lengths, boxes = deteccion_hough.detectar_piramide(
+                gris, roi, parametros, niveles_piramide, fondo_estatico, umbral_fondo
+            )
+            if fusionar:
+                centroids, angles, lengths, boxes = deteccion_hough.fusionar_duplicados(centroids, angles, lengths, boxes)
+            salidas.append(tabla(np.column_stack([centroids.reshape(-1, 2), angles, lengths]), boxes))
+        return salidas
+    return {"entrada": "gris", "detectar_lote": detectar_lote}
+
+
+def _yolo(ruta_pesos, backend="onnxruntime", int8=False, hilos=None, conf=yolo_inferencia.CONF, mascaras=False,
+          modo="completo", forma=None, roi=yolo_inferencia.ROI_FIBRAS, tamano_tesela=yolo_inferencia.TAMANO_TESELA,
+          solape_tesela=yolo_inferencia.SOLAPE_TESELA, verbose=False, fondo_estatico=None,
+          umbral_fondo=fondo.UMBRAL_PRIMER_PLANO):
+    # modo: "completo" (whole frame), "roi" (crop to the ROI window) or "teselas" (batched
+    # ROI tiles). Crops and tiles run at the input size that keeps the full-frame pixel
+    # scale, which depends on the frame shape (forma)
+    imgsz = yolo_inferencia.IMGSZ
+    if modo != "completo":
+        if forma is None:
+            raise ValueError(f"The {modo} mode needs the frame shape (forma)")
+        x0, y0, x1, y1 = yolo_inferencia.ventana_roi(roi, forma)
+        lado = max(x1 - x0, y1 - y0) if modo == "roi" else tamano_tesela
+        imgsz = yolo_inferencia.imgsz_equivalente(lado, forma)
+
+    if backend == "pytorch":
+        from ultralytics import YOLO
+
+        predecir_lote = yolo_inferencia.lote_pytorch(YOLO(ruta_pesos), imgsz, conf=conf, verbose=verbose,
+                                                     mascaras=mascaras)
+    elif modo == "completo":
+        sesion = yolo_inferencia.crear_sesion(yolo_inferencia.exportar_onnx(ruta_pesos, int8=int8), backend, hilos=hilos)
+
+        # The full-frame export has a static batch of one
+        def predecir_lote(imagenes):
+            return [yolo_inferencia.predecir(sesion, imagen, conf=conf, mascaras=mascaras) for imagen in imagenes]
+    else:
+        ruta_onnx = yolo_inferencia.exportar_onnx(ruta_pesos, imgsz=imgsz, int8=int8, dinamico=modo == "teselas")
+        predecir_lote = yolo_inferencia.lote_onnx(
+            yolo_inferencia.crear_sesion(ruta_onnx, backend, hilos=hilos, imgsz=imgsz), conf=conf, mascaras=mascaras
+        )
+
+    def detectar_lote(imagenes):
+        if fondo_estatico is not None:
+            imagenes = [fondo.enmascarar(imagen, fondo_estatico, umbral_fondo) for imagen in imagenes]
+        if modo == "roi":
+            resultados = [yolo_inferencia.predecir_recorte(predecir_lote, imagen, roi) for imagen in imagenes]
+        elif modo == "teselas":
+            resultados = [
+                yolo_inferencia.predecir_teselas(predecir_lote, imagen, roi, tamano_tesela, solape_tesela)
+                for imagen in imagenes
+            ]
+        else:
+            resultados = predecir_lote(imagenes)
+        return [tabla(p, boxes, scores) for boxes, scores, p in resultados]
+    return {"entrada": "bgr", "periodo_angulo": 180 if mascaras else 360, "detectar_lote": detectar_lote}
+
+
+registrar("hough", _hough)
+registrar("yolo", _yolo)
+
+
+# --------------------------------------------------------------------------------
+# 3) SHARED-DECODE RUNNER
+# --------------------------------------------------------------------------------
+
+def _decodificar(ruta, con_gris):
+    # Buffers are shared by every detector, so they are made read-only
+    imagen = cv2.imread(ruta, cv2.IMREAD_COLOR)
+    if imagen is None:
+        return None, None
+    imagen.flags.writeable = False
+    gris = None
+    if con_gris:
+        gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+        gris.flags.writeable = False
+    return imagen, gris
+
+
+def ejecutar(imagenes, detectores, tamano_lote=TAMANO_LOTE, hilos_decodificacion=None):
+    """
+    Runs several detectors over the same frames, decoding every frame once.
+
+    Frames are decoded (and converted to grayscale once, if some detector needs it) a
+    batch at a time in a thread pool, with the next batch decoded while the detectors
+    run on the current one. Each detector gets its own thread over the same read-only
+    buffers. Frames that cannot be read give no detections.
+
+    Args:
+        imagenes (list): Frame paths.
+        detectores (list): Detectors created by crear().
+        tamano_lote (int): Frames per batch.
+        hilos_decodificacion (int): Decoding threads (None = ThreadPoolExecutor default).
+
+    Yields:
+        tuple: (frame indices of the batch, {detector name: batched detection array
+        with the frame index in its "frame" column}).
+    """
+    nombres = [d["nombre"] for d in detectores]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError(f"Detector names must be unique: {nombres}")
+    gris = any(d["entrada"] == "gris" for d in detectores)
+    lotes = [list(range(a, min(a + tamano_lote, len(imagenes)))) for a in range(0, len(imagenes), tamano_lote)]
+
+    with ThreadPoolExecutor(max_workers=hilos_decodificacion) as decodificacion, \
+            ThreadPoolExecutor(max_workers=max(len(detectores), 1)) as deteccion:
+
+        def decodificar_lote(indices):
+            return [decodificacion.submit(_decodificar, imagenes[i], gris) for i in indices]
+
+        siguiente = decodificar_lote(lotes[0]) if lotes else None
+        for n, indices in enumerate(lotes):
+            frames = [f.result() for f in siguiente]
+            siguiente = decodificar_lote(lotes[n + 1]) if n + 1 < len(lotes) else None
+
+            validos = [k for k, (imagen, _) in enumerate(frames) if imagen is not None]
+            entradas = {
+                "bgr": [frames[k][0] for k in validos],
+                "gris": [frames[k][1] for k in validos],
+            }
+            futuros = {d["nombre"]: deteccion.submit(d["detectar_lote"], entradas[d["entrada"]]) for d in detectores}
+
+            salida = {}
+            for nombre, futuro in futuros.items():
+                por_imagen = futuro.result()
+                for k, detecciones in zip(validos, por_imagen):
+                    detecciones[:, FRAME] = indices[k]
+                salida[nombre] = np.concatenate(por_imagen) if por_imagen else vacio()
+            yield indices, salida
+
+
+def listar_imagenes(carpeta, numero_imagenes=None):
+    """
+    Sorted frame paths of a recording folder, as the ptv() notebooks list them.
+    """
+    imagenes = sorted(
+        os.path.join(carpeta, img) for img in os.listdir(carpeta)
+        if img.lower().endswith(('.jpg', '.png', '.bmp'))
+    )
+    return imagenes[:numero_imagenes]
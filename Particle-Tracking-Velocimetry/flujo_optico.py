@@ -0,0 +1,125 @@
+# === OPTICAL-FLOW PROPAGATION ===
+#
+# Between keyframes ptv() does not run the detector: the fibers tracked in the
+# previous image are moved with their alpha-beta-gamma prediction, refined by
+# sparse Lucas-Kanade flow on points sampled along each fiber. The propagated
+# fibers are returned as detections, so tracking.procesar_frame() associates them
+# exactly like the output of the detector.
+
+import cv2
+import numpy as np
+
+import tracking
+
+# Points sampled along each fiber (the two ends and the ones in between)
+PUNTOS_POR_FIBRA = 5
+
+# Lucas-Kanade parameters. At 200 fps fibers move a few pixels per frame and the
+# filter prediction is the initial flow, so a small window and a single pyramid
+# level suffice (about 4x faster than 15x15 with two levels and 20 iterations)
+VENTANA_LK = (11, 11)
+NIVELES_LK = 1
+CRITERIO_LK = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03)
+ERROR_MAXIMO_LK = 20.0  # Points with a larger LK error are considered lost
+
+# A fiber is dropped (until the next keyframe) when fewer of its points are tracked
+PUNTOS_MINIMOS = 2
+
+
+def es_keyframe(idx, cadencia, confianza, umbral_confianza):
+    """
+    Decides whether image idx (zero-based) runs the full detector: every `cadencia`
+    images, and whenever the last propagation tracked less than `umbral_confianza`
+    of its points.
+    """
+    return cadencia <= 1 or idx % cadencia == 0 or confianza < umbral_confianza
+
+
+def puntos_fibras(centroides, angulos, largos, n_puntos=PUNTOS_POR_FIBRA):
+    """
+    Points evenly spaced along each fiber segment.
+
+    Returns:
+        np.ndarray: (n_fibras, n_puntos, 2) float32 points.
+    """
+    t = np.linspace(-0.5, 0.5, n_puntos)
+    rad = np.radians(angulos)
+    direccion = np.stack([np.cos(rad), np.sin(rad)], axis=1)
+    puntos = centroides[:, None, :] + (largos[:, None] * t)[:, :, None] * direccion[:, None, :]
+    return puntos.astype(np.float32)
+
+
+def segmentos(centroides, angulos, largos):
+    """
+    Integer [x1, y1, x2, y2] end points of each fiber, as drawn for the detector output.
+    """
+    extremos = puntos_fibras(np.asarray(centroides, dtype=float).reshape(-1, 2), np.asarray(angulos, dtype=float),
+                             np.asarray(largos, dtype=float), 2)
+    return np.round(extremos.reshape(-1, 4)).astype(int).tolist()
+
+
+def propagar(gris_anterior, gris_actual, estado):
+    """
+    Moves the fibers tracked in the previous image to the current one.
+
+    The last measurement of each fiber is sampled into points, which Lucas-Kanade
+    follows from the previous to the current image starting from the filter
+    prediction. The fiber moves with the median displacement of its tracked points
+    and takes the orientation of their principal axis; its length is kept.
+
+    Args:
+        gris_anterior (np.ndarray): Previous image, grayscale.
+        gris_actual (np.ndarray): Current image, grayscale.
+        estado (dict): Tracking state (see tracking.nuevo_estado()).
+
+    Returns:
+        centroids (np.ndarray): (M, 2) propagated centroids.
+        angles (np.ndarray): (M,) propagated angles (degrees).
+        max_lengths (np.ndarray): (M,) lengths.
+        confianza (float): Fraction of the sampled points that were tracked.
+    """
+    fibras = estado["fibras_imagen_actual"]
+    if not fibras:
+        return np.zeros((0, 2)), np.zeros(0), np.zeros(0), 0.0
+
+    dictionary = estado["dictionary"]
+    centroides = np.array([dictionary[f]["centroide"][-1] for f in fibras], dtype=float)
+    angulos = np.array([dictionary[f]["angulo"][-1][0] for f in fibras], dtype=float)
+    largos = np.array([dictionary[f]["largo_maximo"][-1][0] for f in fibras], dtype=float)
+
+    # Displacement expected by the filter, used as the initial flow
+    prediccion, _, _ = tracking.fibras_previstas(estado)
+    desplazamiento_previsto = prediccion - centroides
+
+    p0 = puntos_fibras(centroides, angulos, largos)
+    n_fibras, n_puntos, _ = p0.shape
+    p1 = (p0 + desplazamiento_previsto[:, None, :].astype(np.float32)).reshape(-1, 1, 2)
+    p1, status, error = cv2.calcOpticalFlowPyrLK(
+        gris_anterior, gris_actual, p0.reshape(-1, 1, 2), p1.copy(),
+        winSize=VENTANA_LK, maxLevel=NIVELES_LK, criteria=CRITERIO_LK, flags=cv2.OPTFLOW_USE_INITIAL_FLOW
+    )
+    p1 = p1.reshape(n_fibras, n_puntos, 2).astype(float)
+    ok = ((status.ravel() == 1) & (error.ravel() < ERROR_MAXIMO_LK)).reshape(n_fibras, n_puntos)
+    n_ok = ok.sum(axis=1)
+
+    # Median displacement of the tracked points of each fiber
+    desplazamiento = np.where(ok[:, :, None], p1 - p0, np.nan)
+    vivas = n_ok >= PUNTOS_MINIMOS
+    nuevos_centroides = centroides[vivas] + np.nanmedian(desplazamiento[vivas], axis=1)
+
+    # Principal axis of the tracked points, folded onto the previous angle (a fiber
+    # has no head, so only its direction modulo 180 degrees is measured) and wrapped
+    # into the tracker's angle range
+    peso = ok[vivas].astype(float)
+    q = p1[vivas]
+    media = (q * peso[:, :, None]).sum(axis=1) / n_ok[vivas, None]
+    d = (q - media[:, None, :]) * peso[:, :, None]
+    sxx = (d[:, :, 0] ** 2).sum(axis=1)
+    syy = (d[:, :, 1] ** 2).sum(axis=1)
+    sxy = (d[:, :, 0] * d[:, :, 1]).sum(axis=1)
+    eje = 0.5 * np.degrees(np.arctan2(2 * sxy, sxx - syy))
+    previos = angulos[vivas]
+    nuevos_angulos = tracking._normalizar_vector(previos + ((eje - previos + 90.0) % 180.0 - 90.0))
+
+    confianza = float(ok.mean())
+    return nuevos_centroides, nuevos_angulos, largos[vivas], confianza
@@ -0,0 +1,110 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import deteccion_hough
+import fondo
+import tracking
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+FIBRAS = [25, 100, 400]
+N_FRAMES = 80
+
+# A segment is spurious when one of its ends is farther than this from every fiber (pixels)
+TOLERANCIA_ESPURIO = 4.0
+
+ruta_reporte = "Particle-Tracking-Velocimetry/fondo_benchmark.json"
+
+# =============================================================================
+# 2) SCORING
+# =============================================================================
+
+def distancia_a_segmentos(puntos, segmentos):
+    """
+    Distance of each point (P, 2) to the nearest segment (S, 4).
+    """
+    a, b = segmentos[None, :, :2], segmentos[None, :, 2:]
+    p = puntos[:, None, :]
+    ab = b - a
+    t = np.clip(((p - a) * ab).sum(axis=2) / np.maximum((ab ** 2).sum(axis=2), 1e-9), 0, 1)
+    return np.linalg.norm(p - (a + t[:, :, None] * ab), axis=2).min(axis=1)
+
+
+def espurios(boxes, fibras):
+    """
+    Detected segments (N, 4) with an end farther than TOLERANCIA_ESPURIO from every fiber.
+    """
+    if not len(boxes):
+        return 0
+    d1 = distancia_a_segmentos(boxes[:, :2].astype(float), fibras)
+    d2 = distancia_a_segmentos(boxes[:, 2:].astype(float), fibras)
+    return int(np.count_nonzero(np.maximum(d1, d2) > TOLERANCIA_ESPURIO))
+
+# =============================================================================
+# 3) RUN
+# =============================================================================
+
+def ejecutar(imagenes, verdad, fondo_estatico=None):
+    estado = tracking.nuevo_estado()
+    tiempos = np.empty(len(imagenes))
+    segmentos, falsos = 0, 0
+    for idx, (gris, (posiciones, angulos, largos)) in enumerate(zip(imagenes, verdad)):
+        inicio = time.perf_counter()
+        centroids, angles, lengths, boxes = deteccion_hough.detectar(gris, fondo_estatico=fondo_estatico)
+        tiempos[idx] = time.perf_counter() - inicio
+        segmentos += len(boxes)
+        falsos += espurios(boxes, video_sintetico.segmentos(posiciones, angulos, largos).astype(float))
+        tracking.procesar_frame(estado, idx, centroids.tolist(), angles.tolist(), lengths.tolist())
+    n = len(imagenes)
+    return {
+        "ms_deteccion_mediana": float(np.median(tiempos) * 1e3),
+        "segmentos_por_frame": segmentos / n,
+        "espurios_por_frame": falsos / n,
+        "tracks_creados": estado["current_fiber_id"],
+    }
+
+# =============================================================================
+# 4) MAIN
+# =============================================================================
+
+def main():
+    fondo_real = video_sintetico.fondo_estructurado()
+    resultados = []
+    for n_fibras in FIBRAS:
+        imagenes, verdad = video_sintetico.generar_video(n_fibras, N_FRAMES, fondo=fondo_real)
+
+        inicio = time.perf_counter()
+        fondo_estimado = fondo.percentil_por_bloques(iter(imagenes))
+        segundos_fondo = time.perf_counter() - inicio
+        error_fondo = float(np.abs(fondo_estimado.astype(float) - fondo_real).mean())
+
+        sin = ejecutar(imagenes, verdad)
+        con = ejecutar(imagenes, verdad, fondo_estimado)
+        r = {
+            "fibras": n_fibras,
+            "segundos_estimacion_fondo": segundos_fondo,
+            "error_fondo_gris": error_fondo,
+            "sin_fondo": sin,
+            "con_fondo": con,
+        }
+        resultados.append(r)
+        print(
+            f"fibras={n_fibras:>4} fondo: {segundos_fondo:5.2f} s, error {error_fondo:4.1f} niveles\n"
+            f"    sin fondo: {sin['ms_deteccion_mediana']:6.2f} ms, {sin['segmentos_por_frame']:6.1f} segmentos/frame, "
+            f"{sin['espurios_por_frame']:6.1f} espurios/frame, {sin['tracks_creados']} tracks\n"
+            f"    con fondo: {con['ms_deteccion_mediana']:6.2f} ms, {con['segmentos_por_frame']:6.1f} segmentos/frame, "
+            f"{con['espurios_por_frame']:6.1f} espurios/frame, {con['tracks_creados']} tracks"
+        )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"tolerancia_espurio": TOLERANCIA_ESPURIO, "resultados": resultados}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# === STATIC BACKGROUND ===
+#
+# The volumetric-illumination recordings have a static background (walls, the ROI
+# notch, reflections) that Canny and YOLO would otherwise see on every frame. The
+# background is estimated once per recording as a per-pixel percentile over a
+# sample of its frames, cached next to the results, and removed before detection.
+
+import json
+import logging
+import os
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("ptv")
+
+PERCENTIL = 50            # Per-pixel percentile taken as background (50 = median)
+MUESTRAS_FONDO = 200      # Frames sampled (evenly spaced) from the recording
+TAMANO_BLOQUE = 32        # Frames held in memory at once
+UMBRAL_PRIMER_PLANO = 15  # Gray levels a pixel must differ from the background to be foreground
+DILATACION = 5            # Foreground mask dilation (pixels) before masking images for YOLO
+
+
+def percentil_por_bloques(frames, percentil=PERCENTIL, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Streaming per-pixel percentile of a sequence of grayscale frames.
+
+    The frames are consumed in blocks of tamano_bloque; the percentile of each block is
+    kept and the result is the same percentile over the block estimates. Memory is
+    bounded by one block plus one image per block, and for a static background covered
+    by moving fibers a small fraction of the time both estimates agree.
+
+    Args:
+        frames (iterable): Grayscale uint8 frames of the same size.
+        percentil (float): Percentile in [0, 100].
+        tamano_bloque (int): Frames per block.
+
+    Returns:
+        np.ndarray: uint8 background image.
+    """
+    estimaciones, bloque = [], []
+
+    def cerrar_bloque():
+        pila = np.stack(bloque)
+        estimaciones.append(np.percentile(pila, percentil, axis=0).round().astype(np.uint8))
+        bloque.clear()
+
+    for frame in frames:
+        bloque.append(frame)
+        if len(bloque) == tamano_bloque:
+            cerrar_bloque()
+    if bloque:
+        cerrar_bloque()
+    if not estimaciones:
+        raise ValueError("No frames to estimate the background from")
+    if len(estimaciones) == 1:
+        return estimaciones[0]
+    return np.percentile(np.stack(estimaciones), percentil, axis=0).round().astype(np.uint8)
+
+
+def _muestra(imagenes, n_muestras):
+    # Evenly spaced frames, so slow illumination drifts are averaged over the recording
+    indices = np.unique(np.linspace(0, len(imagenes) - 1, min(n_muestras, len(imagenes))).round().astype(int))
+    return [imagenes[i] for i in indices]
+
+
+def estimar_fondo(imagenes, n_muestras=MUESTRAS_FONDO, percentil=PERCENTIL, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Background of a recording from a sample of its image files.
+
+    Args:
+        imagenes (list): Paths of the images of the recording.
+        n_muestras (int): Images sampled.
+        percentil (float): Per-pixel percentile taken as background.
+        tamano_bloque (int): Images held in memory at once.
+
+    Returns:
+        np.ndarray: uint8 grayscale background.
+    """
+    frames = (cv2.imread(ruta, cv2.IMREAD_GRAYSCALE) for ruta in _muestra(imagenes, n_muestras))
+    return percentil_por_bloques((f for f in frames if f is not None), percentil, tamano_bloque)
+
+
+def _clave(imagenes, n_muestras, percentil):
+    # Identifies the recording and the estimate: sampled files, their size and time
+    muestra = _muestra(imagenes, n_muestras)
+    archivos = [[os.path.basename(r), os.path.getsize(r), int(os.path.getmtime(r))] for r in muestra]
+    return json.dumps({"n": len(imagenes), "percentil": percentil, "archivos": archivos})
+
+
+def cargar_o_estimar(imagenes, ruta_cache, n_muestras=MUESTRAS_FONDO, percentil=PERCENTIL,
+                     tamano_bloque=TAMANO_BLOQUE):
+    """
+    Background of a recording, read from ruta_cache (.npz) when it was estimated
+    from the same images and parameters, and estimated and cached otherwise.
+    """
+    clave = _clave(imagenes, n_muestras, percentil)
+    if os.path.exists(ruta_cache):
+        with np.load(ruta_cache) as datos:
+            if str(datos["clave"]) == clave:
+                logger.info("Background read from %s", ruta_cache)
+                return datos["fondo"]
+
+    fondo = estimar_fondo(imagenes, n_muestras, percentil, tamano_bloque)
+    os.makedirs(os.path.dirname(os.path.abspath(ruta_cache)), exist_ok=True)
+    np.savez_compressed(ruta_cache, fondo=fondo, clave=np.array(clave))
+    logger.info("Background estimated from %d images and saved to %s", min(n_muestras, len(imagenes)), ruta_cache)
+    return fondo
+
+
+def primer_plano(gris, fondo, umbral=UMBRAL_PRIMER_PLANO):
+    """
+    Absolute difference to the background, zeroed below umbral. Static edges vanish and
+    the fibers keep their contrast, so the result goes straight to Canny.
+    """
+    diferencia = cv2.absdiff(gris, fondo)
+    _, diferencia = cv2.threshold(diferencia, umbral, 255, cv2.THRESH_TOZERO)
+    return diferencia
+
+
+def mascara_primer_plano(gris, fondo, umbral=UMBRAL_PRIMER_PLANO, dilatacion=DILATACION):
+    """
+    uint8 mask (255 on foreground) dilated by dilatacion pixels.
+    """
+    mascara = (cv2.absdiff(gris, fondo) > umbral).astype(np.uint8) * 255
+    if dilatacion > 0:
+        nucleo = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (2 * dilatacion + 1, 2 * dilatacion + 1))
+        mascara = cv2.dilate(mascara, nucleo)
+    return mascara
+
+
+def enmascarar(imagen, fondo, umbral=UMBRAL_PRIMER_PLANO, dilatacion=DILATACION):
+    """
+    Copy of a BGR image with the background replaced by a flat gray (the mean of the
+    background), for detectors such as YOLO that need the original appearance of the
+    fibers.
+    """
+    gris = cv2.cvtColor(imagen, cv2.COLOR_BGR2GRAY)
+    mascara = mascara_primer_plano(gris, fondo, umbral, dilatacion)
+    salida = np.empty_like(imagen)
+    salida[:] = int(round(cv2.mean(fondo)[0]))
+    cv2.copyTo(imagen, mascara, salida)
+    return salida
@@ -0,0 +1,90 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import deteccion_hough
+import tracking
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Full-frame sweep periods compared against full-frame detection on every image
+BARRIDOS = [5, 10, 20]
+HILOS = [1, None]  # Window threads (None = ThreadPoolExecutor default)
+
+FIBRAS = [25, 100, 400]
+N_FRAMES = 80
+
+ruta_reporte = "Particle-Tracking-Velocimetry/hough_local_benchmark.json"
+
+# =============================================================================
+# 2) RUN
+# =============================================================================
+
+def ejecutar(imagenes, barrido=None, hilos=None):
+    """
+    Runs Hough detection plus tracking over the recording: full-frame on every image
+    (barrido=None) or track-guided with a full-frame sweep every `barrido` images.
+
+    Returns:
+        tiempos (np.ndarray): Detection seconds per frame.
+        salidas (list): (centroids, track IDs) of each frame.
+        fraccion (float): Mean fraction of the image searched per frame.
+    """
+    estado = tracking.nuevo_estado()
+    tiempos = np.empty(len(imagenes))
+    salidas, pixeles = [], []
+    for idx, gris in enumerate(imagenes):
+        inicio = time.perf_counter()
+        if barrido is None or deteccion_hough.es_barrido_completo(idx, estado, barrido):
+            centroids, angles, lengths, _ = deteccion_hough.detectar(gris)
+            pixeles.append(gris.size)
+        else:
+            centroids, angles, lengths, _, n = deteccion_hough.detectar_local(gris, estado, hilos=hilos)
+            pixeles.append(n)
+        tiempos[idx] = time.perf_counter() - inicio
+        ids = tracking.procesar_frame(estado, idx, centroids.tolist(), angles.tolist(), lengths.tolist())
+        orden = sorted(ids)
+        salidas.append((centroids[orden].reshape(-1, 2), [ids[i] for i in orden]))
+    return tiempos, salidas, float(np.mean(pixeles)) / imagenes[0].size
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    resultados = []
+    for n_fibras in FIBRAS:
+        imagenes, verdad = video_sintetico.generar_video(n_fibras, N_FRAMES)
+        configuraciones = [(None, None)] + [(b, h) for b in BARRIDOS for h in HILOS]
+        base = None
+        for barrido, hilos in configuraciones:
+            tiempos, salidas, fraccion = ejecutar(imagenes, barrido, hilos)
+            base = base or float(tiempos.sum())
+            r = {
+                "fibras": n_fibras,
+                "barrido_completo_cada": barrido,
+                "hilos": hilos,
+                "fraccion_pixeles": fraccion,
+                "ms_deteccion_mediana": float(np.median(tiempos) * 1e3),
+                "aceleracion": base / float(tiempos.sum()),
+                **video_sintetico.puntuar(salidas, verdad),
+            }
+            resultados.append(r)
+            print(
+                f"fibras={n_fibras:>4} barrido={str(barrido):>4} hilos={str(hilos):>4} -> "
+                f"{r['fraccion_pixeles']:6.1%} píxeles, {r['ms_deteccion_mediana']:6.2f} ms detección, "
+                f"x{r['aceleracion']:.2f}, cobertura={r['cobertura']:.3f}, "
+                f"cambios de ID/fibra={r['cambios_id_por_fibra']:.2f}"
+            )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"resultados": resultados}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
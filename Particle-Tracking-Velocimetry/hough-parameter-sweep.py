@@ -0,0 +1,254 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+import deteccion_hough
+import metricas_deteccion
+import yolo_inferencia
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Frames: the labeled split (scored against the labels), or a raw recording
+# (carpeta_grabacion, scored by detection-count stability only)
+split = "valid"
+carpeta_grabacion = None  # e.g. os.path.join("Particle-Tracking-Velocimetry", "Dataset", "25 Fibras", "Cam 1")
+numero_imagenes = 100
+
+# ROI polygon of the Hough ptv() (pts), masked as deteccion_hough.detectar() does before
+# Canny on raw recordings. The labeled split is resized to 1024x1024, so it is not masked
+roi = yolo_inferencia.ROI_FIBRAS
+
+# Grid. Edge maps depend only on the Canny setting, so they are computed once per
+# frame and setting, cached on disk and reused by every HoughLinesP setting
+CANNY = [(50, 150), (100, 250), (150, 300)]
+HOUGH_THRESHOLD = [20, 40, 60]
+MIN_LINE_LENGTH = [15, 30, 50]
+MAX_LINE_GAP = [2, 5, 10]
+
+# Current hand-picked setting of hough-transform.py and the Hough ptv()
+ACTUAL = (100, 250, 40, 30, 5)
+
+# A detection agrees with a labeled fiber when its centroid lies within this fraction of
+# the fiber length (at least DISTANCIA_MINIMA pixels) and its angle within ANGULO_MAXIMO
+FRACCION_DISTANCIA = 0.25
+DISTANCIA_MINIMA = 5.0
+ANGULO_MAXIMO = 10.0
+
+procesos = None  # Worker processes (None = all CPUs)
+
+carpeta_cache = os.path.join("Particle-Tracking-Velocimetry", "cache_bordes")
+ruta_reporte = "Particle-Tracking-Velocimetry/hough_parameter_sweep.json"
+
+# =============================================================================
+# 2) EDGE-MAP CACHE
+# =============================================================================
+
+def ruta_bordes(ruta_imagen, canny, enmascarado=False):
+    nombre = os.path.splitext(os.path.basename(ruta_imagen))[0]
+    carpeta = os.path.basename(os.path.dirname(os.path.dirname(ruta_imagen))) or "frames"
+    sufijo = "_roi" if enmascarado else ""
+    return os.path.join(carpeta_cache, carpeta, f"{nombre}_canny_{canny[0]}_{canny[1]}{sufijo}.npz")
+
+
+def cargar_bordes(ruta_imagen, gris, canny, mascara=None):
+    """
+    Canny edge map of a frame (masked with the ROI mask when given), read from the
+    cache when it was computed from the same file (size and modification time), and
+    computed and cached as a packed bitmap otherwise.
+
+    Returns:
+        bordes (np.ndarray): uint8 edge map (0 / 255).
+        ms_canny (float): Time Canny took when the map was computed.
+    """
+    ruta = ruta_bordes(ruta_imagen, canny, mascara is not None)
+    firma = np.array([os.path.getsize(ruta_imagen), int(os.path.getmtime(ruta_imagen))])
+    if os.path.exists(ruta):
+        with np.load(ruta) as datos:
+            if np.array_equal(datos["firma"], firma):
+                forma = tuple(datos["forma"])
+                bits = np.unpackbits(datos["bits"], count=forma[0] * forma[1])
+                return bits.reshape(forma) * np.uint8(255), float(datos["ms_canny"])
+
+    inicio = time.perf_counter()
+    if mascara is not None:
+        gris = cv2.bitwise_and(gris, mascara)
+    bordes = cv2.Canny(gris, canny[0], canny[1], apertureSize=3)
+    ms_canny = (time.perf_counter() - inicio) * 1e3
+    os.makedirs(os.path.dirname(ruta), exist_ok=True)
+    np.savez_compressed(
+        ruta, bits=np.packbits(bordes > 0), forma=np.array(bordes.shape), firma=firma, ms_canny=ms_canny
+    )
+    return bordes, ms_canny
+
+# =============================================================================
+# 3) EVALUATION OF ONE FRAME
+# =============================================================================
+
+def acuerdos(centroids, angles, tabla):
+    """
+    Greedy one-to-one agreement between detections and labeled fibers ([cx, cy, angle,
+    length] table), closest first.
+
+    Returns:
+        int: Number of labeled fibers with an agreeing detection.
+    """
+    if not len(centroids) or not len(tabla):
+        return 0
+    distancia = np.linalg.norm(tabla[:, None, :2] - centroids[None, :, :], axis=2)
+    angulo = np.abs((tabla[:, None, 2] - angles[None, :] + 90.0) % 180.0 - 90.0)
+    limite = np.maximum(FRACCION_DISTANCIA * tabla[:, 3], DISTANCIA_MINIMA)[:, None]
+    coste = np.where((distancia <= limite) & (angulo <= ANGULO_MAXIMO), distancia, np.inf)
+    fibra_libre = np.ones(coste.shape[0], dtype=bool)
+    deteccion_libre = np.ones(coste.shape[1], dtype=bool)
+    for i, j in zip(*np.unravel_index(np.argsort(coste, axis=None), coste.shape)):
+        if not np.isfinite(coste[i, j]):
+            break
+        if fibra_libre[i] and deteccion_libre[j]:
+            fibra_libre[i] = deteccion_libre[j] = False
+    return int((~fibra_libre).sum())
+
+
+def evaluar_frame(par):
+    """
+    Runs every HoughLinesP setting of the grid on one frame.
+
+    Returns:
+        list: (setting, detections, agreements, labeled fibers, ms Canny, ms Hough) per setting.
+    """
+    ruta_imagen, ruta_etiqueta = par
+    gris = cv2.imread(ruta_imagen, cv2.IMREAD_GRAYSCALE)
+    alto, ancho = gris.shape
+    tabla = np.zeros((0, 4))
+    if ruta_etiqueta is not None or carpeta_grabacion is None:
+        poligonos = metricas_deteccion.leer_etiquetas(ruta_etiqueta, ancho, alto)
+        tabla = yolo_inferencia.propiedades_desde_poligonos(poligonos, metricas_deteccion.cajas_desde_poligonos(poligonos))
+    mascara = deteccion_hough.mascara_roi(gris.shape, roi) if carpeta_grabacion is not None else None
+
+    filas = []
+    for canny in CANNY:
+        bordes, ms_canny = cargar_bordes(ruta_imagen, gris, canny, mascara)
+        for umbral, largo, hueco in itertools.product(HOUGH_THRESHOLD, MIN_LINE_LENGTH, MAX_LINE_GAP):
+            inicio = time.perf_counter()
+            lineas = cv2.HoughLinesP(
+                bordes, 1, np.pi / 180, threshold=umbral, minLineLength=largo, maxLineGap=hueco
+            )
+            ms_hough = (time.perf_counter() - inicio) * 1e3
+            if lineas is None:
+                centroids, angles = np.zeros((0, 2)), np.zeros(0)
+            else:
+                x1, y1, x2, y2 = lineas.reshape(-1, 4).T.astype(float)
+                centroids = np.stack([(x1 + x2) / 2, (y1 + y2) / 2], axis=1)
+                angles = np.degrees(np.arctan2(y2 - y1, x2 - x1))
+            filas.append(((*canny, umbral, largo, hueco), len(centroids), acuerdos(centroids, angles, tabla),
+                          len(tabla), ms_canny, ms_hough))
+    return filas
+
+# =============================================================================
+# 4) SCORING AND PARETO FRONT
+# =============================================================================
+
+def resumir(por_frame):
+    """
+    Aggregates the per-frame rows of every setting.
+
+    Quality is the F1 agreement with the labels when there are labels, and otherwise
+    the detection-count stability, 1 - mean |n_t - n_(t-1)| / mean n.
+    """
+    configuraciones = {}
+    for filas in por_frame:
+        for configuracion, n, aciertos, etiquetas, ms_canny, ms_hough in filas:
+            configuraciones.setdefault(configuracion, []).append((n, aciertos, etiquetas, ms_canny + ms_hough))
+
+    resultados = []
+    for configuracion, valores in configuraciones.items():
+        n, aciertos, etiquetas, ms = (np.array(v, dtype=float) for v in zip(*valores))
+        variacion = float(np.abs(np.diff(n)).mean() / max(n.mean(), 1e-9)) if len(n) > 1 else 0.0
+        r = {
+            "canny_threshold1": configuracion[0],
+            "canny_threshold2": configuracion[1],
+            "hough_threshold": configuracion[2],
+            "min_line_length": configuracion[3],
+            "max_line_gap": configuracion[4],
+            "ms_por_frame": float(ms.mean()),
+            "detecciones_por_frame": float(n.mean()),
+            "estabilidad_conteo": 1.0 - variacion,
+        }
+        if etiquetas.sum() > 0:
+            precision = aciertos.sum() / max(n.sum(), 1)
+            recall = aciertos.sum() / etiquetas.sum()
+            r.update(precision=float(precision), recall=float(recall),
+                     f1=float(2 * precision * recall / max(precision + recall, 1e-9)))
+        r["calidad"] = r.get("f1", r["estabilidad_conteo"])
+        resultados.append(r)
+    return resultados
+
+
+def frente_pareto(resultados):
+    """
+    Settings not beaten by any other in both quality (higher) and time (lower),
+    sorted by time.
+    """
+    orden = sorted(resultados, key=lambda r: (r["ms_por_frame"], -r["calidad"]))
+    frente, mejor = [], -np.inf
+    for r in orden:
+        if r["calidad"] > mejor:
+            frente.append(r)
+            mejor = r["calidad"]
+    return frente
+
+
+def describir(r):
+    return (
+        f"canny {r['canny_threshold1']:>3}/{r['canny_threshold2']:<3} umbral {r['hough_threshold']:>2} "
+        f"largo {r['min_line_length']:>2} hueco {r['max_line_gap']:>2} -> {r['ms_por_frame']:6.2f} ms/frame, "
+        f"calidad {r['calidad']:.3f}, {r['detecciones_por_frame']:6.1f} detecciones/frame"
+    )
+
+# =============================================================================
+# 5) MAIN
+# =============================================================================
+
+def main():
+    if carpeta_grabacion is None:
+        pares = metricas_deteccion.listar_split(split)[:numero_imagenes]
+    else:
+        imagenes = sorted(
+            os.path.join(carpeta_grabacion, f) for f in os.listdir(carpeta_grabacion)
+            if f.lower().endswith((".jpg", ".png", ".bmp"))
+        )
+        pares = [(imagen, None) for imagen in imagenes[:numero_imagenes]]
+    if not pares:
+        raise SystemExit("No hay imágenes para el barrido")
+
+    n_configuraciones = len(CANNY) * len(HOUGH_THRESHOLD) * len(MIN_LINE_LENGTH) * len(MAX_LINE_GAP)
+    print(f"{len(pares)} imágenes x {n_configuraciones} configuraciones")
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        por_frame = list(pool.map(evaluar_frame, pares, chunksize=4))
+    print(f"Barrido terminado en {time.perf_counter() - inicio:.1f} s")
+
+    resultados = resumir(por_frame)
+    frente = frente_pareto(resultados)
+    actual = next(r for r in resultados if (
+        r["canny_threshold1"], r["canny_threshold2"], r["hough_threshold"], r["min_line_length"], r["max_line_gap"]
+    ) == ACTUAL)
+
+    print("Configuración actual:")
+    print("    " + describir(actual))
+    print("Frente de Pareto (calidad vs. tiempo):")
+    for r in frente:
+        print("    " + describir(r))
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"actual": actual, "frente_pareto": frente, "resultados": resultados}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import deteccion_hough
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Pyramid levels compared (0 = full-resolution HoughLinesP, as detect_lines_and_properties())
+NIVELES = [0, 1, 2]
+
+FIBRAS = [25, 100, 400]
+N_FRAMES = 40
+
+# A ground-truth fiber is covered when the nearest detected centroid lies within
+# video_sintetico.RADIO_ACIERTO (6 pixels); the angle and length errors are measured
+# on the covered fibers only
+
+ruta_reporte = "Particle-Tracking-Velocimetry/hough_piramide_benchmark.json"
+
+# =============================================================================
+# 2) RUN AND SCORE
+# =============================================================================
+
+def ejecutar(imagenes, verdad, niveles):
+    """
+    Detects every image and matches each ground-truth fiber to the nearest detection
+    within video_sintetico.RADIO_ACIERTO (6 pixels between centroids).
+
+    Returns:
+        dict: Median time, detections per frame, coverage and angle / length errors.
+    """
+    tiempos = np.empty(len(imagenes))
+    detecciones, cubiertas, total = 0, 0, 0
+    errores_angulo, errores_largo = [], []
+    for idx, (gris, (posiciones, angulos, largos)) in enumerate(zip(imagenes, verdad)):
+        inicio = time.perf_counter()
+        centroids, angles, lengths, _ = deteccion_hough.detectar_piramide(gris, niveles=niveles)
+        tiempos[idx] = time.perf_counter() - inicio
+        detecciones += len(centroids)
+        total += len(posiciones)
+        if not len(centroids):
+            continue
+        distancias = np.linalg.norm(posiciones[:, None, :] - centroids[None, :, :], axis=2)
+        cercano = distancias.argmin(axis=1)
+        ok = distancias[np.arange(len(posiciones)), cercano] <= video_sintetico.RADIO_ACIERTO
+        cubiertas += int(ok.sum())
+        # Fibers have no head: angles are compared modulo 180 degrees
+        errores_angulo.extend(np.abs((angles[cercano] - angulos + 90.0) % 180.0 - 90.0)[ok])
+        errores_largo.extend(np.abs(lengths[cercano] - largos)[ok])
+    return {
+        "ms_deteccion_mediana": float(np.median(tiempos) * 1e3),
+        "detecciones_por_frame": detecciones / len(imagenes),
+        "cobertura": cubiertas / total,
+        "error_angulo_mediana": float(np.median(errores_angulo)) if errores_angulo else None,
+        "error_angulo_p90": float(np.percentile(errores_angulo, 90)) if errores_angulo else None,
+        "error_largo_mediana": float(np.median(errores_largo)) if errores_largo else None,
+    }
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    resultados = []
+    for n_fibras in FIBRAS:
+        imagenes, verdad = video_sintetico.generar_video(n_fibras, N_FRAMES)
+        base = None
+        for niveles in NIVELES:
+            r = {"fibras": n_fibras, "niveles": niveles, **ejecutar(imagenes, verdad, niveles)}
+            base = base or r["ms_deteccion_mediana"]
+            r["aceleracion"] = base / r["ms_deteccion_mediana"]
+            resultados.append(r)
+            # Errors are None when no fiber was covered
+            angulo, p90, largo = r["error_angulo_mediana"], r["error_angulo_p90"], r["error_largo_mediana"]
+            print(
+                f"fibras={n_fibras:>4} niveles={niveles} -> {r['ms_deteccion_mediana']:6.2f} ms (x{r['aceleracion']:.2f}), "
+                f"{r['detecciones_por_frame']:6.1f} detecciones/frame, cobertura={r['cobertura']:.3f}, "
+                f"error de ángulo={'-' if angulo is None else f'{angulo:.2f}°'} "
+                f"(p90 {'-' if p90 is None else f'{p90:.2f}°'}), "
+                f"error de largo={'-' if largo is None else f'{largo:.1f} px'}"
+            )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"resultados": resultados}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
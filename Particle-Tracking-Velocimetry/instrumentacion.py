@@ -0,0 +1,209 @@
+# === INSTRUMENTATION ===
+#
+# Per-stage timers and counters for ptv(). A profile is a plain dict created by
+# nuevo_perfil(); every helper accepts None instead of a profile and then does
+# nothing, so instrumented code costs one function call per stage when disabled.
+
+import csv
+import json
+import logging
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("ptv")
+
+# Stages timed per frame (wall and CPU time)
+ETAPAS = ("load", "detect", "predict", "gate", "assign", "write")
+
+# Counters recorded per frame
+CONTADORES = ("detecciones", "propagadas", "candidatos", "tracks_nuevos", "tracks_terminados")
+
+# Allocation sites kept from each tracemalloc snapshot
+TOP_ASIGNACIONES = 10
+
+_NULO = nullcontext()
+
+
+def nuevo_perfil(activo=True, memoria=False, instantanea_cada=0):
+    """
+    Creates an empty profile.
+
+    Args:
+        activo (bool): If False, returns None and all instrumentation is skipped.
+        memoria (bool): Trace allocations with tracemalloc (current and peak memory per frame).
+        instantanea_cada (int): With memoria=True, take a tracemalloc snapshot every N frames
+            and keep its top allocation sites (0 = only at export time).
+
+    Returns:
+        dict or None: Profile to pass to the other functions of this module.
+    """
+    if not activo:
+        return None
+    if memoria and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    return {
+        "memoria": memoria,
+        "instantanea_cada": instantanea_cada,
+        "frames": [],
+        "instantaneas": [],
+        "inicio": time.perf_counter(),
+    }
+
+
+def iniciar_frame(perfil, idx):
+    """
+    Opens the record of frame idx (zero-based). Stages and counters go to this frame
+    until the next call.
+    """
+    if perfil is None:
+        return
+    registro = {"frame": idx + 1}
+    for nombre in ETAPAS:
+        registro[f"{nombre}_wall"] = 0.0
+        registro[f"{nombre}_cpu"] = 0.0
+    for nombre in CONTADORES:
+        registro[nombre] = 0
+    perfil["frames"].append(registro)
+
+
+@contextmanager
+def _medir(registro, nombre):
+    inicio_wall = time.perf_counter()
+    inicio_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        registro[f"{nombre}_wall"] += time.perf_counter() - inicio_wall
+        registro[f"{nombre}_cpu"] += time.process_time() - inicio_cpu
+
+
+def etapa(perfil, nombre):
+    """
+    Context manager that adds the wall and CPU time of the block to the given stage
+    of the current frame.
+    """
+    if perfil is None or not perfil["frames"]:
+        return _NULO
+    return _medir(perfil["frames"][-1], nombre)
+
+
+def contar(perfil, nombre, n=1):
+    """
+    Adds n to a counter of the current frame.
+    """
+    if perfil is None or not perfil["frames"]:
+        return
+    perfil["frames"][-1][nombre] += n
+
+
+def _instantanea(frame):
+    estadisticas = tracemalloc.take_snapshot().statistics("lineno")[:TOP_ASIGNACIONES]
+    return {
+        "frame": frame,
+        "top": [
+            {"ubicacion": str(e.traceback), "bytes": e.size, "bloques": e.count}
+            for e in estadisticas
+        ],
+    }
+
+
+def cerrar_frame(perfil):
+    """
+    Closes the current frame: records memory use when tracing and logs its timings
+    at DEBUG level.
+    """
+    if perfil is None or not perfil["frames"]:
+        return
+    registro = perfil["frames"][-1]
+
+    if perfil["memoria"]:
+        actual, pico = tracemalloc.get_traced_memory()
+        registro["memoria_actual"] = actual
+        registro["memoria_pico"] = pico
+        tracemalloc.reset_peak()
+        cada = perfil["instantanea_cada"]
+        if cada and registro["frame"] % cada == 0:
+            perfil["instantaneas"].append(_instantanea(registro["frame"]))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "Frame %d: %s | %s",
+            registro["frame"],
+            " ".join(f"{e}={registro[f'{e}_wall'] * 1e3:.1f}ms" for e in ETAPAS),
+            " ".join(f"{c}={registro[c]}" for c in CONTADORES),
+        )
+
+
+def resumen(perfil):
+    """
+    Aggregates the profile: total and mean time per stage, counter totals and
+    frames per second.
+    """
+    frames = perfil["frames"]
+    n = max(len(frames), 1)
+    total = time.perf_counter() - perfil["inicio"]
+
+    etapas = {}
+    for nombre in ETAPAS:
+        wall = sorted(r[f"{nombre}_wall"] for r in frames) or [0.0]
+        cpu = sum(r[f"{nombre}_cpu"] for r in frames)
+        etapas[nombre] = {
+            "wall_total_s": sum(wall),
+            "wall_medio_ms": sum(wall) / n * 1e3,
+            "wall_p95_ms": wall[min(int(0.95 * len(wall)), len(wall) - 1)] * 1e3,
+            "cpu_total_s": cpu,
+        }
+
+    datos = {
+        "frames": len(frames),
+        "tiempo_total_s": total,
+        "fps": len(frames) / total if total > 0 else 0.0,
+        "etapas": etapas,
+        "contadores": {c: sum(r[c] for r in frames) for c in CONTADORES},
+    }
+    if perfil["memoria"]:
+        datos["memoria_pico_bytes"] = max((r["memoria_pico"] for r in frames), default=0)
+    return datos
+
+
+def exportar_perfil(perfil, ruta_base):
+    """
+    Writes the per-frame trace to {ruta_base}.csv and the trace plus its summary to
+    {ruta_base}.json, logs the summary and stops tracemalloc if it was started.
+
+    Returns:
+        dict: The summary (None if profiling is disabled).
+    """
+    if perfil is None:
+        return None
+
+    if perfil["memoria"]:
+        perfil["instantaneas"].append(_instantanea(len(perfil["frames"])))
+        tracemalloc.stop()
+
+    datos = resumen(perfil)
+
+    if perfil["frames"]:
+        with open(f"{ruta_base}.csv", "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(perfil["frames"][0].keys()))
+            writer.writeheader()
+            writer.writerows(perfil["frames"])
+
+    with open(f"{ruta_base}.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {"resumen": datos, "frames": perfil["frames"], "instantaneas": perfil["instantaneas"]},
+            f,
+            indent=4,
+        )
+
+    logger.info(
+        "%d frames in %.1f s (%.2f fps) | %s",
+        datos["frames"],
+        datos["tiempo_total_s"],
+        datos["fps"],
+        " ".join(f"{e}={v['wall_medio_ms']:.1f}ms" for e, v in datos["etapas"].items()),
+    )
+    logger.info("Counters: %s", datos["contadores"])
+    logger.info("Profile saved to %s.csv / %s.json", ruta_base, ruta_base)
+    return datos
@@ -0,0 +1,93 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import deteccion_hough
+import flujo_optico
+import tracking
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Detection cadences compared (1 = detector on every image, as ptv() does by default)
+CADENCIAS = [1, 2, 4, 8, 16]
+UMBRAL_CONFIANZA = 0.6
+
+FIBRAS = [25, 100, 400]
+N_FRAMES = 80
+
+ruta_reporte = "Particle-Tracking-Velocimetry/keyframes_benchmark.json"
+
+# =============================================================================
+# 2) RUN AND SCORE
+# =============================================================================
+
+def ejecutar(imagenes, cadencia):
+    """
+    Runs detection (on keyframes) or propagation plus tracking over the recording.
+
+    Returns:
+        tiempos (np.ndarray): Seconds per frame.
+        salidas (list): (centroids, track IDs) of each frame.
+        keyframes (int): Number of frames that ran the detector.
+    """
+    estado = tracking.nuevo_estado()
+    tiempos = np.empty(len(imagenes))
+    salidas = []
+    confianza, keyframes, anterior = 1.0, 0, None
+    for idx, gris in enumerate(imagenes):
+        inicio = time.perf_counter()
+        keyframe = anterior is None or flujo_optico.es_keyframe(idx, cadencia, confianza, UMBRAL_CONFIANZA)
+        if keyframe:
+            centroids, angles, max_lengths, _ = deteccion_hough.detectar(gris)
+            confianza = 1.0
+            keyframes += 1
+        else:
+            centroids, angles, max_lengths, confianza = flujo_optico.propagar(anterior, gris, estado)
+        ids = tracking.procesar_frame(
+            estado, idx, centroids.tolist(), angles.tolist(), max_lengths.tolist(), propagado=not keyframe
+        )
+        tiempos[idx] = time.perf_counter() - inicio
+        anterior = gris
+        orden = sorted(ids)
+        salidas.append((centroids[orden].reshape(-1, 2), [ids[i] for i in orden]))
+    return tiempos, salidas, keyframes
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    resultados = []
+    for n_fibras in FIBRAS:
+        imagenes, verdad = video_sintetico.generar_video(n_fibras, N_FRAMES)
+        base = None
+        for cadencia in CADENCIAS:
+            tiempos, salidas, keyframes = ejecutar(imagenes, cadencia)
+            ms = float(np.median(tiempos) * 1e3)
+            base = base or float(tiempos.sum())
+            r = {
+                "fibras": n_fibras,
+                "cadencia": cadencia,
+                "keyframes": keyframes,
+                "ms_por_frame_mediana": ms,
+                "aceleracion": base / float(tiempos.sum()),
+                **video_sintetico.puntuar(salidas, verdad),
+            }
+            resultados.append(r)
+            print(
+                f"fibras={n_fibras:>4} K={cadencia:>3} keyframes={keyframes:>3} -> "
+                f"{ms:7.2f} ms/frame, x{r['aceleracion']:.2f}, cobertura={r['cobertura']:.3f}, "
+                f"cambios de ID/fibra={r['cambios_id_por_fibra']:.2f}"
+            )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"umbral_confianza": UMBRAL_CONFIANZA, "resultados": resultados}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
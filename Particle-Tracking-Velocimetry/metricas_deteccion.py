@@ -0,0 +1,282 @@
+# === DETECTION METRICS ===
+#
+# Helpers to score fiber detections against the labeled Roboflow split in
+# Segmentation-Models/YOLO/Volumetric_Ilumination-3 (YOLO polygon labels): box mAP for
+# detectors with boxes and scores, and segment-to-polygon matching for any detector that
+# outputs line segments (Hough lines, or the axis of a YOLO instance).
+
+import glob
+import os
+
+import numpy as np
+from scipy.optimize import linear_sum_assignment
+
+CARPETA_DATASET = os.path.join("Segmentation-Models", "YOLO", "Volumetric_Ilumination-3")
+
+# IoU thresholds of mAP50-95
+UMBRALES_IOU = np.linspace(0.5, 0.95, 10)
+
+# Segment matching: points sampled along each segment, and the largest mean distance
+# (pixels) of those points to a labeled polygon for the segment to detect that fiber
+MUESTRAS_SEGMENTO = 5
+UMBRAL_SEGMENTO = 5.0
+BLOQUE_PUNTOS = 4096
+
+
+def listar_split(split, carpeta_dataset=CARPETA_DATASET):
+    """
+    Returns the (image, label) path pairs of a split ("train", "valid" or "test").
+    Images without a label file get None (no fibers).
+    """
+    imagenes = sorted(glob.glob(os.path.join(carpeta_dataset, split, "images", "*")))
+    pares = []
+    for imagen in imagenes:
+        nombre = os.path.splitext(os.path.basename(imagen))[0] + ".txt"
+        etiqueta = os.path.join(carpeta_dataset, split, "labels", nombre)
+        pares.append((imagen, etiqueta if os.path.exists(etiqueta) else None))
+    return pares
+
+
+def leer_etiquetas(ruta_etiqueta, ancho, alto):
+    """
+    Reads a YOLO segmentation label file ("class x1 y1 x2 y2 ..." normalized).
+
+    Returns:
+        list: One (K, 2) polygon in pixels per labeled fiber.
+    """
+    poligonos = []
+    if ruta_etiqueta is None:
+        return poligonos
+    with open(ruta_etiqueta, "r", encoding="utf-8") as f:
+        for linea in f:
+            valores = linea.split()
+            if len(valores) < 7:
+                continue
+            puntos = np.array(valores[1:], dtype=float).reshape(-1, 2)
+            poligonos.append(puntos * [ancho, alto])
+    return poligonos
+
+
+def cajas_desde_poligonos(poligonos):
+    """
+    Returns the (N, 4) bounding boxes [x1, y1, x2, y2] of the given polygons.
+    """
+    if not poligonos:
+        return np.zeros((0, 4))
+    return np.array([[p[:, 0].min(), p[:, 1].min(), p[:, 0].max(), p[:, 1].max()] for p in poligonos])
+
+
+def iou_cajas(a, b):
+    """
+    Pairwise IoU between two sets of boxes [x1, y1, x2, y2].
+
+    Returns:
+        np.ndarray: (len(a), len(b)) IoU matrix.
+    """
+    a = np.asarray(a, dtype=float).reshape(-1, 1, 4)
+    b = np.asarray(b, dtype=float).reshape(1, -1, 4)
+    ancho = np.clip(np.minimum(a[..., 2], b[..., 2]) - np.maximum(a[..., 0], b[..., 0]), 0, None)
+    alto = np.clip(np.minimum(a[..., 3], b[..., 3]) - np.maximum(a[..., 1], b[..., 1]), 0, None)
+    inter = ancho * alto
+    area_a = (a[..., 2] - a[..., 0]) * (a[..., 3] - a[..., 1])
+    area_b = (b[..., 2] - b[..., 0]) * (b[..., 3] - b[..., 1])
+    return inter / (area_a + area_b - inter + 1e-9)
+
+
+def emparejar(iou, scores, umbral):
+    """
+    Greedy matching by decreasing score: each prediction takes the free ground-truth
+    box with the highest IoU above the threshold.
+
+    Returns:
+        np.ndarray: (n_pred,) bool array, True for true positives.
+    """
+    tp = np.zeros(iou.shape[0], dtype=bool)
+    libre = np.ones(iou.shape[1], dtype=bool)
+    for i in np.argsort(-scores, kind="stable"):
+        candidatos = np.where(libre & (iou[i] >= umbral), iou[i], -1.0)
+        if candidatos.size and candidatos.max() >= 0:
+            j = candidatos.argmax()
+            libre[j] = False
+            tp[i] = True
+    return tp
+
+
+def average_precision(tp, scores, n_gt):
+    """
+    COCO-style 101-point interpolated AP from per-prediction true-positive flags.
+    """
+    if n_gt == 0:
+        return float("nan")
+    if tp.size == 0:
+        return 0.0
+    orden = np.argsort(-scores, kind="stable")
+    tp = tp[orden]
+    tp_acum = np.cumsum(tp)
+    fp_acum = np.cumsum(~tp)
+    recall = tp_acum / n_gt
+    precision = tp_acum / np.maximum(tp_acum + fp_acum, 1)
+    # Monotone precision envelope
+    precision = np.maximum.accumulate(precision[::-1])[::-1]
+    puntos = np.linspace(0, 1, 101)
+    indices = np.searchsorted(recall, puntos, side="left")
+    interpolada = np.where(indices < precision.size, precision[np.minimum(indices, precision.size - 1)], 0.0)
+    return float(interpolada.mean())
+
+
+def evaluar_cajas(predicciones, verdades, umbrales=UMBRALES_IOU):
+    """
+    Box mAP of a set of images.
+
+    Args:
+        predicciones (list): One (boxes (N, 4), scores (N,)) tuple per image.
+        verdades (list): One (M, 4) ground-truth box array per image.
+        umbrales (np.ndarray): IoU thresholds.
+
+    Returns:
+        dict: mAP50, mAP50-95, and precision / recall at IoU 0.5.
+    """
+    scores_total = np.concatenate([np.asarray(s, dtype=float) for _, s in predicciones]) if predicciones else np.zeros(0)
+    n_gt = sum(len(v) for v in verdades)
+    tp_por_umbral = []
+    for umbral in umbrales:
+        tp = [
+            emparejar(iou_cajas(boxes, gt), np.asarray(scores, dtype=float), umbral)
+            for (boxes, scores), gt in zip(predicciones, verdades)
+        ]
+        tp_por_umbral.append(np.concatenate(tp) if tp else np.zeros(0, dtype=bool))
+
+    aps = [average_precision(tp, scores_total, n_gt) for tp in tp_por_umbral]
+    tp50 = tp_por_umbral[0]
+    return {
+        "mAP50": aps[0],
+        "mAP50-95": float(np.nanmean(aps)),
+        "precision50": float(tp50.sum() / max(tp50.size, 1)),
+        "recall50": float(tp50.sum() / max(n_gt, 1)),
+        "detecciones": int(tp50.size),
+        "etiquetas": int(n_gt),
+    }
+
+
+def segmentos_desde_propiedades(propiedades):
+    """
+    (N, 4) segments [x1, y1, x2, y2] of detections given as [cx, cy, angle, length].
+    """
+    propiedades = np.asarray(propiedades, dtype=float).reshape(-1, 4)
+    cx, cy, angulo, largo = propiedades.T
+    dx = np.cos(np.radians(angulo)) * largo / 2.0
+    dy = np.sin(np.radians(angulo)) * largo / 2.0
+    return np.column_stack([cx - dx, cy - dy, cx + dx, cy + dy])
+
+
+def distancia_segmentos_poligonos(segmentos, poligonos, muestras=MUESTRAS_SEGMENTO, bloque=BLOQUE_PUNTOS):
+    """
+    Mean distance from points sampled along every segment to every polygon (0 for
+    points inside it), computed against all polygon edges at once.
+
+    Args:
+        segmentos (np.ndarray): (N, 4) segments [x1, y1, x2, y2].
+        poligonos (list): M (K, 2) polygons in pixels (3 vertices or more).
+        muestras (int): Points per segment, end points included.
+        bloque (int): Points processed at once (bounds the points x edges arrays).
+
+    Returns:
+        np.ndarray: (N, M) distances in pixels.
+    """
+    segmentos = np.asarray(segmentos, dtype=float).reshape(-1, 4)
+    if not len(segmentos) or not poligonos:
+        return np.zeros((len(segmentos), len(poligonos)))
+
+    t = np.linspace(0.0, 1.0, muestras)[None, :, None]
+    puntos = (segmentos[:, None, :2] + t * (segmentos[:, None, 2:] - segmentos[:, None, :2])).reshape(-1, 2)
+
+    # Edges of all polygons back to back; each polygon closes on its first vertex
+    tamanos = np.array([len(p) for p in poligonos], dtype=np.int64)
+    a = np.concatenate([np.asarray(p, dtype=float) for p in poligonos])
+    inicio = np.concatenate([[0], np.cumsum(tamanos)[:-1]])
+    siguiente = np.arange(1, len(a) + 1)
+    siguiente[inicio + tamanos - 1] = inicio
+    b = a[siguiente]
+    ab = b - a
+    largo2 = np.maximum((ab ** 2).sum(axis=1), 1e-12)
+
+    distancias = np.empty((len(puntos), len(poligonos)))
+    for i in range(0, len(puntos), bloque):
+        p = puntos[i:i + bloque, None, :]
+        # Closest point of every edge to every sample
+        u = np.clip(((p - a) * ab).sum(axis=2) / largo2, 0.0, 1.0)
+        d2 = ((a + u[..., None] * ab - p) ** 2).sum(axis=2)
+        d2 = np.minimum.reduceat(d2, inicio, axis=1)
+        # Even-odd rule: a horizontal ray crossing an odd number of edges starts inside
+        py, px = p[..., 1], p[..., 0]
+        cruza = (a[:, 1] > py) != (b[:, 1] > py)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_cruce = a[:, 0] + (py - a[:, 1]) * ab[:, 0] / ab[:, 1]
+        dentro = np.add.reduceat((cruza & (px < x_cruce)).astype(np.int64), inicio, axis=1) % 2 == 1
+        distancias[i:i + bloque] = np.where(dentro, 0.0, np.sqrt(d2))
+    return distancias.reshape(len(segmentos), muestras, len(poligonos)).mean(axis=1)
+
+
+def emparejar_distancia(distancias, umbral=UMBRAL_SEGMENTO):
+    """
+    One-to-one matching of minimum total distance among the pairs within the threshold.
+
+    Returns:
+        tuple: (i, j) indices of the matched detections and labels.
+    """
+    if not distancias.size:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    validos = distancias <= umbral
+    coste = np.where(validos, distancias, umbral * (1 + distancias.size))
+    i, j = linear_sum_assignment(coste)
+    ok = validos[i, j]
+    return i[ok], j[ok]
+
+
+def error_angular(a, b):
+    """
+    Absolute angle difference (degrees) between undirected lines, in [0, 90].
+    """
+    d = (np.asarray(a, dtype=float) - np.asarray(b, dtype=float)) % 180.0
+    return np.minimum(d, 180.0 - d)
+
+
+def evaluar_segmentos(predicciones, verdades, umbral=UMBRAL_SEGMENTO):
+    """
+    Precision, recall and angle error of segment detections against labeled polygons.
+
+    Args:
+        predicciones (list): One (segments (N, 4), angles (N,)) tuple per image.
+        verdades (list): One (polygons, angles (M,)) tuple per image, with the label
+            angles in the same convention (e.g. yolo_inferencia.propiedades_desde_poligonos()).
+        umbral (float): Largest mean segment-to-polygon distance of a match (pixels).
+
+    Returns:
+        dict: precision, recall, f1, angle error (mean / median, degrees) and mean
+        distance (pixels) of the matches, and the tp / fp / fn counts.
+    """
+    tp = fp = fn = 0
+    errores, distancias_tp = [], []
+    for (segmentos, angulos), (poligonos, angulos_gt) in zip(predicciones, verdades):
+        distancias = distancia_segmentos_poligonos(segmentos, poligonos)
+        i, j = emparejar_distancia(distancias, umbral)
+        tp += len(i)
+        fp += len(distancias) - len(i)
+        fn += len(poligonos) - len(i)
+        errores.append(error_angular(np.asarray(angulos)[i], np.asarray(angulos_gt)[j]))
+        distancias_tp.append(distancias[i, j])
+    errores = np.concatenate(errores) if errores else np.zeros(0)
+    distancias_tp = np.concatenate(distancias_tp) if distancias_tp else np.zeros(0)
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        "precision": precision,
+        "recall": recall,
+        "f1": 2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        "error_angular_medio": float(errores.mean()) if errores.size else None,
+        "error_angular_mediano": float(np.median(errores)) if errores.size else None,
+        "distancia_media_px": float(distancias_tp.mean()) if distancias_tp.size else None,
+        "tp": tp,
+        "fp": fp,
+        "fn": fn,
+    }
@@ -0,0 +1,252 @@
+# === MULTI-OBJECT TRACKING METRICS ===
+#
+# CLEAR-MOT (MOTA, MOTP, ID switches), identity (IDF1) and HOTA scores of a tracking
+# output against ground truth, synthetic or annotated. A sequence is a list of frames,
+# each an (ids, geometria) pair: centroids (N, 2) matched by distance, or boxes
+# (N, 4) [x1, y1, x2, y2] matched by IoU. Only the pairs within the gate are built
+# (KD-tree for distances) and the one-to-one assignment is solved on that sparse
+# graph, so crowded frames never need a dense N x M cost matrix.
+
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import min_weight_full_bipartite_matching
+from scipy.spatial import cKDTree
+
+import metricas_deteccion
+import tracks
+
+UMBRAL_DISTANCIA = 10.0   # Largest centroid distance of a match (pixels)
+UMBRAL_IOU = 0.5          # Smallest box IoU of a match
+ALFAS_HOTA = np.arange(0.05, 0.96, 0.05)
+
+
+# --------------------------------------------------------------------------------
+# 1) SEQUENCES
+# --------------------------------------------------------------------------------
+
+def frames_desde_json(dictionary, n_frames=None, incluir_propagados=False):
+    """
+    Sequence of a fibras_{n}.json tracking result (frames are 1-based in the file).
+    Positions propagated with optical flow between keyframes are left out unless
+    incluir_propagados is set, so only real detections are scored.
+
+    Returns:
+        list: One (ids (N,), centroids (N, 2)) pair per frame.
+    """
+    if not incluir_propagados:
+        dictionary = tracks.sin_propagados(dictionary)
+    ids, frames, centroides = [], [], []
+    for fiber_id, fiber_data in dictionary.items():
+        if fiber_id in ("ruta", "fibras_por_frame"):
+            continue
+        f = np.asarray(fiber_data.get("frame", []), dtype=np.int64).reshape(-1)
+        c = np.asarray(fiber_data.get("centroide", []), dtype=float).reshape(-1, 2)
+        n = min(len(f), len(c))
+        ids.append(np.full(n, fiber_id, dtype=object))
+        frames.append(f[:n] - 1)
+        centroides.append(c[:n])
+    if not ids:
+        return [(np.zeros(0, dtype=object), np.zeros((0, 2)))] * (n_frames or 0)
+
+    ids, frames, centroides = np.concatenate(ids), np.concatenate(frames), np.concatenate(centroides)
+    n_frames = n_frames or int(frames.max()) + 1
+    orden = np.argsort(frames, kind="stable")
+    cortes = np.searchsorted(frames[orden], np.arange(n_frames + 1))
+    return [(ids[orden[a:b]], centroides[orden[a:b]]) for a, b in zip(cortes[:-1], cortes[1:])]
+
+
+def frames_desde_verdad(verdad):
+    """
+    Sequence of the video_sintetico ground truth (fiber i keeps ID i).
+    """
+    return [(np.arange(len(posiciones)), posiciones) for posiciones, *_ in verdad]
+
+
+def _codificar(secuencia):
+    # Integer IDs 0..K-1 (IDs may be strings in the JSON files)
+    todos = np.concatenate([np.asarray(ids).astype(str) for ids, _ in secuencia]) if secuencia else np.zeros(0, str)
+    unicos, codigos = np.unique(todos, return_inverse=True)
+    cortes = np.cumsum([0] + [len(ids) for ids, _ in secuencia])
+    return [codigos[a:b] for a, b in zip(cortes[:-1], cortes[1:])], len(unicos)
+
+
+# --------------------------------------------------------------------------------
+# 2) SPARSE MATCHING
+# --------------------------------------------------------------------------------
+
+def pares_candidatos(verdad, prediccion, umbral, criterio="distancia"):
+    """
+    Ground-truth / prediction pairs within the gate and their similarity in [0, 1]
+    (1 - distance / umbral, or the IoU).
+
+    Returns:
+        tuple: (i, j, similitud) arrays.
+    """
+    if not len(verdad) or not len(prediccion):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    if criterio == "distancia":
+        pares = cKDTree(verdad).sparse_distance_matrix(cKDTree(prediccion), umbral, output_type="ndarray")
+        return pares["i"].astype(np.int64), pares["j"].astype(np.int64), 1.0 - pares["v"] / umbral
+    iou = metricas_deteccion.iou_cajas(verdad, prediccion)
+    i, j = np.nonzero(iou >= umbral)
+    return i, j, iou[i, j]
+
+
+def asignar(filas, columnas, coste, n_filas, n_columnas):
+    """
+    One-to-one matching of minimum total cost using only the given pairs, where leaving
+    a row or a column unmatched costs more than any pair.
+
+    Solved as a full bipartite matching on a sparse graph (LAPJVsp) in which every row
+    and every column also has a dummy partner at that cost.
+
+    Returns:
+        tuple: (filas, columnas) of the matched pairs.
+    """
+    if not len(coste):
+        return filas, columnas
+    n, m, e = n_filas, n_columnas, len(coste)
+    # Every full matching has n + m edges, so a common offset keeps all weights positive
+    # (csgraph ignores zero weights) without changing the optimum
+    desplazamiento = 1.0 - min(float(coste.min()), 0.0)
+    grande = 2.0 * float(np.abs(coste).max()) + 1.0 + desplazamiento
+    grafo = csr_matrix(
+        (
+            np.concatenate([coste + desplazamiento, np.full(n + m, grande), np.full(e, desplazamiento)]),
+            (
+                np.concatenate([filas, np.arange(n), n + np.arange(m), n + columnas]),
+                np.concatenate([columnas, m + np.arange(n), np.arange(m), m + filas]),
+            ),
+        ),
+        shape=(n + m, m + n),
+    )
+    fila, columna = min_weight_full_bipartite_matching(grafo)
+    real = (fila < n) & (columna < m)
+    return fila[real], columna[real]
+
+
+# --------------------------------------------------------------------------------
+# 3) SCORES
+# --------------------------------------------------------------------------------
+
+def _hota(por_alfa, ocurrencias_gt, ocurrencias_pred, n_gt, n_pred, n_ids_pred):
+    # HOTA, DetA and AssA averaged over the alpha thresholds
+    hota, deta, assa = [], [], []
+    for pares in por_alfa:
+        pares = np.concatenate(pares) if pares else np.zeros(0, dtype=np.int64)
+        tp = pares.size
+        if tp == 0:
+            hota.append(0.0), deta.append(0.0), assa.append(0.0)
+            continue
+        unicos, tpa = np.unique(pares, return_counts=True)
+        g, p = unicos // n_ids_pred, unicos % n_ids_pred
+        a = tpa / (ocurrencias_gt[g] + ocurrencias_pred[p] - tpa)
+        d = tp / (n_gt + n_pred - tp)
+        s = float((tpa * a).sum() / tp)
+        deta.append(d), assa.append(s), hota.append(float(np.sqrt(d * s)))
+    return float(np.mean(hota)), float(np.mean(deta)), float(np.mean(assa))
+
+
+def evaluar(verdad, prediccion, criterio="distancia", umbral=None, alfas=ALFAS_HOTA):
+    """
+    Tracking scores of one sequence.
+
+    Args:
+        verdad (list): Ground-truth frames, (ids, geometria) each.
+        prediccion (list): Output frames, (ids, geometria) each. Missing trailing frames
+            count as empty.
+        criterio (str): "distancia" (centroids) or "iou" (boxes).
+        umbral (float): Gate; defaults to UMBRAL_DISTANCIA or UMBRAL_IOU.
+        alfas (array_like): Similarity thresholds HOTA is averaged over (empty skips HOTA).
+
+    Returns:
+        dict: mota, motp (mean distance, or mean IoU), id_switches, fp, fn, tp, gt,
+            idf1, idp, idr, hota, deta, assa.
+    """
+    umbral = umbral if umbral is not None else (UMBRAL_DISTANCIA if criterio == "distancia" else UMBRAL_IOU)
+    n = max(len(verdad), len(prediccion))
+    vacio = (np.zeros(0, dtype=np.int64), np.zeros((0, 2 if criterio == "distancia" else 4)))
+    verdad = list(verdad) + [vacio] * (n - len(verdad))
+    prediccion = list(prediccion) + [vacio] * (n - len(prediccion))
+    ids_gt, n_ids_gt = _codificar(verdad)
+    ids_pred, n_ids_pred = _codificar(prediccion)
+
+    ultimo = np.full(n_ids_gt, -1, dtype=np.int64)  # Last prediction matched to every GT ID
+    tp = fp = fn = cambios = 0
+    similitud_total = 0.0
+    en_compuerta = []                                # (gt, pred) ID pairs within the gate, per frame
+    por_alfa = [[] for _ in alfas]
+    for (_, geo_gt), (_, geo_pred), g_ids, p_ids in zip(verdad, prediccion, ids_gt, ids_pred):
+        i, j, s = pares_candidatos(geo_gt, geo_pred, umbral, criterio)
+        gi, pj = g_ids[i], p_ids[j]
+        en_compuerta.append(gi * n_ids_pred + pj)
+
+        # CLEAR-MOT: pairs continuing the last match win over any new pair
+        coste = np.where(ultimo[gi] == pj, -1.0, 1.0 - s)
+        mi, mj = asignar(i, j, coste, len(geo_gt), len(geo_pred))
+        g_m, p_m = g_ids[mi], p_ids[mj]
+        cambios += int(np.count_nonzero((ultimo[g_m] >= 0) & (ultimo[g_m] != p_m)))
+        ultimo[g_m] = p_m
+        tp += len(mi)
+        fp += len(geo_pred) - len(mi)
+        fn += len(geo_gt) - len(mi)
+        if len(mi):
+            clave = i * len(geo_pred) + j
+            orden = np.argsort(clave)
+            similitud_total += float(s[orden[np.searchsorted(clave[orden], mi * len(geo_pred) + mj)]].sum())
+
+        for k, alfa in enumerate(alfas):
+            dentro = s >= alfa
+            ai, aj = asignar(i[dentro], j[dentro], -s[dentro], len(geo_gt), len(geo_pred))
+            por_alfa[k].append(g_ids[ai] * n_ids_pred + p_ids[aj])
+
+    n_gt = sum(len(g) for _, g in verdad)
+    n_pred = sum(len(p) for _, p in prediccion)
+
+    # IDF1: best one-to-one GT ID / predicted ID map over the whole sequence
+    claves, conteo = np.unique(np.concatenate(en_compuerta) if en_compuerta else np.zeros(0, np.int64),
+                               return_counts=True)
+    fi, cj = asignar(claves // n_ids_pred, claves % n_ids_pred, -conteo.astype(float), n_ids_gt, n_ids_pred)
+    idtp = int(conteo[np.searchsorted(claves, fi * n_ids_pred + cj)].sum()) if len(fi) else 0
+
+    ocurrencias_gt = np.bincount(np.concatenate(ids_gt), minlength=n_ids_gt) if n_gt else np.zeros(n_ids_gt)
+    ocurrencias_pred = np.bincount(np.concatenate(ids_pred), minlength=n_ids_pred) if n_pred else np.zeros(n_ids_pred)
+    hota, deta, assa = _hota(por_alfa, ocurrencias_gt, ocurrencias_pred, n_gt, n_pred, n_ids_pred) \
+        if len(alfas) else (None, None, None)
+
+    motp = similitud_total / tp if tp else None
+    if motp is not None and criterio == "distancia":
+        motp = (1.0 - motp) * umbral
+    return {
+        "mota": 1.0 - (fn + fp + cambios) / n_gt if n_gt else None,
+        "motp": motp,
+        "id_switches": cambios,
+        "fp": fp,
+        "fn": fn,
+        "tp": tp,
+        "gt": n_gt,
+        "idf1": 2 * idtp / (n_gt + n_pred) if n_gt + n_pred else None,
+        "idp": idtp / n_pred if n_pred else None,
+        "idr": idtp / n_gt if n_gt else None,
+        "hota": hota,
+        "deta": deta,
+        "assa": assa,
+    }
+
+
+def _evaluar_par(par, **opciones):
+    return evaluar(*par, **opciones)
+
+
+def evaluar_secuencias(pares, procesos=None, **opciones):
+    """
+    evaluar() of several (verdad, prediccion) sequences in parallel processes.
+
+    Returns:
+        list: Scores of every sequence, in order.
+    """
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        return list(pool.map(partial(_evaluar_par, **opciones), pares))
@@ -0,0 +1,216 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import multicamara
+import tracks
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Synthetic calibrated scene: fibers moving in a volume in front of the cameras are
+# projected into every camera (with pixel noise) and each camera gets its own 2D
+# tracks with shuffled IDs. The correspondence is run with the epipolar buckets and
+# comparing all the pairs of every frame; both must give the same matches.
+FIBRAS = [200, 800, 1600]
+N_FRAMES = 100
+N_CAMARAS = 3
+RUIDO_PX = 0.3             # Standard deviation of the image noise (pixels)
+LARGO_FIBRA = 5.0          # Fiber length (mm)
+VELOCIDAD = 0.3            # Largest displacement per frame (mm)
+SEMILLA = 0
+
+# Cameras on an arc around the volume center (mm), looking at it
+DISTANCIA_CAMARA = 500.0
+ANGULO_ENTRE_CAMARAS = 30.0   # Degrees
+FOCAL_PX = 2000.0
+ANCHO, ALTO = 1024, 1024
+SEMILADO_VOLUMEN = 40.0       # Half side of the fiber volume (mm)
+
+# Side-by-side rig (nearly horizontal epipolar lines, around the 0 / pi wrap of the
+# angular buckets): the candidate pairs of the buckets must equal those of all pairs
+BASE_LADO_A_LADO = 100.0      # Baseline along X (mm)
+GIRO_LADO_A_LADO = 5.0        # Toe-in of the second camera (degrees)
+PUNTOS_LADO_A_LADO = 500      # Points per frame
+FRAMES_LADO_A_LADO = 20
+
+ruta_reporte = "Particle-Tracking-Velocimetry/multi_camera_benchmark.json"
+
+# =============================================================================
+# 2) SYNTHETIC SCENE
+# =============================================================================
+
+def proyecciones_arco():
+    """
+    (3, 4) projection matrices of N_CAMARAS cameras on a horizontal arc.
+    """
+    K = np.array([[FOCAL_PX, 0, ANCHO / 2], [0, FOCAL_PX, ALTO / 2], [0, 0, 1]])
+    proyecciones = []
+    for k in range(N_CAMARAS):
+        a = np.radians(ANGULO_ENTRE_CAMARAS * (k - (N_CAMARAS - 1) / 2))
+        R = np.array([[np.cos(a), 0, -np.sin(a)], [0, 1, 0], [np.sin(a), 0, np.cos(a)]])
+        centro = np.array([DISTANCIA_CAMARA * np.sin(a), 0, -DISTANCIA_CAMARA * np.cos(a)])
+        proyecciones.append(K @ np.hstack([R, (-R @ centro)[:, None]]))
+    return proyecciones
+
+
+def proyecciones_lado_a_lado():
+    """
+    (3, 4) projection matrices of two cameras side by side, the second one turned
+    towards the first.
+    """
+    K = np.array([[FOCAL_PX, 0, ANCHO / 2], [0, FOCAL_PX, ALTO / 2], [0, 0, 1]])
+    a = np.radians(GIRO_LADO_A_LADO)
+    R = np.array([[np.cos(a), 0, -np.sin(a)], [0, 1, 0], [np.sin(a), 0, np.cos(a)]])
+    P1 = K @ np.hstack([np.eye(3), [[0], [0], [DISTANCIA_CAMARA]]])
+    P2 = K @ np.hstack([R, (R @ np.array([-BASE_LADO_A_LADO, 0, DISTANCIA_CAMARA]))[:, None]])
+    return P1, P2
+
+
+def verificar_lado_a_lado(rng):
+    """
+    Candidate pairs of the epipolar buckets and of all pairs on the side-by-side rig.
+
+    Returns:
+        tuple: (pairs with buckets, pairs with all pairs, same pairs).
+    """
+    P1, P2 = proyecciones_lado_a_lado()
+    F, e2 = multicamara.fundamental(P1, P2)
+    X = rng.uniform(-SEMILADO_VOLUMEN, SEMILADO_VOLUMEN, size=(FRAMES_LADO_A_LADO * PUNTOS_LADO_A_LADO, 3))
+    frames = np.repeat(np.arange(FRAMES_LADO_A_LADO), PUNTOS_LADO_A_LADO)
+    x1 = proyectar(P1, X) + rng.normal(scale=RUIDO_PX, size=(len(X), 2))
+    x2 = proyectar(P2, X) + rng.normal(scale=RUIDO_PX, size=(len(X), 2))
+    i, j, _ = multicamara.candidatos_epipolares(F, e2, frames, x1, frames, x2)
+    i_todos, j_todos, _ = multicamara.candidatos_todos(F, frames, x1, frames, x2)
+    iguales = set(zip(i.tolist(), j.tolist())) == set(zip(i_todos.tolist(), j_todos.tolist()))
+    return len(i), len(i_todos), iguales
+
+
+def proyectar(P, X):
+    x = X @ P[:, :3].T + P[:, 3]
+    return x[:, :2] / x[:, 2:3]
+
+
+def escena(n_fibras, rng):
+    """
+    Ground-truth 3D centers (F, N, 3) and unit directions (F, N, 3) of every frame.
+    """
+    centros = rng.uniform(-SEMILADO_VOLUMEN, SEMILADO_VOLUMEN, size=(n_fibras, 3))
+    velocidades = rng.uniform(-VELOCIDAD, VELOCIDAD, size=(n_fibras, 3))
+    direcciones = rng.normal(size=(n_fibras, 3))
+    direcciones /= np.linalg.norm(direcciones, axis=1, keepdims=True)
+    giros = rng.normal(scale=0.01, size=(n_fibras, 3))
+    todos_c, todos_d = [], []
+    for _ in range(N_FRAMES):
+        todos_c.append(centros.copy())
+        todos_d.append(direcciones.copy())
+        centros = centros + velocidades
+        direcciones = direcciones + giros
+        direcciones /= np.linalg.norm(direcciones, axis=1, keepdims=True)
+    return np.stack(todos_c), np.stack(todos_d)
+
+
+def tracks_camara(P, centros, direcciones, rng):
+    """
+    2D TrackSet of one camera (one track per fiber, shuffled) and the fiber of each track.
+    """
+    n_frames, n_fibras = centros.shape[:2]
+    X = centros.reshape(-1, 3)
+    D = direcciones.reshape(-1, 3) * LARGO_FIBRA / 2
+    a, b = proyectar(P, X - D), proyectar(P, X + D)
+    a += rng.normal(scale=RUIDO_PX, size=a.shape)
+    b += rng.normal(scale=RUIDO_PX, size=b.shape)
+    centroide = ((a + b) / 2).reshape(n_frames, n_fibras, 2)
+    angulo = np.degrees(np.arctan2(b[:, 1] - a[:, 1], b[:, 0] - a[:, 0])).reshape(n_frames, n_fibras)
+    largo = np.linalg.norm(b - a, axis=1).reshape(n_frames, n_fibras)
+
+    fibra = rng.permutation(n_fibras)
+    return tracks.TrackSet(
+        [str(k + 1) for k in range(n_fibras)],
+        np.arange(n_fibras + 1) * n_frames,
+        {
+            "frame": np.tile(np.arange(1, n_frames + 1), n_fibras),
+            "centroide": centroide[:, fibra].transpose(1, 0, 2).reshape(-1, 2),
+            "angulo": angulo[:, fibra].T.reshape(-1),
+            "largo_maximo": largo[:, fibra].T.reshape(-1),
+        },
+    ), fibra
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    rng = np.random.default_rng(SEMILLA)
+    pares_cubetas, pares_todos, iguales_lado_a_lado = verificar_lado_a_lado(rng)
+    print(
+        f"Lado a lado: cubetas {pares_cubetas} pares, todos los pares {pares_todos} pares, "
+        f"iguales={iguales_lado_a_lado}"
+    )
+    if not iguales_lado_a_lado:
+        raise RuntimeError("The epipolar buckets missed candidate pairs of the side-by-side rig")
+    proyecciones = proyecciones_arco()
+    resultados = []
+    for n_fibras in FIBRAS:
+        centros, direcciones = escena(n_fibras, rng)
+        conjuntos, fibras = zip(*(tracks_camara(P, centros, direcciones, rng) for P in proyecciones))
+
+        fila = {"fibras": n_fibras, "frames": N_FRAMES, "camaras": N_CAMARAS}
+        emparejamientos = {}
+        for indexar in (True, False):
+            inicio = time.perf_counter()
+            emparejamientos[indexar] = [
+                multicamara.emparejar_tracks(conjuntos[0], otra, proyecciones[0], P, indexar=indexar)
+                for otra, P in zip(conjuntos[1:], proyecciones[1:])
+            ]
+            fila["segundos_" + ("cubetas" if indexar else "todos_los_pares")] = time.perf_counter() - inicio
+        iguales = all(np.array_equal(a, b) for a, b in zip(emparejamientos[True], emparejamientos[False]))
+        correctos = np.mean([
+            np.mean(fibras[c][np.maximum(e, 0)][e >= 0] == fibras[0][e >= 0]) if (e >= 0).any() else 0.0
+            for c, e in zip(range(1, N_CAMARAS), emparejamientos[True])
+        ])
+        emparejados = np.mean([(e >= 0).mean() for e in emparejamientos[True]])
+
+        inicio = time.perf_counter()
+        resultado, _ = multicamara.reconstruir(list(conjuntos), proyecciones)
+        fila["segundos_reconstruccion"] = time.perf_counter() - inicio
+
+        # Errors against the ground truth of the fiber of each reference track
+        fibra = fibras[0][np.array([int(i) - 1 for i in resultado.ids.tolist()], dtype=np.int64)]
+        filas_fibra = np.repeat(fibra, resultado.largos())
+        frames = resultado["frame"] - 1
+        error_posicion = np.linalg.norm(resultado["posicion"] - centros[frames, filas_fibra], axis=1)
+        coseno = np.abs(np.einsum("ij,ij->i", resultado["direccion"], direcciones[frames, filas_fibra]))
+        error_angulo = np.degrees(np.arccos(np.clip(coseno, 0, 1)))
+        fila.update({
+            "emparejados": float(emparejados),
+            "emparejamientos_correctos": float(correctos),
+            "cubetas_igual_a_todos": iguales,
+            "error_posicion_mm_mediana": float(np.median(error_posicion)),
+            "error_direccion_grados_mediana": float(np.median(error_angulo)),
+            "error_largo_mm_mediana": float(np.median(np.abs(resultado["largo"] - LARGO_FIBRA))),
+        })
+        resultados.append(fila)
+        print(
+            f"fibras={n_fibras:>5}: cubetas {fila['segundos_cubetas']:6.2f} s, todos los pares "
+            f"{fila['segundos_todos_los_pares']:6.2f} s (x{fila['segundos_todos_los_pares'] / fila['segundos_cubetas']:.1f}), "
+            f"iguales={iguales}, emparejados={emparejados:.3f}, correctos={correctos:.3f}, "
+            f"error 3D {fila['error_posicion_mm_mediana']:.3f} mm / {fila['error_direccion_grados_mediana']:.2f}° / "
+            f"largo {fila['error_largo_mm_mediana']:.3f} mm"
+        )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "tolerancia_px": multicamara.TOLERANCIA_EPIPOLAR,
+            "lado_a_lado": {
+                "pares_cubetas": pares_cubetas, "pares_todos": pares_todos, "iguales": iguales_lado_a_lado,
+            },
+            "resultados": resultados,
+        }, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import json
+import os
+import time
+
+import numpy as np
+
+import detectores
+import multicamara
+import tracks
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Every camera folder of each recording ({n} Fibras/Cam 1, Cam 2, ...) is detected and
+# tracked in its own process; the 2D tracks of every camera are saved as
+# fibras_{n}_{camera}.json (the fibras_{n}.json layout) and then matched with the
+# calibration and triangulated into fibras3d_{n}.npz (tracks.TrackSet.guardar(), with
+# the matched 2D track IDs of every camera as "ids_camaras" and the camera names as
+# "camaras").
+concentraciones = [25, 50, 100, 200, 400, 800]
+carpeta_dataset = "Particle-Tracking-Velocimetry/Dataset"
+carpeta_salida = "Particle-Tracking-Velocimetry/Multi-Camera"
+
+# Projection matrices of the cameras ({camera: P} or {camera: {"K", "R", "t"}}, same
+# names as the camera folders); the first camera found is the reference
+ruta_calibracion = "Particle-Tracking-Velocimetry/Multi-Camera/calibracion.json"
+
+numero_imagenes = 600
+
+# Detector of every camera (type and options of detectores.crear())
+tipo = "hough"
+opciones = dict()
+
+# Tracking variables (tracking.configurar())
+parametros_tracking = dict(
+    fps=200, alpha=0.95, betha=0.95, gamma=0.05, variacion_x=10, variacion_y=10, variacion_angulo=5,
+)
+
+tolerancia_epipolar = multicamara.TOLERANCIA_EPIPOLAR   # Pixels
+procesos = None  # Worker processes (None = one per camera)
+
+# =============================================================================
+# 2) MAIN
+# =============================================================================
+
+def main():
+    proyecciones = multicamara.cargar_calibracion(ruta_calibracion)
+    os.makedirs(carpeta_salida, exist_ok=True)
+
+    for n in concentraciones:
+        carpeta_grabacion = os.path.join(carpeta_dataset, f"{n} Fibras")
+        nombres = [c for c in multicamara.camaras(carpeta_grabacion) if c in proyecciones]
+        if len(nombres) < 2:
+            print(f"{n} fibras: se necesitan al menos dos cámaras calibradas, omitido")
+            continue
+        imagenes = {c: detectores.listar_imagenes(os.path.join(carpeta_grabacion, c), numero_imagenes) for c in nombres}
+
+        inicio = time.perf_counter()
+        resultados = multicamara.rastrear_camaras(imagenes, tipo, opciones, parametros_tracking, procesos)
+        segundos_tracking = time.perf_counter() - inicio
+        for c, datos in resultados.items():
+            ruta = os.path.join(carpeta_salida, f"fibras_{n}_{c.replace(' ', '_')}.json")
+            with open(ruta, "w", encoding="utf-8") as f:
+                json.dump(datos, f, indent=4)
+
+        inicio = time.perf_counter()
+        conjuntos = [tracks.TrackSet.desde_json(resultados[c]) for c in nombres]
+        resultado, ids_camaras = multicamara.reconstruir(
+            conjuntos, [proyecciones[c] for c in nombres], tolerancia_epipolar
+        )
+        segundos_reconstruccion = time.perf_counter() - inicio
+        ruta = os.path.join(carpeta_salida, f"fibras3d_{n}.npz")
+        resultado.guardar(ruta, ids_camaras=ids_camaras, camaras=np.array(nombres))
+
+        print(
+            f"{n} fibras: {len(nombres)} cámaras, tracking {segundos_tracking:.1f} s, "
+            f"{len(resultado)} fibras 3D en {segundos_reconstruccion:.2f} s -> {ruta}"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,463 @@
+# === MULTI-CAMERA TRACKING ===
+#
+# Every camera of a recording ({n} Fibras/Cam 1, Cam 2, ...) is detected and tracked on
+# its own, one process per camera. The 2D tracks are then put in correspondence with
+# the tracks of the reference camera (the first one) using the calibration: for every
+# other camera, the observations of that camera are indexed by the epipolar line they
+# lie on (its angle around the epipole, or its offset when the epipole is at infinity)
+# in buckets as narrow as the matching tolerance allows, so each reference observation is only
+# compared with the observations of the same frame in its own and the two neighboring
+# buckets, not with all of them. Observations closer than the tolerance to each other's
+# epipolar line vote for their track pair, and the pairs with the most votes are
+# matched one to one. Matched tracks are triangulated frame by frame (DLT over every
+# camera that sees the fiber); the 3D direction is the line common to the planes
+# back-projected from the 2D fiber lines, and the length is averaged over the cameras.
+# The result is a TrackSet with the 3D columns and a camera dimension for the 2D ones.
+
+import glob
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import tracks
+
+TOLERANCIA_EPIPOLAR = 3.0   # Largest distance (pixels) of an observation to the epipolar line of its match
+RADIO_EPIPOLO = 100.0       # Observations closer than this to the epipole are compared with every other (pixels)
+VOTOS_MINIMOS = 3           # Frames a track pair must agree on
+FRACCION_VOTOS = 0.5        # ... and fraction of the frames both tracks exist in
+DISTANCIA_PARALELAS = 1e8   # Epipoles farther than this (pixels) are taken at infinity (parallel epipolar lines)
+BLOQUE_PARES = 2_000_000    # Observation pairs compared at once by candidatos_todos()
+
+
+# --------------------------------------------------------------------------------
+# 1) PER-CAMERA TRACKING
+# --------------------------------------------------------------------------------
+
+def camaras(carpeta_grabacion):
+    """
+    Sorted camera folders ("Cam 1", "Cam 2", ...) of a recording folder.
+    """
+    return sorted(
+        (os.path.basename(c) for c in glob.glob(os.path.join(carpeta_grabacion, "Cam *")) if os.path.isdir(c)),
+        key=lambda nombre: int(nombre.split()[-1]) if nombre.split()[-1].isdigit() else nombre,
+    )
+
+
+def rastrear_camara(imagenes, tipo, opciones, parametros_tracking, ruta=None):
+    """
+    Detection (detectores.crear(tipo, **opciones)) and tracking of the frames of one
+    camera, as the ptv() notebooks do with every image a keyframe.
+
+    Returns:
+        dict: The fibras_{n}.json dictionary of the camera.
+    """
+    import detectores
+    import tracking
+
+    tracking.configurar(**parametros_tracking)
+    detector = detectores.crear(tipo, **opciones)
+    estado = tracking.nuevo_estado()
+    for indices, salida in detectores.ejecutar(imagenes, [detector]):
+        for idx, detecciones in zip(indices, detectores.por_frame(salida[detector["nombre"]], indices)):
+            centroids, angles, max_lengths, _ = detectores.propiedades(detecciones)
+            tracking.procesar_frame(estado, idx, centroids, angles, max_lengths)
+    return tracking.exportar(estado, ruta)
+
+
+def _rastrear(argumentos):
+    return rastrear_camara(*argumentos)
+
+
+def rastrear_camaras(imagenes_por_camara, tipo, opciones, parametros_tracking, procesos=None):
+    """
+    rastrear_camara() of every camera, in parallel processes.
+
+    Args:
+        imagenes_por_camara (dict): Camera name -> frame paths (same frame count and order
+            in every camera: the cameras are synchronized).
+
+    Returns:
+        dict: Camera name -> tracking dictionary.
+    """
+    nombres = list(imagenes_por_camara)
+    tareas = [(imagenes_por_camara[c], tipo, opciones, parametros_tracking, c) for c in nombres]
+    with ProcessPoolExecutor(max_workers=procesos or len(nombres) or None) as pool:
+        return dict(zip(nombres, pool.map(_rastrear, tareas)))
+
+
+# --------------------------------------------------------------------------------
+# 2) CALIBRATION AND EPIPOLAR GEOMETRY
+# --------------------------------------------------------------------------------
+
+def cargar_calibracion(ruta):
+    """
+    Projection matrices of a calibration JSON, {camera: P (3 x 4)} or
+    {camera: {"K": 3 x 3, "R": 3 x 3, "t": 3}}.
+
+    Returns:
+        dict: Camera name -> (3, 4) projection matrix.
+    """
+    with open(ruta, "r", encoding="utf-8") as f:
+        datos = json.load(f)
+    proyecciones = {}
+    for camara, valor in datos.items():
+        if isinstance(valor, dict):
+            K, R = np.asarray(valor["K"], dtype=float), np.asarray(valor["R"], dtype=float)
+            t = np.asarray(valor["t"], dtype=float).reshape(3, 1)
+            proyecciones[camara] = K @ np.hstack([R, t])
+        else:
+            proyecciones[camara] = np.asarray(valor, dtype=float).reshape(3, 4)
+    return proyecciones
+
+
+def centro(P):
+    """
+    Homogeneous camera center (4,) of a projection matrix.
+    """
+    return np.linalg.svd(P)[2][-1]
+
+
+def fundamental(P1, P2):
+    """
+    Fundamental matrix F with x2^T F x1 = 0, and the epipole of camera 1 in camera 2.
+    """
+    e2 = P2 @ centro(P1)
+    e2_x = np.array([[0, -e2[2], e2[1]], [e2[2], 0, -e2[0]], [-e2[1], e2[0], 0]])
+    return e2_x @ P2 @ np.linalg.pinv(P1), e2
+
+
+def _homogeneos(puntos):
+    return np.column_stack([puntos, np.ones(len(puntos))])
+
+
+def distancias_epipolares(F, x1, x2):
+    """
+    (N,) larger of the two point-to-epipolar-line distances of the pairs (x1[i], x2[i]).
+    """
+    h1, h2 = _homogeneos(x1), _homogeneos(x2)
+    l2 = h1 @ F.T    # Lines of the x1 points in camera 2
+    l1 = h2 @ F      # Lines of the x2 points in camera 1
+    d2 = np.abs(np.einsum("ij,ij->i", l2, h2)) / np.hypot(l2[:, 0], l2[:, 1])
+    d1 = np.abs(np.einsum("ij,ij->i", l1, h1)) / np.hypot(l1[:, 0], l1[:, 1])
+    return np.maximum(d1, d2)
+
+
+# --------------------------------------------------------------------------------
+# 3) EPIPOLAR BUCKETS
+# --------------------------------------------------------------------------------
+
+def indice_epipolar(e2, puntos, tolerancia=TOLERANCIA_EPIPOLAR, radio=RADIO_EPIPOLO):
+    """
+    Bucket layout of the epipolar lines of camera 2, fitted to its points.
+
+    Lines through a finite epipole are indexed by their angle: a point at distance r
+    from the epipole is within the tolerance of lines up to asin(tolerancia / r) away in
+    angle, so the buckets are that wide for the closest indexed point and a lookup
+    only needs its own and the two neighboring buckets. Points closer than `radio` to
+    the epipole are left out of the buckets. With the epipole at infinity the lines are
+    parallel and indexed by their offset along the normal, in buckets of `tolerancia`.
+
+    Returns:
+        tuple: (layout dict, buckets (N,) int64, near-epipole mask (N,)).
+    """
+    if abs(e2[2]) * DISTANCIA_PARALELAS > np.linalg.norm(e2[:2]):
+        e = e2[:2] / e2[2]
+        distancias = np.hypot(puntos[:, 0] - e[0], puntos[:, 1] - e[1])
+        cerca = distancias < radio
+        r_min = max(radio, distancias[~cerca].min(initial=np.inf)) if (~cerca).any() else radio
+        # Whole buckets tiling [0, pi), so the neighbors of the last one wrap to the first
+        n_cubetas = max(1, int(np.floor(np.pi / np.arcsin(min(1.0, tolerancia / r_min)))))
+        disposicion = {"epipolo": e, "ancho": np.pi / n_cubetas, "cubetas": n_cubetas}
+    else:
+        direccion = e2[:2] / np.linalg.norm(e2[:2])
+        cerca = np.zeros(len(puntos), dtype=bool)
+        disposicion = {"normal": np.array([-direccion[1], direccion[0]]), "ancho": tolerancia, "cubetas": None}
+    return disposicion, cubetas(disposicion, puntos=puntos), cerca
+
+
+def cubetas(disposicion, puntos=None, lineas=None):
+    """
+    (N,) bucket of the epipolar line through camera-2 points, or of camera-2 epipolar
+    lines (a, b, c), in the layout of indice_epipolar().
+    """
+    if disposicion["cubetas"] is not None:
+        if puntos is not None:
+            delta = puntos - disposicion["epipolo"]
+            angulos = np.arctan2(delta[:, 1], delta[:, 0])
+        else:
+            angulos = np.arctan2(lineas[:, 0], -lineas[:, 1])   # Direction (-b, a) of a x + b y + c = 0
+        return np.floor(np.mod(angulos, np.pi) / disposicion["ancho"]).astype(np.int64) % disposicion["cubetas"]
+    if puntos is not None:
+        desplazamientos = puntos @ disposicion["normal"]
+    else:
+        ab = lineas[:, :2]
+        desplazamientos = (-lineas[:, 2:3] * ab / np.sum(ab ** 2, axis=1, keepdims=True)) @ disposicion["normal"]
+    return np.floor(desplazamientos / disposicion["ancho"]).astype(np.int64)
+
+
+def _rangos(ordenadas, claves):
+    # (pairs) query index and position in `ordenadas` of every element equal to its key
+    inicio = np.searchsorted(ordenadas, claves, side="left")
+    fin = np.searchsorted(ordenadas, claves, side="right")
+    n = fin - inicio
+    consulta = np.repeat(np.arange(len(claves)), n)
+    posicion = np.repeat(inicio - np.concatenate([[0], np.cumsum(n)[:-1]]), n) + np.arange(n.sum())
+    return consulta, posicion
+
+
+def candidatos_epipolares(F, e2, frames1, x1, frames2, x2, tolerancia=TOLERANCIA_EPIPOLAR, radio=RADIO_EPIPOLO):
+    """
+    Pairs of observations (i in camera 1, j in camera 2) of the same frame whose points
+    lie within `tolerancia` of each other's epipolar line, found through the buckets.
+
+    Returns:
+        tuple: (i (P,), j (P,), distances (P,)).
+    """
+    disposicion, cubetas2, cerca2 = indice_epipolar(e2, x2, tolerancia, radio)
+    cubetas1 = cubetas(disposicion, lineas=_homogeneos(x1) @ F.T)
+    n_cubetas = disposicion["cubetas"]
+
+    # Composite (frame, bucket) keys, so a lookup only sees the same frame
+    lejos = np.flatnonzero(~cerca2)
+    if n_cubetas is not None:
+        base, ancho = 0, n_cubetas
+    elif len(lejos):
+        base, ancho = int(cubetas2[lejos].min()), int(np.ptp(cubetas2[lejos])) + 1
+    else:
+        base, ancho = 0, 1
+    claves2 = frames2[lejos].astype(np.int64) * ancho + (cubetas2[lejos] - base)
+    orden = np.argsort(claves2, kind="stable")
+    ordenadas = claves2[orden]
+
+    desplazamientos = (-1, 0, 1) if n_cubetas is None or n_cubetas >= 3 else range(n_cubetas)
+    pares_i, pares_j = [], []
+    for desplazamiento in desplazamientos:
+        vecinas = cubetas1 + desplazamiento
+        if n_cubetas is not None:
+            vecinas %= n_cubetas
+        consultas = np.flatnonzero((vecinas >= base) & (vecinas - base < ancho))
+        i, posicion = _rangos(ordenadas, frames1[consultas].astype(np.int64) * ancho + (vecinas[consultas] - base))
+        pares_i.append(consultas[i])
+        pares_j.append(lejos[orden[posicion]])
+
+    # Points near the epipole lie close to every epipolar line: compared with the whole frame
+    cercanas = np.flatnonzero(cerca2)
+    if len(cercanas):
+        orden_frames = np.argsort(frames1, kind="stable")
+        j, posicion = _rangos(frames1[orden_frames], frames2[cercanas])
+        pares_i.append(orden_frames[posicion])
+        pares_j.append(cercanas[j])
+
+    i, j = np.concatenate(pares_i), np.concatenate(pares_j)
+    distancias = distancias_epipolares(F, x1[i], x2[j])
+    validos = distancias < tolerancia
+    return i[validos], j[validos], distancias[validos]
+
+
+def candidatos_todos(F, frames1, x1, frames2, x2, tolerancia=TOLERANCIA_EPIPOLAR, bloque=BLOQUE_PARES):
+    """
+    Same pairs as candidatos_epipolares(), comparing every pair of observations of each
+    frame (reference for the buckets), about `bloque` pairs at a time.
+    """
+    orden1, orden2 = np.argsort(frames1, kind="stable"), np.argsort(frames2, kind="stable")
+    f1, f2 = frames1[orden1], frames2[orden2]
+    valores, inicios, cuentas = np.unique(f1, return_index=True, return_counts=True)
+    pares = cuentas * (np.searchsorted(f2, valores, side="right") - np.searchsorted(f2, valores, side="left"))
+    grupos = np.cumsum(pares) // max(bloque, 1)
+
+    salida_i, salida_j, salida_d = [], [], []
+    for g in np.unique(grupos):
+        frames_grupo = np.flatnonzero(grupos == g)
+        a = inicios[frames_grupo[0]]
+        b = inicios[frames_grupo[-1]] + cuentas[frames_grupo[-1]]
+        i, posicion = _rangos(f2, f1[a:b])
+        i, j = orden1[a + i], orden2[posicion]
+        distancias = distancias_epipolares(F, x1[i], x2[j])
+        validos = distancias < tolerancia
+        salida_i.append(i[validos]), salida_j.append(j[validos]), salida_d.append(distancias[validos])
+    if not salida_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0)
+    return np.concatenate(salida_i), np.concatenate(salida_j), np.concatenate(salida_d)
+
+
+# --------------------------------------------------------------------------------
+# 4) TRACK CORRESPONDENCE
+# --------------------------------------------------------------------------------
+
+def emparejar_tracks(referencia, otra, P_referencia, P_otra, tolerancia=TOLERANCIA_EPIPOLAR,
+                     votos_minimos=VOTOS_MINIMOS, fraccion_votos=FRACCION_VOTOS, indexar=True):
+    """
+    One-to-one correspondence between the tracks of the reference camera and those of
+    another camera.
+
+    Args:
+        referencia, otra (tracks.TrackSet): 2D tracks with "frame" and "centroide".
+        P_referencia, P_otra (np.ndarray): (3, 4) projection matrices.
+        indexar (bool): Use the epipolar buckets (False compares all pairs per frame).
+
+    Returns:
+        np.ndarray: (K_referencia,) index of the matched track of `otra`, or -1.
+    """
+    F, e2 = fundamental(P_referencia, P_otra)
+    frames1, x1 = referencia["frame"], referencia["centroide"]
+    frames2, x2 = otra["frame"], otra["centroide"]
+    if indexar:
+        i, j, distancias = candidatos_epipolares(F, e2, frames1, x1, frames2, x2, tolerancia)
+    else:
+        i, j, distancias = candidatos_todos(F, frames1, x1, frames2, x2, tolerancia)
+
+    # Votes and summed distance of every track pair
+    t1, t2 = referencia.indice_track()[i], otra.indice_track()[j]
+    pares, inverso, votos = np.unique(t1 * len(otra) + t2, return_inverse=True, return_counts=True)
+    suma = np.bincount(inverso, weights=distancias, minlength=len(pares))
+    a, b = pares // max(len(otra), 1), pares % max(len(otra), 1)
+
+    # Frames both tracks span
+    solape = np.minimum(referencia.maximo("frame")[a], otra.maximo("frame")[b]) \
+        - np.maximum(referencia.minimo("frame")[a], otra.minimo("frame")[b]) + 1
+    aceptados = (votos >= votos_minimos) & (votos >= fraccion_votos * np.maximum(solape, 1))
+
+    # Greedy one-to-one assignment: most votes first, then smallest mean distance
+    emparejado = np.full(len(referencia), -1, dtype=np.int64)
+    usado = np.zeros(len(otra), dtype=bool)
+    candidatos = np.flatnonzero(aceptados)
+    orden = candidatos[np.lexsort((suma[candidatos] / votos[candidatos], -votos[candidatos]))]
+    for k in orden.tolist():
+        if emparejado[a[k]] < 0 and not usado[b[k]]:
+            emparejado[a[k]] = b[k]
+            usado[b[k]] = True
+    return emparejado
+
+
+# --------------------------------------------------------------------------------
+# 5) TRIANGULATION
+# --------------------------------------------------------------------------------
+
+def _linea_2d(centroides, angulos):
+    # Homogeneous image line through each centroid with its angle
+    rad = np.radians(angulos)
+    s, c = np.sin(rad), np.cos(rad)
+    return np.stack([s, -c, c * centroides[..., 1] - s * centroides[..., 0]], axis=-1)
+
+
+def triangular(proyecciones, centroides, angulos, largos):
+    """
+    3D position, direction and length of M fiber observations seen by up to C cameras.
+
+    Args:
+        proyecciones (np.ndarray): (C, 3, 4) projection matrices.
+        centroides (np.ndarray): (M, C, 2) image centroids, NaN where a camera does not see the fiber.
+        angulos (np.ndarray): (M, C) signed image angles (degrees).
+        largos (np.ndarray): (M, C) image lengths.
+
+    Returns:
+        tuple: (positions (M, 3), unit directions (M, 3), lengths (M,)). Observations
+        seen by fewer than two cameras are NaN.
+    """
+    visto = ~np.isnan(centroides[..., 0])
+    c = np.where(visto[..., None], centroides, 0.0)
+
+    # DLT: two rows per camera, zero for the cameras that do not see the fiber
+    filas = np.concatenate([
+        c[..., 0:1] * proyecciones[None, :, 2] - proyecciones[None, :, 0],
+        c[..., 1:2] * proyecciones[None, :, 2] - proyecciones[None, :, 1],
+    ], axis=1) * np.concatenate([visto, visto], axis=1)[..., None]
+    X = np.linalg.svd(filas)[2][:, -1]
+    posiciones = X[:, :3] / X[:, 3:4]
+
+    # Direction: common line of the planes back-projected from every 2D fiber line
+    planos = np.einsum("mcj,cjk->mck", _linea_2d(c, np.where(visto, angulos, 0.0)), proyecciones)[..., :3]
+    planos = planos / np.linalg.norm(planos, axis=2, keepdims=True) * visto[..., None]
+    direcciones = np.linalg.svd(planos)[2][:, -1]
+    direcciones *= np.where(direcciones[:, 2] < 0, -1.0, 1.0)[:, None]   # Axial: z >= 0
+
+    # Length: image length over the projected length of a unit segment, averaged over the cameras
+    extremos = np.stack([posiciones - direcciones / 2, posiciones + direcciones / 2], axis=1)
+    proyectados = np.einsum("cij,mej->mcei", proyecciones[..., :3], extremos) + proyecciones[:, :, 3][None, :, None]
+    proyectados = proyectados[..., :2] / proyectados[..., 2:3]
+    unidad = np.linalg.norm(proyectados[:, :, 1] - proyectados[:, :, 0], axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        largos_3d = np.nanmean(np.where(visto, largos / unidad, np.nan), axis=1)
+
+    pocas = visto.sum(axis=1) < 2
+    posiciones[pocas] = np.nan
+    direcciones[pocas] = np.nan
+    largos_3d[pocas] = np.nan
+    return posiciones, direcciones, largos_3d
+
+
+def _filas_de(conjunto, emparejado, frames_referencia, indice_referencia):
+    # Row of `conjunto` holding the matched track at the frame of every reference row, or -1
+    t = emparejado[indice_referencia]
+    filas = np.full(len(t), -1, dtype=np.int64)
+    if not len(conjunto["frame"]):
+        return filas
+    periodo = int(max(conjunto["frame"].max(), frames_referencia.max(initial=0))) + 1
+    claves = conjunto.indice_track() * periodo + conjunto["frame"]
+    orden = np.argsort(claves, kind="stable")
+    ordenadas = claves[orden]
+    buscar = np.flatnonzero(t >= 0)
+    consulta = t[buscar] * periodo + frames_referencia[buscar]
+    posicion = np.minimum(np.searchsorted(ordenadas, consulta), len(ordenadas) - 1)
+    encontrada = ordenadas[posicion] == consulta
+    filas[buscar[encontrada]] = orden[posicion[encontrada]]
+    return filas
+
+
+def reconstruir(conjuntos, proyecciones, tolerancia=TOLERANCIA_EPIPOLAR, indexar=True):
+    """
+    3D tracks from the 2D tracks of every camera (the first one is the reference).
+
+    Args:
+        conjuntos (list): tracks.TrackSet of every camera ("frame", "centroide",
+            "angulo", "largo_maximo").
+        proyecciones (list): (3, 4) projection matrix of every camera.
+
+    Returns:
+        tuple: (tracks.TrackSet with "frame", "posicion", "direccion", "largo",
+        "centroide_camaras" (M, C, 2), "angulo_camaras" (M, C) of the reference tracks
+        matched in at least one other camera, only at frames seen by two cameras or
+        more; (K, C) IDs of the matched 2D track in every camera ("" if none)).
+    """
+    referencia = conjuntos[0]
+    C = len(conjuntos)
+    emparejados = [np.arange(len(referencia))] + [
+        emparejar_tracks(referencia, otra, proyecciones[0], P, tolerancia, indexar=indexar)
+        for otra, P in zip(conjuntos[1:], proyecciones[1:])
+    ]
+
+    M = len(referencia["frame"])
+    indice = referencia.indice_track()
+    centroides = np.full((M, C, 2), np.nan)
+    angulos = np.full((M, C), np.nan)
+    largos = np.full((M, C), np.nan)
+    for k, (conjunto, emparejado) in enumerate(zip(conjuntos, emparejados)):
+        filas = _filas_de(conjunto, emparejado, referencia["frame"], indice)
+        hay = filas >= 0
+        centroides[hay, k] = conjunto["centroide"][filas[hay]]
+        angulos[hay, k] = conjunto["angulo"][filas[hay]]
+        largos[hay, k] = conjunto["largo_maximo"][filas[hay]]
+
+    posiciones, direcciones, largos_3d = triangular(np.stack(proyecciones), centroides, angulos, largos)
+
+    # Keep the observations seen by two cameras or more
+    validas = ~np.isnan(posiciones[:, 0])
+    por_track = np.bincount(indice[validas], minlength=len(referencia))
+    offsets = np.concatenate([[0], np.cumsum(por_track)])
+    resultado = tracks.TrackSet(referencia.ids, offsets, {
+        "frame": referencia["frame"][validas],
+        "posicion": posiciones[validas],
+        "direccion": direcciones[validas],
+        "largo": largos_3d[validas],
+        "centroide_camaras": centroides[validas],
+        "angulo_camaras": angulos[validas],
+    })
+    ids_camaras = np.full((len(referencia), C), "", dtype=object)
+    for k, (conjunto, emparejado) in enumerate(zip(conjuntos, emparejados)):
+        hay = emparejado >= 0
+        ids_camaras[hay, k] = conjunto.ids[emparejado[hay]]
+    ids_camaras = ids_camaras.astype(str)
+    con_datos = por_track > 0
+    return resultado.filtrar(con_datos), ids_camaras[con_datos]
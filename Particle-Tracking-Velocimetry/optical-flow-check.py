@@ -0,0 +1,74 @@
+import cv2
+import numpy as np
+
+import flujo_optico
+import tracking
+import video_sintetico
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# One fiber turning OMEGA degrees per frame, detected on the first image and
+# propagated with flujo_optico.propagar() on every other one. Starting near 180
+# degrees it crosses the +-180 boundary: the propagated angles must stay in
+# (-180, 180] and the fiber must stay one track, as it does away from the boundary.
+ANGULOS_INICIALES = [120.0, 178.0]
+OMEGA = 0.8               # Degrees per frame
+N_FRAMES = 30
+CENTRO = (512.0, 512.0)
+LARGO = 80.0
+TAMANO = 1024
+
+# =============================================================================
+# 2) RUN
+# =============================================================================
+
+def imagen(angulo):
+    """
+    Grayscale image with the fiber drawn at the given angle.
+    """
+    gris = np.full((TAMANO, TAMANO), video_sintetico.FONDO, dtype=np.uint8)
+    x1, y1, x2, y2 = flujo_optico.segmentos([CENTRO], [angulo], [LARGO])[0]
+    cv2.line(gris, (x1, y1), (x2, y2), video_sintetico.BRILLO, 3)
+    return gris
+
+
+def ejecutar(angulo_inicial):
+    """
+    Detects the fiber on the first image and propagates it over the rest.
+
+    Returns:
+        tracks (int): Number of tracks made of the fiber.
+        angulos (np.ndarray): Every angle stored in the tracks.
+    """
+    estado = tracking.nuevo_estado()
+    anterior = imagen(angulo_inicial)
+    tracking.procesar_frame(estado, 0, [CENTRO], [angulo_inicial], [LARGO])
+    for idx in range(1, N_FRAMES):
+        gris = imagen(angulo_inicial + OMEGA * idx)
+        centroids, angles, max_lengths, _ = flujo_optico.propagar(anterior, gris, estado)
+        tracking.procesar_frame(
+            estado, idx, centroids.tolist(), angles.tolist(), max_lengths.tolist(), propagado=True
+        )
+        anterior = gris
+    angulos = np.array([a[0] for fibra in estado["dictionary"].values() for a in fibra["angulo"]])
+    return len(estado["dictionary"]), angulos
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    for angulo_inicial in ANGULOS_INICIALES:
+        n_tracks, angulos = ejecutar(angulo_inicial)
+        print(
+            f"Inicio {angulo_inicial:6.1f} grados: {n_tracks} track(s), "
+            f"ángulos en [{angulos.min():.1f}, {angulos.max():.1f}]"
+        )
+        if n_tracks != 1:
+            raise RuntimeError(f"The propagated fiber starting at {angulo_inicial} was split into {n_tracks} tracks")
+        if angulos.max() > 180 or angulos.min() <= -180:
+            raise RuntimeError(f"Propagated angles outside (-180, 180] starting at {angulo_inicial}")
+
+if __name__ == "__main__":
+    main()
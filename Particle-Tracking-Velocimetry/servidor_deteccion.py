@@ -0,0 +1,322 @@
+# === DETECTION SERVER ===
+#
+# Long-lived process that holds one warmed-up detector (detectores.crear(), e.g. the
+# YOLO model with its runtime already imported and its first inference already paid)
+# and serves detections over a Unix socket, so a ptv() run or an ad-hoc script does not
+# import ultralytics / torch and reload best.pt every time. Requests carry frame paths
+# (decoded by the server) or frames in a shared-memory block written by the client.
+# Requests arriving close together, from one or several clients, are coalesced into a
+# single detectar_lote() call. The client side (conectar(), detectar()) only needs
+# NumPy, so it starts in a fraction of a second.
+#
+# Messages are framed as: 8-byte header (JSON length, payload length, big endian),
+# JSON, raw payload.
+
+import json
+import logging
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+import numpy as np
+
+logger = logging.getLogger("ptv")
+
+RUTA_SOCKET = "/tmp/ptv-deteccion.sock"
+TAMANO_LOTE = 8          # Most frames per detectar_lote() call
+ESPERA_LOTE_MS = 5.0     # Time the first request of a batch waits for others to join it
+FORMA_CALENTAMIENTO = (1024, 1024, 3)   # Frame detected once at startup (first-inference cost)
+
+_CABECERA = struct.Struct("!II")
+
+
+# --------------------------------------------------------------------------------
+# 1) FRAMING
+# --------------------------------------------------------------------------------
+
+def _recibir_exacto(conexion, n):
+    datos = bytearray(n)
+    vista = memoryview(datos)
+    leidos = 0
+    while leidos < n:
+        k = conexion.recv_into(vista[leidos:], n - leidos)
+        if k == 0:
+            raise ConnectionError("Connection closed")
+        leidos += k
+    return datos
+
+
+def enviar(conexion, cabecera, carga=b""):
+    texto = json.dumps(cabecera).encode("utf-8")
+    conexion.sendall(_CABECERA.pack(len(texto), len(carga)) + texto)
+    if len(carga):
+        conexion.sendall(carga)
+
+
+def recibir(conexion):
+    """
+    (JSON header, payload bytes) of the next message.
+    """
+    largo_texto, largo_carga = _CABECERA.unpack(_recibir_exacto(conexion, _CABECERA.size))
+    cabecera = json.loads(_recibir_exacto(conexion, largo_texto))
+    carga = _recibir_exacto(conexion, largo_carga) if largo_carga else b""
+    return cabecera, carga
+
+
+# --------------------------------------------------------------------------------
+# 2) SERVER
+# --------------------------------------------------------------------------------
+
+def _adjuntar(nombre, pid):
+    # The block belongs to the client, which unlinks it; the server only maps it (and
+    # must not let its own resource tracker unlink it, unless both are the same process)
+    memoria = shared_memory.SharedMemory(name=nombre)
+    if pid != os.getpid():
+        resource_tracker.unregister(memoria._name, "shared_memory")
+    return memoria
+
+
+def _frames_de(peticion, con_gris):
+    """
+    Frames of one request, converted to the input of the detector. Shared-memory frames
+    are copied, so the client can reuse its block as soon as it gets the answer.
+    """
+    import cv2
+
+    if "rutas" in peticion:
+        modo = cv2.IMREAD_GRAYSCALE if con_gris else cv2.IMREAD_COLOR
+        frames = [cv2.imread(ruta, modo) for ruta in peticion["rutas"]]
+        faltantes = [r for r, f in zip(peticion["rutas"], frames) if f is None]
+        if faltantes:
+            raise FileNotFoundError(f"Could not read image: {faltantes[0]}")
+        return frames
+
+    memoria = _adjuntar(peticion["memoria"], peticion.get("pid"))
+    try:
+        bloque = np.ndarray(peticion["forma"], dtype=peticion["dtype"], buffer=memoria.buf)
+        frames = []
+        for frame in bloque:
+            if con_gris and frame.ndim == 3:
+                frame = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            elif not con_gris and frame.ndim == 2:
+                frame = cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR)
+            else:
+                frame = frame.copy()
+            frames.append(frame)
+        del bloque
+    finally:
+        memoria.close()
+    return frames
+
+
+def _lotes(detector, pendientes, tamano_lote, espera_lote_ms):
+    # Coalesces the pending requests into detectar_lote() calls of up to tamano_lote frames
+    while True:
+        primera = pendientes.get()
+        if primera is None:
+            return
+        grupo, n = [primera], len(primera["frames"])
+        limite = time.perf_counter() + espera_lote_ms / 1e3
+        while n < tamano_lote:
+            restante = limite - time.perf_counter()
+            try:
+                siguiente = pendientes.get(timeout=max(restante, 0)) if restante > 0 else pendientes.get_nowait()
+            except queue.Empty:
+                break
+            if siguiente is None:
+                pendientes.put(None)
+                break
+            grupo.append(siguiente)
+            n += len(siguiente["frames"])
+        try:
+            salidas = detector["detectar_lote"]([f for p in grupo for f in p["frames"]])
+            a = 0
+            for p in grupo:
+                p["salidas"] = salidas[a:a + len(p["frames"])]
+                a += len(p["frames"])
+        except Exception as e:   # Reported to every client of the batch; the server keeps serving
+            logger.exception("Detection failed")
+            for p in grupo:
+                p["error"] = f"{type(e).__name__}: {e}"
+        for p in grupo:
+            p["listo"].set()
+
+
+def _atender(conexion, detector, pendientes):
+    import detectores
+
+    con_gris = detector["entrada"] == "gris"
+    with conexion:
+        while True:
+            try:
+                peticion, _ = recibir(conexion)
+            except (ConnectionError, struct.error):
+                return
+            if peticion.get("orden") == "info":
+                enviar(conexion, {
+                    "nombre": detector["nombre"], "tipo": detector["tipo"], "entrada": detector["entrada"],
+                    "periodo_angulo": detector["periodo_angulo"], "columnas": list(detectores.COLUMNAS),
+                })
+                continue
+            try:
+                trabajo = {"frames": _frames_de(peticion, con_gris), "listo": threading.Event()}
+            except (OSError, KeyError, TypeError, ValueError) as e:
+                enviar(conexion, {"error": f"{type(e).__name__}: {e}"})
+                continue
+            pendientes.put(trabajo)
+            trabajo["listo"].wait()
+            if "error" in trabajo:
+                enviar(conexion, {"error": trabajo["error"]})
+                continue
+            for k, detecciones in enumerate(trabajo["salidas"]):
+                detecciones[:, detectores.FRAME] = k
+            salida = np.concatenate(trabajo["salidas"]) if trabajo["salidas"] else detectores.vacio()
+            enviar(conexion, {"filas": len(salida)}, np.ascontiguousarray(salida, dtype=np.float64).tobytes())
+
+
+def servir(ruta_socket=RUTA_SOCKET, tipo="yolo", tamano_lote=TAMANO_LOTE, espera_lote_ms=ESPERA_LOTE_MS,
+           forma_calentamiento=FORMA_CALENTAMIENTO, listo=None, **opciones):
+    """
+    Creates and warms up a detector and serves it on a Unix socket until interrupted.
+
+    Args:
+        ruta_socket (str): Socket path (replaced if it exists).
+        tipo (str): Detector type of detectores.crear(); opciones are passed on to it.
+        tamano_lote (int): Most frames per detection call.
+        espera_lote_ms (float): How long a request waits for others to share its batch.
+        forma_calentamiento (tuple): Shape of the blank frame detected at startup, or None.
+        listo (threading.Event): Set once the server accepts connections.
+    """
+    import detectores
+
+    inicio = time.perf_counter()
+    detector = detectores.crear(tipo, **opciones)
+    if forma_calentamiento is not None:
+        blanco = np.zeros(forma_calentamiento, dtype=np.uint8)
+        if detector["entrada"] == "gris":
+            blanco = blanco[..., 0]
+        detector["detectar_lote"]([blanco])
+    logger.info("Detector %s ready in %.2f s", detector["nombre"], time.perf_counter() - inicio)
+
+    if os.path.exists(ruta_socket):
+        os.unlink(ruta_socket)
+    pendientes = queue.Queue()
+    hilo_lotes = threading.Thread(target=_lotes, args=(detector, pendientes, tamano_lote, espera_lote_ms), daemon=True)
+    hilo_lotes.start()
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as servidor:
+        servidor.bind(ruta_socket)
+        servidor.listen()
+        logger.info("Serving on %s", ruta_socket)
+        if listo is not None:
+            listo.set()
+        try:
+            while True:
+                conexion, _ = servidor.accept()
+                threading.Thread(target=_atender, args=(conexion, detector, pendientes), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            pendientes.put(None)
+            os.unlink(ruta_socket)
+
+
+# --------------------------------------------------------------------------------
+# 3) CLIENT
+# --------------------------------------------------------------------------------
+
+def conectar(ruta_socket=RUTA_SOCKET, espera_s=0.0):
+    """
+    Connects to a running server, retrying for up to espera_s seconds.
+
+    Returns:
+        dict: Client with the socket, the detector description and a shared-memory
+        block reused across requests.
+    """
+    limite = time.perf_counter() + espera_s
+    while True:
+        conexion = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conexion.connect(ruta_socket)
+            break
+        except (FileNotFoundError, ConnectionRefusedError):
+            conexion.close()
+            if time.perf_counter() >= limite:
+                raise
+            time.sleep(0.05)
+    enviar(conexion, {"orden": "info"})
+    info, _ = recibir(conexion)
+    return {"conexion": conexion, "info": info, "memoria": None}
+
+
+def _bloque(cliente, n_bytes):
+    # Shared-memory block of at least n_bytes, grown (and the old one unlinked) when needed
+    memoria = cliente["memoria"]
+    if memoria is None or memoria.size < n_bytes:
+        if memoria is not None:
+            memoria.close()
+            memoria.unlink()
+        memoria = cliente["memoria"] = shared_memory.SharedMemory(create=True, size=n_bytes)
+    return memoria
+
+
+def detectar(cliente, rutas=None, frames=None):
+    """
+    Detections of several frames, given as paths (decoded by the server) or as arrays
+    of one shape (copied to shared memory).
+
+    Returns:
+        list: One detections array per frame, with the detectores.COLUMNAS layout
+        ("frame" is the position in the request).
+
+    Raises:
+        RuntimeError: With the server's message when the request fails.
+    """
+    if (rutas is None) == (frames is None):
+        raise ValueError("Give either rutas or frames")
+    if rutas is not None:
+        n = len(rutas)
+        enviar(cliente["conexion"], {"rutas": [os.path.abspath(r) for r in rutas]})
+    else:
+        n = len(frames)
+        bloque = np.stack([np.asarray(f) for f in frames])
+        memoria = _bloque(cliente, bloque.nbytes)
+        np.ndarray(bloque.shape, dtype=bloque.dtype, buffer=memoria.buf)[...] = bloque
+        enviar(cliente["conexion"], {
+            "memoria": memoria.name, "forma": list(bloque.shape), "dtype": bloque.dtype.str, "pid": os.getpid(),
+        })
+
+    respuesta, carga = recibir(cliente["conexion"])
+    if "error" in respuesta:
+        raise RuntimeError(respuesta["error"])
+    detecciones = np.frombuffer(carga, dtype=np.float64).reshape(-1, len(cliente["info"]["columnas"]))
+    cortes = np.searchsorted(detecciones[:, cliente["info"]["columnas"].index("frame")], np.arange(1, n), side="left")
+    return np.split(detecciones, cortes)
+
+
+def detector_remoto(cliente):
+    """
+    Detector dict (see detectores.crear()) whose detectar_lote() sends the frames to
+    the server, so a client runs the same code path as a local detector. The client
+    stays in its "cliente" key, to be closed with cerrar().
+    """
+    info = cliente["info"]
+    return {
+        "nombre": info["nombre"], "tipo": info["tipo"], "entrada": info["entrada"],
+        "periodo_angulo": info["periodo_angulo"], "cliente": cliente,
+        "detectar_lote": lambda frames: detectar(cliente, frames=frames),
+    }
+
+
+def cerrar(cliente):
+    """
+    Closes the connection and releases the shared-memory block.
+    """
+    if cliente["memoria"] is not None:
+        cliente["memoria"].close()
+        cliente["memoria"].unlink()
+        cliente["memoria"] = None
+    cliente["conexion"].close()
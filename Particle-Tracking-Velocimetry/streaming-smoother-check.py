@@ -0,0 +1,69 @@
+import numpy as np
+
+import suavizado
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Synthetic online run: tracks start and end at random frames, some frames have no
+# live sample at all (as an online tracker sees them), and every frame goes through
+# suavizado.actualizar(). Each output must equal the Savitzky-Golay fit of the last
+# samples of its track evaluated at the newest one, computed directly per track.
+N_TRACKS = 200
+N_FRAMES = 300
+CANALES = 2
+FRAMES_VACIOS = 0.1    # Fraction of frames without any sample
+VENTANA = suavizado.VENTANA
+ORDEN = suavizado.ORDEN_SAVGOL
+SEMILLA = 0
+
+# =============================================================================
+# 2) REFERENCE
+# =============================================================================
+
+def referencia(historia, ventana, orden):
+    """
+    Causal Savitzky-Golay value at the newest sample of one track: least-squares
+    polynomial fit of its last samples (degree capped by their count).
+    """
+    muestras = np.asarray(historia[-ventana:])
+    n = len(muestras)
+    grado = min(orden, n - 1)
+    t = np.arange(n) - (n - 1)
+    A = np.vander(t, grado + 1, increasing=True)
+    coeficientes = np.linalg.lstsq(A, muestras, rcond=None)[0]
+    return coeficientes[0]
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    rng = np.random.default_rng(SEMILLA)
+    inicios = rng.integers(0, N_FRAMES, size=N_TRACKS)
+    fines = np.minimum(inicios + rng.integers(1, 80, size=N_TRACKS), N_FRAMES)
+    vacios = rng.random(N_FRAMES) < FRAMES_VACIOS
+
+    estado = suavizado.nuevo_suavizador(canales=CANALES, ventana=VENTANA, orden=ORDEN, capacidad=8)
+    historias = {}
+    error_maximo, frames_vacios = 0.0, 0
+    for frame in range(N_FRAMES):
+        vivos = [] if vacios[frame] else [str(k) for k in np.flatnonzero((inicios <= frame) & (frame < fines))]
+        valores = rng.normal(size=(len(vivos), CANALES))
+        salida = suavizado.actualizar(estado, vivos, valores)
+        if salida.shape != (len(vivos), CANALES):
+            raise RuntimeError(f"Frame {frame}: output shape {salida.shape}")
+        frames_vacios += not vivos
+
+        for fiber_id, valor, suavizado_id in zip(vivos, valores, salida):
+            historias.setdefault(fiber_id, []).append(valor)
+            esperado = referencia(historias[fiber_id], VENTANA, ORDEN)
+            error_maximo = max(error_maximo, float(np.abs(suavizado_id - esperado).max()))
+        suavizado.olvidar(estado, [str(k) for k in np.flatnonzero(fines == frame + 1)])
+
+    print(f"{N_FRAMES} frames ({frames_vacios} sin muestras), error máximo {error_maximo:.2e}")
+    if error_maximo > 1e-9:
+        raise RuntimeError("The streaming smoother differs from the per-track fit")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# === TRACK SMOOTHING ===
+#
+# Smoothing and differentiation of every track at once. The tracks are stored back to
+# back in one buffer (values (N,) or (N, C)) with an offsets array (K + 1,) marking
+# where each track starts, and every filter is a gather of each sample's window plus a
+# weighted sum, so there is no loop over the fibers. Windows never cross from one track
+# into the next: near the ends of a track the moving average shrinks symmetrically and
+# the Savitzky-Golay filter fits its polynomial to the first / last full window, instead
+# of the zero padding of np.convolve(mode="same"). The streaming variant keeps the last
+# samples of every live track and smooths causally, one frame at a time.
+
+import numpy as np
+from scipy.signal import savgol_coeffs
+
+VENTANA = 5           # Samples per window (odd)
+ORDEN_SAVGOL = 2      # Polynomial order of the Savitzky-Golay filter
+
+
+# --------------------------------------------------------------------------------
+# 1) RAGGED BUFFERS
+# --------------------------------------------------------------------------------
+
+def offsets_desde_largos(largos):
+    """
+    (K + 1,) offsets of tracks with the given lengths.
+    """
+    return np.concatenate([[0], np.cumsum(largos, dtype=np.int64)])
+
+
+def _posiciones(offsets):
+    # Track of every sample, first index of its track, and track length
+    largos = np.diff(offsets)
+    track = np.repeat(np.arange(len(largos)), largos)
+    return track, offsets[:-1][track], largos[track]
+
+
+def diferencias(valores, offsets):
+    """
+    Consecutive differences within every track (np.diff per track).
+
+    Returns:
+        tuple: (differences (N - K',), offsets) with one sample fewer per non-empty track.
+    """
+    valores = np.asarray(valores)
+    largos = np.diff(offsets)
+    validas = np.ones(max(len(valores) - 1, 0), dtype=bool)
+    # Pairs straddling two tracks (empty tracks at either end straddle nothing)
+    cortes = offsets[1:-1]
+    validas[cortes[(cortes > 0) & (cortes < len(valores))] - 1] = False
+    return np.diff(valores, axis=0)[validas], offsets_desde_largos(np.maximum(largos - 1, 0))
+
+
+def diferencia_angular(a, b):
+    """
+    a - b wrapped to (-180, 180] degrees, as convolutionate.angular_difference().
+    """
+    d = np.asarray(a, dtype=float) - np.asarray(b, dtype=float)
+    return d - 360.0 * np.ceil((d - 180.0) / 360.0)
+
+
+def desenrollar(angulos, offsets):
+    """
+    Angles (degrees) of every track made continuous: each step is the smallest angular
+    difference to the previous sample, so derivatives see no 360 degree jumps.
+    """
+    angulos = np.asarray(angulos, dtype=float)
+    pasos, _ = diferencias(angulos, offsets)
+    pasos = diferencia_angular(pasos, 0.0)
+    track, inicio, _ = _posiciones(offsets)
+    # Steps of the track before each sample: global cumsum minus the one at the track start
+    acumulado = np.concatenate([np.zeros((1, *angulos.shape[1:])), np.cumsum(pasos, axis=0)])
+    return angulos[inicio] + acumulado[np.arange(len(angulos)) - track] - acumulado[inicio - track]
+
+
+# --------------------------------------------------------------------------------
+# 2) BATCHED FILTERS
+# --------------------------------------------------------------------------------
+
+def media_movil(valores, offsets, ventana=VENTANA, borde="reducir"):
+    """
+    Centered moving average of every track.
+
+    Args:
+        valores (np.ndarray): (N,) or (N, C) samples of all tracks.
+        offsets (np.ndarray): (K + 1,) track offsets.
+        ventana (int): Window length (odd).
+        borde (str): "reducir" shrinks the window symmetrically near the ends of a
+            track (the first and last samples are kept as they are); "reflejar"
+            mirrors the track around its end samples.
+
+    Returns:
+        np.ndarray: Smoothed samples, same shape as valores.
+    """
+    valores = np.asarray(valores, dtype=float)
+    h = int(ventana) // 2
+    track, inicio, largo = _posiciones(offsets)
+    p = np.arange(len(valores)) - inicio
+
+    if borde == "reducir":
+        # One cumsum pass: full windows with shifted slices, and only the samples closer
+        # than h to an end of their track with a half-width reduced to that distance
+        acumulado = np.concatenate([np.zeros((1, *valores.shape[1:])), np.cumsum(valores, axis=0)])
+        salida = valores.copy()
+        if len(valores) > 2 * h:
+            salida[h:len(valores) - h] = (acumulado[2 * h + 1:] - acumulado[:len(valores) - 2 * h]) / (2 * h + 1)
+        media = np.minimum(p, largo - 1 - p)
+        i = np.flatnonzero(media < h)
+        media = media[i]
+        n = (2 * media + 1).reshape(-1, *([1] * (valores.ndim - 1)))
+        salida[i] = (acumulado[i + media + 1] - acumulado[i - media]) / n
+        return salida
+    if borde == "reflejar":
+        k = np.arange(-h, h + 1)
+        return valores[_reflejar(p[:, None] + k[None, :], inicio, largo)].mean(axis=1)
+    raise ValueError(f"Unknown border mode: {borde}")
+
+
+def _reflejar(q, inicio, largo):
+    # Indices q (relative to the track start) mirrored into [0, largo) without repeating the end sample
+    ultimo = np.maximum(largo - 1, 1)[:, None]
+    periodo = 2 * ultimo
+    q = np.abs(q) % periodo
+    q = np.where(q > ultimo, periodo - q, q)
+    return inicio[:, None] + np.minimum(q, (largo - 1)[:, None])
+
+
+def _tabla_savgol(ventana, orden, derivada, dt):
+    # (ventana, ventana) coefficients: row j evaluates the fit at sample j of the window
+    return np.array([
+        savgol_coeffs(ventana, min(orden, ventana - 1), deriv=derivada, delta=dt, pos=j, use="dot")
+        for j in range(ventana)
+    ])
+
+
+def savgol(valores, offsets, ventana=VENTANA, orden=ORDEN_SAVGOL, derivada=0, dt=1.0):
+    """
+    Savitzky-Golay smoothing (derivada=0) or derivative of every track.
+
+    Each sample is evaluated on the polynomial fitted to the window centered on it, or
+    to the first / last full window of its track near the ends. Tracks shorter than the
+    window use a window as long as the track (order reduced to fit).
+
+    Args:
+        valores (np.ndarray): (N,) or (N, C) samples of all tracks.
+        offsets (np.ndarray): (K + 1,) track offsets.
+        ventana (int): Window length.
+        orden (int): Polynomial order.
+        derivada (int): Derivative order (1 = velocity from positions).
+        dt (float): Time between samples.
+
+    Returns:
+        np.ndarray: Filtered samples, same shape as valores (0 where a track is too short
+        for the requested derivative).
+    """
+    valores = np.asarray(valores, dtype=float)
+    salida = np.zeros_like(valores)
+    track, inicio, largo = _posiciones(offsets)
+    p = np.arange(len(valores)) - inicio
+
+    # One coefficient table per window length: the full window, and each shorter track length
+    w = np.minimum(largo, ventana)
+    for longitud in np.unique(w):
+        sel = np.flatnonzero(w == longitud)
+        if longitud <= derivada:
+            continue
+        tabla = _tabla_savgol(int(longitud), orden, derivada, dt)
+        h = int(longitud) // 2
+        comienzo = np.clip(p[sel] - h, 0, largo[sel] - longitud)
+        ventanas = inicio[sel, None] + comienzo[:, None] + np.arange(longitud)[None, :]
+        coeficientes = tabla[p[sel] - comienzo]
+        if valores.ndim == 1:
+            salida[sel] = (coeficientes * valores[ventanas]).sum(axis=1)
+        else:
+            salida[sel] = np.einsum("nk,nkc->nc", coeficientes, valores[ventanas])
+    return salida
+
+
+# --------------------------------------------------------------------------------
+# 3) CAUSAL STREAMING SMOOTHER
+# --------------------------------------------------------------------------------
+
+def nuevo_suavizador(canales=1, ventana=VENTANA, orden=ORDEN_SAVGOL, derivada=0, dt=1.0, capacidad=64):
+    """
+    Returns an empty causal smoother for use frame by frame (e.g. inside the tracker).
+
+    Every live track keeps only its last `ventana` samples in a ring buffer, so memory
+    is constant per track. The output of each frame is the Savitzky-Golay fit of those
+    samples evaluated at the newest one (orden=0 with derivada=0 is a trailing moving
+    average).
+
+    Returns:
+        dict: State for actualizar() / olvidar().
+    """
+    tablas = [None] + [
+        savgol_coeffs(n, min(orden, n - 1), deriv=derivada, delta=dt, pos=n - 1, use="dot") if n > derivada else None
+        for n in range(1, ventana + 1)
+    ]
+    return {
+        "ventana": ventana,
+        "tablas": tablas,
+        "buffer": np.zeros((capacidad, ventana, canales)),
+        "vistos": np.zeros(capacidad, dtype=np.int64),
+        "huecos": list(range(capacidad - 1, -1, -1)),
+        "slot": {},
+    }
+
+
+def _crecer(estado):
+    # Doubles the capacity of the ring buffers
+    capacidad = len(estado["vistos"])
+    estado["buffer"] = np.concatenate([estado["buffer"], np.zeros_like(estado["buffer"])])
+    estado["vistos"] = np.concatenate([estado["vistos"], np.zeros(capacidad, dtype=np.int64)])
+    estado["huecos"].extend(range(2 * capacidad - 1, capacidad - 1, -1))
+
+
+def actualizar(estado, ids, valores):
+    """
+    Adds the samples of one frame and returns their smoothed values.
+
+    Args:
+        estado (dict): State created by nuevo_suavizador().
+        ids (list): Track ID of every sample (new IDs start a track).
+        valores (array_like): (M, C) samples of this frame, in the order of ids.
+
+    Returns:
+        np.ndarray: (M, C) smoothed values (NaN for tracks with too few samples for the
+        requested derivative).
+    """
+    valores = np.asarray(valores, dtype=float).reshape(len(ids), estado["buffer"].shape[2])
+    slots = np.empty(len(ids), dtype=np.int64)
+    for n, fiber_id in enumerate(ids):
+        slot = estado["slot"].get(fiber_id)
+        if slot is None:
+            if not estado["huecos"]:
+                _crecer(estado)
+            slot = estado["slot"][fiber_id] = estado["huecos"].pop()
+            estado["vistos"][slot] = 0
+        slots[n] = slot
+
+    ventana = estado["ventana"]
+    vistos = estado["vistos"]
+    estado["buffer"][slots, vistos[slots] % ventana] = valores
+    vistos[slots] += 1
+
+    salida = np.full(valores.shape, np.nan)
+    disponibles = np.minimum(vistos[slots], ventana)
+    for n in np.unique(disponibles):
+        tabla = estado["tablas"][n]
+        if tabla is None:
+            continue
+        sel = np.flatnonzero(disponibles == n)
+        # Samples of the window in time order (oldest first) out of the ring buffer
+        orden = (vistos[slots[sel], None] - n + np.arange(n)[None, :]) % ventana
+        salida[sel] = np.einsum("k,mkc->mc", tabla, estado["buffer"][slots[sel, None], orden])
+    return salida
+
+
+def olvidar(estado, ids):
+    """
+    Frees the buffers of tracks that ended.
+    """
+    for fiber_id in ids:
+        slot = estado["slot"].pop(fiber_id, None)
+        if slot is not None:
+            estado["huecos"].append(slot)
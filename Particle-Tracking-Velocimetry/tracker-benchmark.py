@@ -0,0 +1,231 @@
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+import instrumentacion
+import tracking
+
+# =============================================================================
+# 1) SWEEP PARAMETERS
+# =============================================================================
+# Every combination of these values is benchmarked. Detections are synthetic, so
+# no images or detector are involved: only tracking.procesar_frame() is timed.
+FIBRAS = [25, 100, 800, 10000]      # Fibers present in each frame
+FRAMES = [20]                        # Frames per run
+COMPUERTAS = [5, 10, 20]             # variacion_x = variacion_y (pixels)
+TASAS_PERDIDA = [0.0, 0.05, 0.2]     # Probability that a fiber is not detected in a frame
+
+# Memory and the per-stage profile are measured once per fiber count, on the reference
+# configuration. Above FIBRAS_BARRIDO_COMPLETO only the reference configuration runs,
+# on FRAMES_GRANDES frames (10000 fibers track at about 0.2 fps)
+COMPUERTA_REFERENCIA = 10
+TASA_REFERENCIA = 0.05
+FIBRAS_BARRIDO_COMPLETO = 800
+FRAMES_GRANDES = 10
+
+# Synthetic scene (same size as the recordings)
+ANCHO, ALTO = 1024, 1024
+VELOCIDAD_MAX = 3.0       # Maximum displacement per frame (pixels)
+OMEGA_MAX = 1.0           # Maximum rotation per frame (degrees)
+LARGO_MIN, LARGO_MAX = 30.0, 120.0
+SEMILLA = 0
+
+# Output report
+ruta_reporte = "Particle-Tracking-Velocimetry/tracker_benchmark.json"
+
+# =============================================================================
+# 2) SYNTHETIC DETECTIONS
+# =============================================================================
+
+def generar_detecciones(n_fibras, n_frames, tasa_perdida, semilla=SEMILLA):
+    """
+    Generates per-frame detection arrays for fibers moving with constant velocity
+    and angular velocity, bouncing on the borders of the image.
+
+    Args:
+        n_fibras (int): Number of fibers in the scene.
+        n_frames (int): Number of frames to generate.
+        tasa_perdida (float): Probability of dropping each detection in each frame.
+        semilla (int): Seed of the random generator.
+
+    Returns:
+        list: One (centroids (M, 2), angles (M,), lengths (M,)) tuple per frame, with the
+        detections shuffled so their order carries no identity information.
+    """
+    rng = np.random.default_rng(semilla)
+
+    posiciones = rng.uniform([0, 0], [ANCHO, ALTO], size=(n_fibras, 2))
+    velocidades = rng.uniform(-VELOCIDAD_MAX, VELOCIDAD_MAX, size=(n_fibras, 2))
+    angulos = rng.uniform(-180, 180, size=n_fibras)
+    omegas = rng.uniform(-OMEGA_MAX, OMEGA_MAX, size=n_fibras)
+    largos = rng.uniform(LARGO_MIN, LARGO_MAX, size=n_fibras)
+
+    frames = []
+    for _ in range(n_frames):
+        visibles = np.flatnonzero(rng.random(n_fibras) >= tasa_perdida)
+        visibles = rng.permutation(visibles)
+        frames.append((
+            posiciones[visibles].copy(),
+            (angulos[visibles] + 180) % 360 - 180,
+            largos[visibles].copy(),
+        ))
+
+        # Advance the scene one frame, reflecting on the borders
+        posiciones += velocidades
+        fuera = (posiciones < 0) | (posiciones > [ANCHO, ALTO])
+        velocidades[fuera] *= -1
+        posiciones = np.clip(posiciones, 0, [ANCHO, ALTO])
+        angulos += omegas
+
+    return frames
+
+# =============================================================================
+# 3) BENCHMARK OF A SINGLE CONFIGURATION
+# =============================================================================
+
+def ejecutar_tracker(frames, perfil=None):
+    """
+    Runs the tracking core over the given frames and returns the final state
+    and the wall time spent in each frame (seconds). With a profile, the
+    predict / gate / assign stages and the association counters are recorded too.
+    """
+    estado = tracking.nuevo_estado()
+    tiempos = np.empty(len(frames))
+    for idx, (centroids, angles, max_lengths) in enumerate(frames):
+        instrumentacion.iniciar_frame(perfil, idx)
+        inicio = time.perf_counter()
+        tracking.procesar_frame(estado, idx, centroids.tolist(), angles.tolist(), max_lengths.tolist(), perfil)
+        tiempos[idx] = time.perf_counter() - inicio
+        instrumentacion.cerrar_frame(perfil)
+    return estado, tiempos
+
+
+def medir_memoria(frames):
+    """
+    Runs the tracking core under tracemalloc and returns the peak traced memory
+    (bytes), and the traced bytes and memory blocks each frame leaves allocated (net
+    growth of the state, not the allocations made and freed within the frame).
+    Kept apart from the timing run because tracemalloc slows every allocation.
+    """
+    estado = tracking.nuevo_estado()
+    retenidos = np.empty(len(frames), dtype=np.int64)
+    bloques = np.empty(len(frames), dtype=np.int64)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    for idx, (centroids, angles, max_lengths) in enumerate(frames):
+        antes, _ = tracemalloc.get_traced_memory()
+        bloques_antes = sys.getallocatedblocks()
+        tracking.procesar_frame(estado, idx, centroids.tolist(), angles.tolist(), max_lengths.tolist())
+        bloques[idx] = sys.getallocatedblocks() - bloques_antes
+        retenidos[idx] = tracemalloc.get_traced_memory()[0] - antes
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return pico, retenidos, bloques
+
+
+def benchmark(n_fibras, n_frames, compuerta, tasa_perdida, detallado=False):
+    """
+    Benchmarks one point of the sweep and returns its entry for the report. With
+    detallado, the memory and per-stage profile runs are added.
+    """
+    tracking.configurar(variacion_x=compuerta, variacion_y=compuerta)
+    frames = generar_detecciones(n_fibras, n_frames, tasa_perdida)
+
+    estado, tiempos = ejecutar_tracker(frames)
+    r = {
+        "fibras": n_fibras,
+        "frames": n_frames,
+        "compuerta": compuerta,
+        "tasa_perdida": tasa_perdida,
+        "detecciones": int(sum(len(c) for c, _, _ in frames)),
+        "tracks": len(estado["dictionary"]),
+        "fps": float(n_frames / tiempos.sum()),
+        "ms_por_frame_mediana": float(np.median(tiempos) * 1e3),
+        "ms_por_frame_p95": float(np.percentile(tiempos, 95) * 1e3),
+    }
+    if not detallado:
+        return r
+
+    pico, retenidos, bloques = medir_memoria(frames)
+
+    # Separate profiled run for the per-stage breakdown (keeps the timing run clean)
+    perfil = instrumentacion.nuevo_perfil()
+    ejecutar_tracker(frames, perfil)
+    datos = instrumentacion.resumen(perfil)
+
+    r.update({
+        "memoria_pico_bytes": int(pico),
+        "bytes_retenidos_por_frame": float(retenidos.mean()),
+        "bloques_retenidos_por_frame": float(bloques.mean()),
+        "ms_por_etapa": {
+            e: datos["etapas"][e]["wall_medio_ms"] for e in ("predict", "gate", "assign")
+        },
+        "candidatos_por_frame": datos["contadores"]["candidatos"] / n_frames,
+        "tracks_nuevos_por_frame": datos["contadores"]["tracks_nuevos"] / n_frames,
+    })
+    return r
+
+
+def configuraciones(n_fibras):
+    """
+    (frames, gate, loss rate) points run for a fiber count: the full grid up to
+    FIBRAS_BARRIDO_COMPLETO fibers, and only the reference configuration above.
+    """
+    if n_fibras > FIBRAS_BARRIDO_COMPLETO:
+        return [(FRAMES_GRANDES, COMPUERTA_REFERENCIA, TASA_REFERENCIA)]
+    return [(f, c, t) for f in FRAMES for c in COMPUERTAS for t in TASAS_PERDIDA]
+
+# =============================================================================
+# 4) MAIN
+# =============================================================================
+
+def main():
+    resultados = []
+    for n_fibras in FIBRAS:
+        for n_frames, compuerta, tasa_perdida in configuraciones(n_fibras):
+            detallado = (compuerta, tasa_perdida) == (COMPUERTA_REFERENCIA, TASA_REFERENCIA)
+            r = benchmark(n_fibras, n_frames, compuerta, tasa_perdida, detallado)
+            resultados.append(r)
+            linea = (
+                f"fibras={n_fibras:>6} frames={n_frames:>4} compuerta={compuerta:>3} "
+                f"perdida={tasa_perdida:.2f} -> {r['fps']:10.1f} fps, {r['tracks']} tracks"
+            )
+            if detallado:
+                linea += (
+                    f", {r['memoria_pico_bytes'] / 1e6:8.2f} MB pico, "
+                    f"{r['bytes_retenidos_por_frame'] / 1e3:8.1f} kB retenidos/frame, "
+                    f"{r['candidatos_por_frame']:8.1f} candidatos/frame"
+                )
+            print(linea)
+
+    reporte = {
+        "entorno": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "plataforma": platform.platform(),
+            "procesador": platform.processor(),
+        },
+        "parametros_tracking": {
+            "fps": tracking.fps,
+            "alpha": tracking.alpha,
+            "betha": tracking.betha,
+            "gamma": tracking.gamma,
+            "variacion_angulo": tracking.variacion_angulo,
+        },
+        "resultados": resultados,
+    }
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump(reporte, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import metricas_mot
+import tracking
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Synthetic sequences: fibers moving with constant velocity and angular velocity,
+# detected with centroid noise and random drops, tracked with tracking.procesar_frame()
+# and scored against their true identities. Every combination is one sequence.
+FIBRAS = [25, 100, 400]
+N_FRAMES = 100
+TASAS_PERDIDA = [0.0, 0.1]   # Probability that a fiber is not detected in a frame
+RUIDO_PX = [0.5, 2.0]        # Centroid noise (standard deviation, pixels)
+
+ANCHO, ALTO = 1024, 1024
+VELOCIDAD_MAX = 3.0
+OMEGA_MAX = 1.0
+LARGO_MIN, LARGO_MAX = 30.0, 120.0
+SEMILLA = 0
+
+# Annotated ground truth (fibras_{n}.json layout) and the tracking result to score
+# against it; both None to run only the synthetic sequences
+ruta_verdad = None
+ruta_tracks = None
+
+UMBRAL_DISTANCIA = metricas_mot.UMBRAL_DISTANCIA
+procesos = None  # Worker processes (None = all CPUs)
+
+ruta_reporte = "Particle-Tracking-Velocimetry/tracking_eval.json"
+
+# =============================================================================
+# 2) SYNTHETIC SEQUENCE
+# =============================================================================
+
+def generar(n_fibras, n_frames, tasa_perdida, ruido, semilla=SEMILLA):
+    """
+    Ground truth and noisy detections of a synthetic sequence.
+
+    Returns:
+        verdad (list): (ids, centroids) of every frame.
+        detecciones (list): (ids, centroids, angles, lengths) of every frame, shuffled.
+    """
+    rng = np.random.default_rng(semilla)
+    posiciones = rng.uniform([0, 0], [ANCHO, ALTO], size=(n_fibras, 2))
+    velocidades = rng.uniform(-VELOCIDAD_MAX, VELOCIDAD_MAX, size=(n_fibras, 2))
+    angulos = rng.uniform(-180, 180, size=n_fibras)
+    omegas = rng.uniform(-OMEGA_MAX, OMEGA_MAX, size=n_fibras)
+    largos = rng.uniform(LARGO_MIN, LARGO_MAX, size=n_fibras)
+
+    verdad, detecciones = [], []
+    for _ in range(n_frames):
+        verdad.append((np.arange(n_fibras), posiciones.copy()))
+        visibles = rng.permutation(np.flatnonzero(rng.random(n_fibras) >= tasa_perdida))
+        detecciones.append((
+            visibles,
+            posiciones[visibles] + rng.normal(0, ruido, size=(len(visibles), 2)),
+            (angulos[visibles] + 180) % 360 - 180,
+            largos[visibles].copy(),
+        ))
+
+        posiciones += velocidades
+        fuera = (posiciones < 0) | (posiciones > [ANCHO, ALTO])
+        velocidades[fuera] *= -1
+        posiciones = np.clip(posiciones, 0, [ANCHO, ALTO])
+        angulos += omegas
+    return verdad, detecciones
+
+
+def evaluar_sintetica(configuracion):
+    """
+    Tracks one synthetic sequence and scores it.
+    """
+    n_fibras, tasa_perdida, ruido = configuracion
+    verdad, detecciones = generar(n_fibras, N_FRAMES, tasa_perdida, ruido)
+
+    estado = tracking.nuevo_estado()
+    prediccion = []
+    inicio = time.perf_counter()
+    for idx, (_, centroids, angles, lengths) in enumerate(detecciones):
+        ids = tracking.procesar_frame(estado, idx, centroids.tolist(), angles.tolist(), lengths.tolist())
+        prediccion.append((np.array([ids[i] for i in range(len(centroids))]), centroids))
+    segundos_tracking = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    r = metricas_mot.evaluar(verdad, prediccion, umbral=UMBRAL_DISTANCIA)
+    return {
+        "fibras": n_fibras,
+        "tasa_perdida": tasa_perdida,
+        "ruido_px": ruido,
+        "tracks": estado["current_fiber_id"],
+        "fps_tracking": N_FRAMES / segundos_tracking,
+        "segundos_evaluacion": time.perf_counter() - inicio,
+        **r,
+    }
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def describir(r):
+    return (
+        f"MOTA {r['mota']:.3f}  IDF1 {r['idf1']:.3f}  HOTA {r['hota']:.3f}  "
+        f"ID switches {r['id_switches']:>5}  FP {r['fp']:>6}  FN {r['fn']:>6}"
+    )
+
+
+def main():
+    configuraciones = list(itertools.product(FIBRAS, TASAS_PERDIDA, RUIDO_PX))
+    inicio = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=procesos) as pool:
+        resultados = list(pool.map(evaluar_sintetica, configuraciones))
+    print(f"{len(configuraciones)} secuencias evaluadas en {time.perf_counter() - inicio:.1f} s")
+    for r in resultados:
+        print(f"fibras={r['fibras']:>4} perdida={r['tasa_perdida']:.2f} ruido={r['ruido_px']:.1f} px -> {describir(r)}")
+
+    anotada = None
+    if ruta_verdad is not None and ruta_tracks is not None:
+        with open(ruta_verdad, "r", encoding="utf-8") as f:
+            verdad = metricas_mot.frames_desde_json(json.load(f))
+        with open(ruta_tracks, "r", encoding="utf-8") as f:
+            prediccion = metricas_mot.frames_desde_json(json.load(f), len(verdad))
+        anotada = {"verdad": ruta_verdad, "tracks": ruta_tracks,
+                   **metricas_mot.evaluar(verdad, prediccion, umbral=UMBRAL_DISTANCIA)}
+        print(f"{ruta_tracks} vs. {ruta_verdad} -> {describir(anotada)}")
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"umbral_distancia": UMBRAL_DISTANCIA, "sinteticas": resultados, "anotada": anotada}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
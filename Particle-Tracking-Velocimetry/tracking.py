@@ -0,0 +1,523 @@
+# === TRACKING CORE ===
+#
+# Alpha-beta-gamma filter and frame-to-frame association shared by the YOLO and
+# Hough-Transform ptv() notebooks. Detections go in as plain centroid / angle /
+# length sequences, so the tracker can be driven without images (see
+# tracker-benchmark.py).
+
+import numpy as np
+
+import instrumentacion
+
+# === VARIABLES ===
+
+# Capture variables
+fps = 200  # Frames per second (capture rate)
+
+# Kalman filter gains
+alpha = 0.95  # Alpha gain for position estimation
+betha = 0.95  # Beta gain for velocity estimation
+gamma = 0.05  # Gamma gain for acceleration estimation
+
+# Variation limits to recognize the same fiber between frames
+variacion_x = 10  # Allowed variation in the X position (pixels)
+variacion_y = 10  # Allowed variation in the Y position (pixels)
+variacion_angulo = 5  # Allowed variation in the angle (degrees)
+
+# Period of the measured angles: 360 for the detector angles, 180 for axial
+# orientations (a fiber has no head, e.g. the signed mask angle in (-90, 90])
+periodo_angulo = 360
+
+# === TIME STEP ===
+delta_t = 1 / fps  # Time interval between frames based on frames per second
+
+
+def configurar(**parametros):
+    """
+    Overrides the module-level tracking variables (fps, gains and variation limits).
+    The notebooks call it with the values of their "VARIABLES" cell so both stay in sync.
+
+    Args:
+        **parametros: Any of fps, alpha, betha, gamma, variacion_x, variacion_y, variacion_angulo,
+            periodo_angulo.
+
+    Raises:
+        KeyError: If an unknown variable name is given.
+    """
+    global delta_t
+    for nombre, valor in parametros.items():
+        if nombre not in ("fps", "alpha", "betha", "gamma", "variacion_x", "variacion_y", "variacion_angulo",
+                          "periodo_angulo"):
+            raise KeyError(f"Unknown tracking variable: {nombre}")
+        globals()[nombre] = valor
+    delta_t = 1 / fps
+
+# --------------------------------------------------------------------------------
+# 1) HELPER FUNCTIONS TO HANDLE ANGLES
+# --------------------------------------------------------------------------------
+
+def normalizar_diferencia_angular(angulo_medido, angulo_filtrado):
+    """
+    Returns the smallest angular difference within [-180, 180].
+    This ensures smooth transitions by correcting jumps like 179 -> -179 or vice versa.
+    With periodo_angulo = 180 the difference is taken modulo 180, within [-90, 90).
+    """
+    diff = angulo_medido - angulo_filtrado
+    if periodo_angulo == 180:
+        return (diff + 90) % 180 - 90
+    while diff > 180:
+        diff -= 360
+    while diff <= -180:
+        diff += 360
+    return diff
+
+def normalizar_angulo(angulo):
+    """
+    Ensures that the angle is within the range [-180, 180] ([-90, 90) with
+    periodo_angulo = 180).
+    """
+    if periodo_angulo == 180:
+        return (angulo + 90) % 180 - 90
+    while angulo > 180:
+        angulo -= 360
+    while angulo <= -180:
+        angulo += 360
+    return angulo
+
+# --------------------------------------------------------------------------------
+# 2) GENERIC ALPHA, BETA, GAMMA FUNCTIONS (FOR LINEAR POSITION)
+# --------------------------------------------------------------------------------
+
+def filtro_alpha(x, x_i, z, t):
+    """
+    Alpha filter adjusts the position estimate.
+    x  = current filter value
+    x_i = previous filtered value
+    z  = measurement (current detection)
+    t  = time step
+    """
+    x_f = x + alpha * (z - x_i)
+    return x_f
+
+def filtro_betha(x, x_i, z, t):
+    """
+    Beta filter adjusts the velocity estimate.
+    """
+    x_f = x + betha * ((z - x_i) / t)
+    return x_f
+
+def filtro_gamma(x, x_i, z, t):
+    """
+    Gamma filter adjusts the acceleration estimate.
+    """
+    x_f = x + gamma * ((z - x_i) / (t**2) * 2)
+    return x_f
+
+# --------------------------------------------------------------------------------
+# 3) SPECIFIC ALPHA, BETA, GAMMA FUNCTIONS FOR ANGLES
+# --------------------------------------------------------------------------------
+
+def filtro_alpha_angulo(angulo_filtrado, angulo_medido):
+    """
+    Applies the alpha filter to the angle, normalizing differences to avoid large jumps.
+    """
+    diff_ang = normalizar_diferencia_angular(angulo_medido, angulo_filtrado)
+    angulo_f = angulo_filtrado + alpha * diff_ang
+    angulo_f = normalizar_angulo(angulo_f)  # Ensure angle remains within [-180, 180]
+    return angulo_f
+
+def filtro_betha_angulo(omega_filtrado, angulo_filtrado, angulo_medido, t):
+    """
+    Adjusts angular velocity (omega) based on angular differences.
+    """
+    diff_ang = normalizar_diferencia_angular(angulo_medido, angulo_filtrado)
+    omega_f = omega_filtrado + betha * (diff_ang / t)
+    return omega_f
+
+def filtro_gamma_angulo(aceleracion_angular_filtrada, angulo_filtrado, angulo_medido, t):
+    """
+    Adjusts angular acceleration based on angular differences.
+    """
+    diff_ang = normalizar_diferencia_angular(angulo_medido, angulo_filtrado)
+    a_ang_f = aceleracion_angular_filtrada + gamma * (diff_ang / (t**2) * 0.5)
+    return a_ang_f
+
+# --------------------------------------------------------------------------------
+# 4) ALPHA-BETA-GAMMA FILTER FOR POSITION (XY) AND ANGLE
+# --------------------------------------------------------------------------------
+
+def filtro_kalman(parametros_kalman, deteccion_actual, salto_temporal=1):
+    """
+    Applies the Kalman-like (alpha-beta-gamma) filter to estimate position, velocity,
+    acceleration, angle, and angular motion.
+
+    Args:
+        parametros_kalman: List containing the current state of the system:
+            [
+                [xx,   xy],             # Position
+                [vx,   vy],             # Velocity
+                [ax,   ay],             # Acceleration
+                [angulo],               # Angle
+                [omega],                # Angular velocity
+                [aceleracion_angular],  # Angular acceleration
+                [largo]                 # Length (optional, unchanged by filter)
+            ]
+        deteccion_actual: List containing the measured state:
+            [
+                [zxx, zxy],  # Measured position
+                [z_angulo],  # Measured angle
+                [z_largo]    # Measured length (optional)
+            ]
+        salto_temporal: Number of frames to skip (default is 1).
+
+    Returns:
+        Updated Kalman parameters after correction and prediction.
+    """
+    t = delta_t * salto_temporal
+
+    # --- Extract current state ---
+    xx_i, xy_i = parametros_kalman[0]
+    vx_i, vy_i = parametros_kalman[1]
+    ax_i, ay_i = parametros_kalman[2]
+    angulo_i = parametros_kalman[3][0]
+    omega_i = parametros_kalman[4][0]
+    aceleracion_angular_i = parametros_kalman[5][0]
+    largo = parametros_kalman[6][0]
+
+    # --- Extract current measurements ---
+    zxx, zxy = deteccion_actual[0]
+    z_angulo = deteccion_actual[1][0]
+    z_largo = deteccion_actual[2][0]
+
+    # --- Correction phase (alpha, beta, gamma) ---
+    xx_f = filtro_alpha(xx_i, xx_i, zxx, t)
+    xy_f = filtro_alpha(xy_i, xy_i, zxy, t)
+    vx_f = filtro_betha(vx_i, xx_i, zxx, t)
+    vy_f = filtro_betha(vy_i, xy_i, zxy, t)
+    ax_f = filtro_gamma(ax_i, xx_i, zxx, t)
+    ay_f = filtro_gamma(ay_i, xy_i, zxy, t)
+    angulo_f = filtro_alpha_angulo(angulo_i, z_angulo)
+    omega_f = filtro_betha_angulo(omega_i, angulo_i, z_angulo, t)
+    aceleracion_angular_f = filtro_gamma_angulo(aceleracion_angular_i, angulo_i, z_angulo, t)
+
+    # --- Prediction phase ---
+    xx_ff = xx_f + vx_f * t + 0.5 * ax_f * (t**2)
+    xy_ff = xy_f + vy_f * t + 0.5 * ay_f * (t**2)
+    vx_ff = vx_f + ax_f * t
+    vy_ff = vy_f + ay_f * t
+    angulo_ff = normalizar_angulo(angulo_f + omega_f * t + 0.5 * aceleracion_angular_f * (t**2))
+    omega_ff = omega_f + aceleracion_angular_f * t
+
+    # Update Kalman parameters
+    parametros_kalman = [
+        [xx_ff, xy_ff],
+        [vx_ff, vy_ff],
+        [ax_f, ay_f],
+        [angulo_ff],
+        [omega_ff],
+        [aceleracion_angular_f],
+        [z_largo]  # Length remains constant or updated if necessary
+    ]
+
+    return parametros_kalman
+
+# --------------------------------------------------------------------------------
+# 5) INITIAL GUESS
+# --------------------------------------------------------------------------------
+
+def conjetura_inicial(parametros_kalman):
+    """
+    Resets the Kalman parameters to an initial guess, typically used when
+    initializing or resetting a tracked object.
+    """
+    xx_f, xy_f = parametros_kalman[0]
+    vx_f = vy_f = ax_f = ay_f = 0
+    angulo_f = parametros_kalman[1][0]
+    omega_f = aceleracion_angular_f = 0
+    largo = parametros_kalman[2][0]
+
+    xx_ff = xx_f + vx_f * delta_t + 0.5 * ax_f * (delta_t**2)
+    xy_ff = xy_f + vy_f * delta_t + 0.5 * ay_f * (delta_t**2)
+    angulo_ff = normalizar_angulo(angulo_f + omega_f * delta_t + 0.5 * aceleracion_angular_f * (delta_t**2))
+
+    parametros_kalman = [
+        [xx_ff, xy_ff],
+        [vx_f, vy_f],
+        [ax_f, ay_f],
+        [angulo_ff],
+        [omega_f],
+        [aceleracion_angular_f],
+        [largo]
+    ]
+    return parametros_kalman
+
+# --------------------------------------------------------------------------------
+# 6) FRAME-TO-FRAME ASSOCIATION
+# --------------------------------------------------------------------------------
+
+def nuevo_estado():
+    """
+    Returns an empty tracking state.
+
+    Returns:
+        dict: State shared across calls to procesar_frame():
+            - dictionary: Fiber data keyed by fiber ID, in the fibras_{n}.json layout.
+            - current_fiber_id: Last ID assigned to a fiber.
+            - fibras_imagen_actual: IDs of the fibers matched in the last frame.
+            - fibras_detectadas_imagen: Number of detections per processed frame.
+    """
+    return {
+        "dictionary": {},
+        "current_fiber_id": 0,
+        "fibras_imagen_actual": [],
+        "fibras_detectadas_imagen": [],
+    }
+
+
+def registrar_fibra(estado, centroide, angulo, largo, frame):
+    """
+    Creates a new fiber entry from a single detection and returns its ID.
+    """
+    estado["current_fiber_id"] += 1
+    fiber_id_str = str(estado["current_fiber_id"])
+    # Initialize the entry in the dictionary with detection data
+    parametros_kalman = conjetura_inicial([[centroide[0], centroide[1]], [angulo], [largo]])
+    estado["dictionary"][fiber_id_str] = {
+        "centroide": [[centroide[0], centroide[1]]],
+        "largo_maximo": [[largo]],
+        "angulo": [[angulo]],
+        "frame": [[frame]],
+        "kalman": [parametros_kalman]
+    }
+    estado["fibras_imagen_actual"].append(fiber_id_str)
+    return fiber_id_str
+
+
+# Detections compared at once against all previous fibers in the gate
+BLOQUE_GATING = 256
+
+
+def _normalizar_vector(angulos):
+    """
+    Vectorized normalizar_angulo() / normalizar_diferencia_angular(): same
+    subtractions in the same order, so results match the scalar versions exactly.
+    """
+    angulos = np.array(angulos, dtype=float)
+    if periodo_angulo == 180:
+        return (angulos + 90) % 180 - 90
+    while True:
+        mayores = angulos > 180
+        if not mayores.any():
+            break
+        angulos[mayores] -= 360
+    while True:
+        menores = angulos <= -180
+        if not menores.any():
+            break
+        angulos[menores] += 360
+    return angulos
+
+
+def predecir(dictionary, fibras):
+    """
+    Stacks the last filter state of the given fibers into column arrays.
+
+    Returns:
+        np.ndarray: (n_fibras, 9) array with xx, xy, vx, vy, ax, ay, angulo, omega
+        and aceleracion_angular for each fiber.
+    """
+    estados = np.empty((len(fibras), 9))
+    for j, fibra in enumerate(fibras):
+        k = dictionary[fibra]["kalman"][-1]
+        estados[j] = (k[0][0], k[0][1], k[1][0], k[1][1], k[2][0], k[2][1], k[3][0], k[4][0], k[5][0])
+    return estados
+
+
+def fibras_previstas(estado):
+    """
+    Where the fibers tracked in the last image are expected in the next one: the
+    filter state already holds the predicted position and angle, and the length is
+    that of the last measurement.
+
+    Returns:
+        centroides (np.ndarray): (n, 2) predicted centroids.
+        angulos (np.ndarray): (n,) predicted angles (degrees).
+        largos (np.ndarray): (n,) last measured lengths.
+    """
+    fibras = estado["fibras_imagen_actual"]
+    if not fibras:
+        return np.zeros((0, 2)), np.zeros(0), np.zeros(0)
+    estados = predecir(estado["dictionary"], fibras)
+    largos = np.array([estado["dictionary"][f]["largo_maximo"][-1][0] for f in fibras], dtype=float)
+    return estados[:, 0:2], estados[:, 6], largos
+
+
+def gating(estados, centroids, angles):
+    """
+    Evaluates the filter of every previous fiber against every detection and keeps
+    the pairs whose filtered prediction falls within (variacion_x, variacion_y) and
+    variacion_angulo. Same arithmetic as filtro_kalman(), applied to whole arrays.
+
+    Args:
+        estados (np.ndarray): Output of predecir().
+        centroids (np.ndarray): (n_detecciones, 2) measured centroids.
+        angles (np.ndarray): (n_detecciones,) measured angles (degrees).
+
+    Returns:
+        list: For each detection, the indices (ascending) of the fibers that accept it.
+    """
+    t = delta_t
+    xx, xy, vx, vy, ax, ay, angulo, omega, aceleracion_angular = estados.T
+    candidatos = []
+
+    for inicio in range(0, len(centroids), BLOQUE_GATING):
+        zx = centroids[inicio:inicio + BLOQUE_GATING, 0:1]
+        zy = centroids[inicio:inicio + BLOQUE_GATING, 1:2]
+        z_ang = angles[inicio:inicio + BLOQUE_GATING]
+
+        # --- Position: correction and prediction, as in filtro_kalman() ---
+        xx_f = xx + alpha * (zx - xx)
+        vx_f = vx + betha * ((zx - xx) / t)
+        ax_f = ax + gamma * ((zx - xx) / (t**2) * 2)
+        ok = abs(xx_f + vx_f * t + 0.5 * ax_f * (t**2) - zx) < variacion_x
+        del xx_f, vx_f, ax_f
+
+        xy_f = xy + alpha * (zy - xy)
+        vy_f = vy + betha * ((zy - xy) / t)
+        ay_f = ay + gamma * ((zy - xy) / (t**2) * 2)
+        ok &= abs(xy_f + vy_f * t + 0.5 * ay_f * (t**2) - zy) < variacion_y
+        del xy_f, vy_f, ay_f
+
+        # --- Angle, only for the pairs that passed the position gate ---
+        filas, columnas = np.nonzero(ok)
+        z = z_ang[filas]
+        diff_ang = _normalizar_vector(z - angulo[columnas])
+        angulo_f = _normalizar_vector(angulo[columnas] + alpha * diff_ang)
+        omega_f = omega[columnas] + betha * (diff_ang / t)
+        aceleracion_angular_f = aceleracion_angular[columnas] + gamma * (diff_ang / (t**2) * 0.5)
+        angulo_ff = _normalizar_vector(angulo_f + omega_f * t + 0.5 * aceleracion_angular_f * (t**2))
+        # Wrapped difference: 179 and -179 degrees are 2 degrees apart (+89 and -89
+        # with axial orientations, periodo_angulo = 180)
+        pasan = abs(_normalizar_vector(angulo_ff - z)) < variacion_angulo
+
+        # np.nonzero is row-major, so columns stay ascending within each detection
+        filas, columnas = filas[pasan], columnas[pasan]
+        cortes = np.searchsorted(filas, np.arange(1, len(zx)))
+        candidatos.extend(np.split(columnas, cortes))
+
+    return candidatos
+
+
+def procesar_frame(estado, idx, centroids, angles, max_lengths, perfil=None, propagado=False):
+    """
+    Associates the detections of one frame with the fibers tracked in the previous one.
+
+    Every detection is compared, in order, with the fibers of the previous frame: the
+    first fiber whose filtered prediction falls within (variacion_x, variacion_y) and
+    variacion_angulo, and that has not been matched yet in this frame, takes the
+    detection. Unmatched detections start new fibers.
+
+    Propagated frames (positions estimated with optical flow between keyframes, see
+    flujo_optico.propagar()) are tracked the same way, but their observations are
+    listed in the "frames_propagados" key of each fiber and they count as zero
+    detections in "fibras_detectadas_imagen", so the metrics only see real detections.
+
+    Args:
+        estado (dict): Tracking state created by nuevo_estado().
+        idx (int): Zero-based frame index (stored as idx + 1 in "frame").
+        centroids (list): Centroids [(cx, cy), ...], or None if nothing was detected.
+        angles (list): Angle of each detection (degrees).
+        max_lengths (list): Length of each detection.
+        perfil (dict): Optional profile from instrumentacion.nuevo_perfil(); the
+            "predict", "gate" and "assign" stages and the association counters are
+            recorded in it.
+        propagado (bool): The positions were propagated, not detected.
+
+    Returns:
+        dict: Map from detection index to fiber ID for the current frame.
+    """
+    dictionary = estado["dictionary"]
+
+    # Store the number of fibers detected in the current image
+    n_detecciones = 0 if centroids is None else len(centroids)
+    estado["fibras_detectadas_imagen"].append(0 if propagado else n_detecciones)
+    instrumentacion.contar(perfil, "propagadas" if propagado else "detecciones", n_detecciones)
+
+    # Keep track of fibers detected in the previous image
+    fibras_imagen_anterior = estado["fibras_imagen_actual"]
+    # Reset the list of fibers for the current image
+    fibras_imagen_actual = estado["fibras_imagen_actual"] = []
+
+    # Temporary dictionary to map detections in the current frame to fiber IDs
+    fiber_ids_for_current_frame = {}
+
+    # If no detections are made in the current image, skip processing
+    if centroids is None:
+        instrumentacion.contar(perfil, "tracks_terminados", len(fibras_imagen_anterior))
+        return fiber_ids_for_current_frame
+
+    # Previous fibers that accept each detection
+    if fibras_imagen_anterior and n_detecciones:
+        with instrumentacion.etapa(perfil, "predict"):
+            estados = predecir(dictionary, fibras_imagen_anterior)
+        with instrumentacion.etapa(perfil, "gate"):
+            candidatos = gating(
+                estados,
+                np.asarray(centroids, dtype=float).reshape(-1, 2),
+                np.asarray(angles, dtype=float).reshape(-1)
+            )
+        instrumentacion.contar(perfil, "candidatos", sum(len(c) for c in candidatos))
+    else:
+        candidatos = [()] * n_detecciones
+
+    with instrumentacion.etapa(perfil, "assign"):
+        asignada = np.zeros(len(fibras_imagen_anterior), dtype=bool)
+        for i in range(n_detecciones):
+            found_match = False
+
+            for j in candidatos[i]:
+                # Avoid duplicate matches for the same fiber
+                if asignada[j]:
+                    continue
+
+                # Update the fiber information in the dictionary
+                index = fibras_imagen_anterior[j]
+                deteccion_actual = [[centroids[i][0], centroids[i][1]], [angles[i]], [max_lengths[i]]]
+                prediccion = filtro_kalman(dictionary[index]["kalman"][-1], deteccion_actual, 1)
+                dictionary[index]["centroide"].append([centroids[i][0], centroids[i][1]])
+                dictionary[index]["largo_maximo"].append([max_lengths[i]])
+                dictionary[index]["angulo"].append([angles[i]])
+                dictionary[index]["frame"].append([idx + 1])
+                dictionary[index]["kalman"].append(prediccion)
+                if propagado:
+                    dictionary[index].setdefault("frames_propagados", []).append(idx + 1)
+                fiber_ids_for_current_frame[i] = index
+                fibras_imagen_actual.append(index)
+                asignada[j] = True
+                found_match = True
+                break
+
+            # If no match is found, treat it as a new fiber
+            if not found_match:
+                fiber_ids_for_current_frame[i] = registrar_fibra(
+                    estado, centroids[i], angles[i], max_lengths[i], idx + 1
+                )
+                if propagado:
+                    dictionary[fiber_ids_for_current_frame[i]]["frames_propagados"] = [idx + 1]
+                instrumentacion.contar(perfil, "tracks_nuevos")
+
+    instrumentacion.contar(perfil, "tracks_terminados", int((~asignada).sum()))
+    return fiber_ids_for_current_frame
+
+
+def exportar(estado, ruta_procesada):
+    """
+    Returns the fiber dictionary with the "ruta" and "fibras_por_frame" keys added,
+    ready to be written as fibras_{n}.json.
+    """
+    dictionary = estado["dictionary"]
+    # Add the results folder path to the final dictionary
+    dictionary["ruta"] = ruta_procesada
+    # Add the number of fibers detected per frame to the dictionary
+    dictionary["fibras_por_frame"] = estado["fibras_detectadas_imagen"]
+    return dictionary
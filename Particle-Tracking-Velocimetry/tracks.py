@@ -0,0 +1,282 @@
+# === RAGGED TRACK CONTAINER ===
+#
+# TrackSet keeps every track of a fibras_{n}.json result as flat typed arrays (one row
+# per observation, tracks back to back) plus an offsets array (K + 1,) marking where
+# each track starts. Per-track reductions are np.add.reduceat / np.maximum.reduceat
+# over the offsets, a single track is a zero-copy slice, and filtering or
+# concatenating sets only touches the offsets and one fancy index per column. The
+# layout is the one suavizado.py filters work on.
+
+from itertools import chain
+
+import numpy as np
+
+import suavizado
+
+CLAVES_OMITIDAS = ("ruta", "fibras_por_frame")
+
+# Columns of the JSON layout: value shape of one observation and dtype
+COLUMNAS = {
+    "frame": ((), np.int64),
+    "centroide": ((2,), np.float64),
+    "angulo": ((), np.float64),
+    "largo_maximo": ((), np.float64),
+    # Multi-camera tracks (multicamara.py)
+    "posicion": ((3,), np.float64),
+    "direccion": ((3,), np.float64),
+    "largo": ((), np.float64),
+}
+
+
+def _anidada(listas):
+    # Whether the observations are lists ([[f1], [f2], ...]) rather than bare numbers
+    for lista in listas:
+        if len(lista):
+            return isinstance(lista[0], (list, tuple))
+    return False
+
+
+def _columna(listas, forma, dtype):
+    # Flat array of a list of per-track lists, in one pass over the numbers
+    numeros = chain.from_iterable(listas)
+    if _anidada(listas):
+        numeros = chain.from_iterable(numeros)
+    return np.fromiter(numeros, dtype=dtype).reshape(-1, *forma)
+
+
+def sin_propagados(datos):
+    """
+    Tracking JSON (dict) without the observations propagated with optical flow, i.e.
+    the frames listed in the "frames_propagados" key of each fiber (see
+    tracking.procesar_frame()). Per-observation lists (as long as "frame") are cut;
+    fibers without propagated frames are shared, not copied.
+    """
+    salida = {}
+    for fiber_id, fiber_data in datos.items():
+        if fiber_id in CLAVES_OMITIDAS or not fiber_data.get("frames_propagados"):
+            salida[fiber_id] = fiber_data
+            continue
+        propagados = set(fiber_data["frames_propagados"])
+        frames = fiber_data.get("frame", [])
+        conservar = [k for k, f in enumerate(frames) if (f[0] if isinstance(f, (list, tuple)) else f) not in propagados]
+        salida[fiber_id] = {
+            clave: [valor[k] for k in conservar] if isinstance(valor, list) and len(valor) == len(frames) else valor
+            for clave, valor in fiber_data.items()
+            if clave != "frames_propagados"
+        }
+    return salida
+
+
+class TrackSet:
+    """
+    Tracks stored as flat arrays with offsets.
+
+    Attributes:
+        ids (np.ndarray): (K,) track IDs (strings, as in the JSON keys).
+        offsets (np.ndarray): (K + 1,) int64; track k is rows offsets[k]:offsets[k + 1].
+        columnas (dict): Column name -> (N, ...) array of every observation.
+    """
+
+    def __init__(self, ids, offsets, columnas):
+        self.ids = np.asarray(ids, dtype=str)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.columnas = dict(columnas)
+
+    # --------------------------------------------------------------------------
+    # Construction and export
+    # --------------------------------------------------------------------------
+
+    @classmethod
+    def desde_json(cls, datos, columnas=("frame", "centroide", "angulo", "largo_maximo")):
+        """
+        TrackSet of the given columns of a tracking JSON (dict). Columns missing from
+        COLUMNAS are read as float scalars (e.g. "velocidad_x_convolucionada").
+
+        When the columns of a track have different lengths (velocities have one sample
+        fewer than positions), the track keeps its first min(lengths) observations.
+        """
+        ids, por_columna = [], {c: [] for c in columnas}
+        for fiber_id, fiber_data in datos.items():
+            if fiber_id in CLAVES_OMITIDAS:
+                continue
+            ids.append(fiber_id)
+            for c in columnas:
+                por_columna[c].append(fiber_data.get(c, []))
+
+        largos = np.array([min(len(por_columna[c][k]) for c in columnas) for k in range(len(ids))], dtype=np.int64) \
+            if columnas else np.zeros(len(ids), dtype=np.int64)
+        arrays = {}
+        for c in columnas:
+            forma, dtype = COLUMNAS.get(c, ((), np.float64))
+            listas = por_columna[c]
+            recortar = [len(l) != n for l, n in zip(listas, largos)]
+            if any(recortar):
+                listas = [l[:n] for l, n in zip(listas, largos)]
+            arrays[c] = _columna(listas, forma, dtype)
+        return cls(ids, np.concatenate([[0], np.cumsum(largos)]), arrays)
+
+    @classmethod
+    def cargar(cls, ruta):
+        """
+        TrackSet saved by guardar(), and the extra arrays saved with it.
+
+        Returns:
+            tuple: (TrackSet, {name: array}).
+        """
+        with np.load(ruta) as archivo:
+            datos = {k: archivo[k] for k in archivo.files}
+        columnas = {k[len("columna_"):]: datos.pop(k) for k in list(datos) if k.startswith("columna_")}
+        return cls(datos.pop("ids"), datos.pop("offsets"), columnas), datos
+
+    def guardar(self, ruta, **extra):
+        """
+        Saves the ids, offsets and columns (and any extra arrays) to one .npz file.
+        """
+        np.savez(
+            ruta,
+            ids=self.ids,
+            offsets=self.offsets,
+            **{f"columna_{c}": v for c, v in self.columnas.items()},
+            **extra,
+        )
+
+    def a_json(self):
+        """
+        Dict of fibers in the JSON layout ({"1": {"frame": [[f], ...], ...}, ...}).
+        """
+        salida = {}
+        for k, fiber_id in enumerate(self.ids.tolist()):
+            a, b = self.offsets[k], self.offsets[k + 1]
+            fibra = {}
+            for c, valores in self.columnas.items():
+                v = valores[a:b]
+                fibra[c] = v.tolist() if v.ndim > 1 else v[:, None].tolist()
+            salida[fiber_id] = fibra
+        return salida
+
+    # --------------------------------------------------------------------------
+    # Access
+    # --------------------------------------------------------------------------
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, columna):
+        return self.columnas[columna]
+
+    def track(self, k):
+        """
+        Zero-copy views of the columns of track k.
+        """
+        a, b = self.offsets[k], self.offsets[k + 1]
+        return {c: v[a:b] for c, v in self.columnas.items()}
+
+    def indice_track(self):
+        """
+        (N,) track index of every observation.
+        """
+        return np.repeat(np.arange(len(self)), self.largos())
+
+    # --------------------------------------------------------------------------
+    # Segment-wise operations
+    # --------------------------------------------------------------------------
+
+    def largos(self):
+        """
+        (K,) observations per track.
+        """
+        return np.diff(self.offsets)
+
+    def _reducir(self, ufunc, columna, vacio):
+        valores = self.columnas[columna]
+        largos = self.largos()
+        if not len(self):
+            return np.zeros((0, *valores.shape[1:]), dtype=valores.dtype)
+        if largos.all():
+            return ufunc.reduceat(valores, self.offsets[:-1], axis=0)
+        salida = np.full((len(self), *valores.shape[1:]), vacio, dtype=np.result_type(valores, type(vacio)))
+        llenos = largos > 0
+        if llenos.any():
+            salida[llenos] = ufunc.reduceat(valores, self.offsets[:-1][llenos], axis=0)
+        return salida
+
+    def suma(self, columna):
+        """
+        (K, ...) per-track sum.
+        """
+        return self._reducir(np.add, columna, 0)
+
+    def media(self, columna):
+        """
+        (K, ...) per-track mean (NaN for empty tracks).
+        """
+        largos = self.largos().reshape(-1, *([1] * (self.columnas[columna].ndim - 1)))
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self._reducir(np.add, columna, 0.0) / largos
+
+    def minimo(self, columna):
+        """
+        (K, ...) per-track minimum (NaN for empty tracks).
+        """
+        return self._reducir(np.minimum, columna, np.nan)
+
+    def maximo(self, columna):
+        """
+        (K, ...) per-track maximum (NaN for empty tracks).
+        """
+        return self._reducir(np.maximum, columna, np.nan)
+
+    def primero(self, columna):
+        """
+        (K, ...) first observation of every track (tracks must be non-empty).
+        """
+        return self.columnas[columna][self.offsets[:-1]]
+
+    def ultimo(self, columna):
+        """
+        (K, ...) last observation of every track (tracks must be non-empty).
+        """
+        return self.columnas[columna][self.offsets[1:] - 1]
+
+    def diferencias(self, columna):
+        """
+        Consecutive differences within every track, with their offsets (one row fewer
+        per non-empty track).
+
+        Returns:
+            tuple: (differences, offsets).
+        """
+        return suavizado.diferencias(self.columnas[columna], self.offsets)
+
+    # --------------------------------------------------------------------------
+    # Selection and concatenation
+    # --------------------------------------------------------------------------
+
+    def filtrar(self, mascara):
+        """
+        TrackSet with the tracks where mascara (K,) is True (or the given track indices).
+        """
+        seleccion = np.flatnonzero(mascara) if np.asarray(mascara).dtype == bool else np.asarray(mascara)
+        largos = self.largos()[seleccion]
+        inicios = self.offsets[:-1][seleccion]
+        # Rows of the kept tracks: each start repeated and shifted by 0..length-1
+        filas = np.repeat(inicios - np.concatenate([[0], np.cumsum(largos)[:-1]]), largos) + np.arange(largos.sum())
+        return TrackSet(
+            self.ids[seleccion],
+            np.concatenate([[0], np.cumsum(largos)]),
+            {c: v[filas] for c, v in self.columnas.items()},
+        )
+
+    @staticmethod
+    def concatenar(conjuntos):
+        """
+        TrackSet with the tracks of all the given sets, in order (same columns).
+        """
+        conjuntos = list(conjuntos)
+        largos = np.concatenate([c.largos() for c in conjuntos]) if conjuntos else np.zeros(0, dtype=np.int64)
+        nombres = conjuntos[0].columnas.keys() if conjuntos else []
+        return TrackSet(
+            np.concatenate([c.ids for c in conjuntos]) if conjuntos else [],
+            np.concatenate([[0], np.cumsum(largos)]),
+            {n: np.concatenate([c.columnas[n] for c in conjuntos]) for n in nombres},
+        )
@@ -0,0 +1,130 @@
+# === SYNTHETIC RECORDINGS ===
+#
+# Rendered fiber recordings with known ground truth, used by the benchmarks that
+# need images (the raw Dataset frames are not labeled with fiber identities).
+
+import cv2
+import numpy as np
+
+# Scene (same size as the recordings)
+ANCHO, ALTO = 1024, 1024
+VELOCIDAD_MAX = 3.0       # Maximum displacement per frame (pixels)
+OMEGA_MAX = 1.0           # Maximum rotation per frame (degrees)
+LARGO_MIN, LARGO_MAX = 30.0, 120.0
+FONDO = 20                # Background gray level
+BRILLO = 220              # Fiber gray level
+RUIDO = 6.0               # Standard deviation of the background noise (gray levels)
+SEMILLA = 0
+
+# A ground-truth fiber counts as tracked when a track lies within this distance (pixels)
+RADIO_ACIERTO = 6.0
+
+
+def segmentos(centroides, angulos, largos):
+    """
+    Integer [x1, y1, x2, y2] end points of each fiber.
+    """
+    rad = np.radians(np.asarray(angulos, dtype=float))
+    medio = np.asarray(largos, dtype=float)[:, None] / 2 * np.stack([np.cos(rad), np.sin(rad)], axis=1)
+    centroides = np.asarray(centroides, dtype=float).reshape(-1, 2)
+    return np.round(np.hstack([centroides - medio, centroides + medio])).astype(int)
+
+
+def fondo_estructurado(semilla=SEMILLA, n_reflejos=12):
+    """
+    Static background like the one of the volumetric-illumination recordings: lit
+    walls on the sides, the bright notch outside the ROI, straight reflections and
+    diffuse glare.
+
+    Returns:
+        np.ndarray: (ALTO, ANCHO) uint8 background.
+    """
+    rng = np.random.default_rng(semilla)
+    fondo = np.full((ALTO, ANCHO), FONDO, dtype=np.uint8)
+    fondo[:, :30] = 110
+    fondo[:, ANCHO - 20:] = 110
+    fondo[840:980, 640:] = 90
+    fondo[980:, :] = 70
+    for _ in range(n_reflejos):
+        x1, y1, x2, y2 = rng.integers(0, [ANCHO, ALTO, ANCHO, ALTO]).tolist()
+        cv2.line(fondo, (x1, y1), (x2, y2), int(rng.integers(90, 180)), int(rng.integers(1, 4)), cv2.LINE_AA)
+    resplandor = np.zeros((ALTO, ANCHO), dtype=np.float32)
+    for x, y in rng.integers(0, [ANCHO, ALTO], size=(4, 2)).tolist():
+        cv2.circle(resplandor, (x, y), int(rng.integers(40, 120)), 60.0, -1)
+    resplandor = cv2.GaussianBlur(resplandor, (0, 0), 30)
+    return np.clip(fondo + resplandor, 0, 255).astype(np.uint8)
+
+
+def generar_video(n_fibras, n_frames, semilla=SEMILLA, fondo=None):
+    """
+    Renders fibers moving with constant velocity and angular velocity, bouncing on
+    the borders of the image.
+
+    Args:
+        n_fibras (int): Number of fibers in the scene.
+        n_frames (int): Number of frames to render.
+        semilla (int): Seed of the random generator.
+        fondo (np.ndarray): Optional static grayscale background (defaults to a flat FONDO).
+
+    Returns:
+        imagenes (list): Grayscale frames.
+        verdad (list): (centroids (n_fibras, 2), angles (n_fibras,), lengths (n_fibras,)) of each frame.
+    """
+    rng = np.random.default_rng(semilla)
+    margen = LARGO_MAX
+    posiciones = rng.uniform([margen, margen], [ANCHO - margen, ALTO - margen], size=(n_fibras, 2))
+    velocidades = rng.uniform(-VELOCIDAD_MAX, VELOCIDAD_MAX, size=(n_fibras, 2))
+    angulos = rng.uniform(-90, 90, size=n_fibras)
+    omegas = rng.uniform(-OMEGA_MAX, OMEGA_MAX, size=n_fibras)
+    largos = rng.uniform(LARGO_MIN, LARGO_MAX, size=n_fibras)
+    if fondo is None:
+        fondo = np.full((ALTO, ANCHO), FONDO, dtype=np.uint8)
+
+    imagenes, verdad = [], []
+    for _ in range(n_frames):
+        imagen = fondo.copy()
+        for x1, y1, x2, y2 in segmentos(posiciones, angulos, largos).tolist():
+            cv2.line(imagen, (x1, y1), (x2, y2), BRILLO, 2, cv2.LINE_AA)
+        ruido = rng.normal(0, RUIDO, imagen.shape)
+        imagenes.append(np.clip(cv2.GaussianBlur(imagen, (3, 3), 0) + ruido, 0, 255).astype(np.uint8))
+        verdad.append((posiciones.copy(), angulos.copy(), largos))
+
+        posiciones += velocidades
+        fuera = (posiciones < margen) | (posiciones > [ANCHO - margen, ALTO - margen])
+        velocidades[fuera] *= -1
+        angulos += omegas
+
+    return imagenes, verdad
+
+
+def puntuar(salidas, verdad):
+    """
+    Matches each ground-truth fiber to the nearest output within RADIO_ACIERTO.
+
+    Returns:
+        dict: Fraction of fiber-frames covered, mean centroid error, and ID switches
+        per fiber (changes of the matched track between consecutive frames).
+    """
+    n_fibras = len(verdad[0][0])
+    ultimo_id = [None] * n_fibras
+    cubiertas, total, errores, cambios = 0, 0, [], 0
+    for (centroids, ids), (posiciones, *_) in zip(salidas, verdad):
+        total += n_fibras
+        if not len(centroids):
+            continue
+        distancias = np.linalg.norm(posiciones[:, None, :] - centroids[None, :, :], axis=2)
+        cercano = distancias.argmin(axis=1)
+        for f in range(n_fibras):
+            d = distancias[f, cercano[f]]
+            if d > RADIO_ACIERTO:
+                continue
+            cubiertas += 1
+            errores.append(d)
+            if ultimo_id[f] is not None and ids[cercano[f]] != ultimo_id[f]:
+                cambios += 1
+            ultimo_id[f] = ids[cercano[f]]
+    return {
+        "cobertura": cubiertas / total,
+        "error_centroide_px": float(np.mean(errores)) if errores else None,
+        "cambios_id_por_fibra": cambios / n_fibras,
+    }
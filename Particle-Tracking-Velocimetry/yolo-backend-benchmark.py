@@ -0,0 +1,159 @@
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import metricas_deteccion
+import yolo_inferencia
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Fine-tuned weights used by the YOLO ptv() notebook
+ruta_pesos = "Particle-Tracking-Velocimetry/YOLO/Yolo-Model/best.pt"
+
+# Labeled split used for latency and mAP
+split = "valid"
+
+# (name, backend, INT8) configurations compared against the PyTorch path
+configuraciones = [
+    ("onnxruntime-fp32", "onnxruntime", False),
+    ("onnxruntime-int8", "onnxruntime", True),
+    ("openvino-fp32", "openvino", False),
+    ("openvino-int8", "openvino", True),
+]
+
+# Intra-op thread counts tried for each configuration (the fastest one is reported)
+hilos_probados = [1, 2, 4, 8]
+
+# Images run before timing (warm-up)
+n_calentamiento = 3
+
+ruta_reporte = "Particle-Tracking-Velocimetry/yolo_backend_benchmark.json"
+
+# =============================================================================
+# 2) HELPERS
+# =============================================================================
+
+def cargar_split():
+    """
+    Loads the images of the split and their ground-truth boxes.
+    """
+    imagenes, verdades = [], []
+    for ruta_imagen, ruta_etiqueta in metricas_deteccion.listar_split(split):
+        imagen = cv2.imread(ruta_imagen)
+        alto, ancho = imagen.shape[:2]
+        poligonos = metricas_deteccion.leer_etiquetas(ruta_etiqueta, ancho, alto)
+        imagenes.append(imagen)
+        verdades.append(metricas_deteccion.cajas_desde_poligonos(poligonos))
+    return imagenes, verdades
+
+
+def medir(predecir, imagenes):
+    """
+    Runs predecir(imagen) -> (boxes, scores) over all images after a warm-up and
+    returns the predictions and the per-image latency (ms).
+    """
+    for imagen in imagenes[:n_calentamiento]:
+        predecir(imagen)
+
+    predicciones, latencias = [], []
+    for imagen in imagenes:
+        inicio = time.perf_counter()
+        predicciones.append(predecir(imagen))
+        latencias.append((time.perf_counter() - inicio) * 1e3)
+    return predicciones, np.array(latencias)
+
+
+def diferencia_triple(predicciones, referencia):
+    """
+    Mean absolute difference of the centroid / angle / length triple between the
+    detections of two backends, over the boxes matched at IoU >= 0.5.
+    """
+    dc, da, dl = [], [], []
+    for (boxes, scores), (boxes_ref, scores_ref) in zip(predicciones, referencia):
+        iou = metricas_deteccion.iou_cajas(boxes, boxes_ref)
+        if not iou.size:
+            continue
+        j = iou.argmax(axis=1)
+        ok = iou[np.arange(len(boxes)), j] >= 0.5
+        c, a, l = yolo_inferencia.propiedades_desde_cajas(boxes[ok])
+        c_ref, a_ref, l_ref = yolo_inferencia.propiedades_desde_cajas(boxes_ref[j[ok]])
+        dc.append(np.linalg.norm(c - c_ref, axis=1))
+        da.append(np.abs(a - a_ref))
+        dl.append(np.abs(l - l_ref))
+    if not dc:
+        return None
+    return {
+        "centroide_px": float(np.concatenate(dc).mean()),
+        "angulo_grados": float(np.concatenate(da).mean()),
+        "largo_px": float(np.concatenate(dl).mean()),
+    }
+
+
+def resumen(nombre, predicciones, latencias, verdades, referencia=None, extra=None):
+    fila = {
+        "configuracion": nombre,
+        "latencia_mediana_ms": float(np.median(latencias)),
+        "latencia_p95_ms": float(np.percentile(latencias, 95)),
+        **metricas_deteccion.evaluar_cajas(predicciones, verdades),
+    }
+    if referencia is not None:
+        fila["diferencia_vs_pytorch"] = diferencia_triple(predicciones, referencia)
+    if extra:
+        fila.update(extra)
+    return fila
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    imagenes, verdades = cargar_split()
+    print(f"{len(imagenes)} imágenes de '{split}' cargadas")
+
+    # --- PyTorch path (as in generar_prediccion) ---
+    from ultralytics import YOLO
+    model = YOLO(ruta_pesos)
+
+    def predecir_pytorch(imagen):
+        r = model.predict(
+            source=imagen, imgsz=yolo_inferencia.IMGSZ, conf=yolo_inferencia.CONF, device="cpu", verbose=False
+        )[0]
+        return r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy()
+
+    referencia, latencias = medir(predecir_pytorch, imagenes)
+    filas = [resumen("pytorch", referencia, latencias, verdades)]
+
+    # --- Exported backends ---
+    for nombre, backend, int8 in configuraciones:
+        try:
+            ruta_onnx = yolo_inferencia.exportar_onnx(ruta_pesos, int8=int8)
+            mejor = None
+            for hilos in hilos_probados:
+                sesion = yolo_inferencia.crear_sesion(ruta_onnx, backend, hilos=hilos)
+                predicciones, latencias = medir(lambda im: yolo_inferencia.predecir(sesion, im)[:2], imagenes)
+                if mejor is None or np.median(latencias) < np.median(mejor[1]):
+                    mejor = (predicciones, latencias, hilos)
+        except ImportError as e:
+            print(f"{nombre}: omitido ({e})")
+            continue
+        filas.append(resumen(nombre, mejor[0], mejor[1], verdades, referencia, {"hilos": mejor[2]}))
+
+    # --- Table ---
+    print(f"\n{'configuración':<20}{'mediana ms':>12}{'p95 ms':>10}{'mAP50':>8}{'mAP50-95':>10}{'hilos':>7}")
+    for fila in filas:
+        print(
+            f"{fila['configuracion']:<20}{fila['latencia_mediana_ms']:>12.1f}{fila['latencia_p95_ms']:>10.1f}"
+            f"{fila['mAP50']:>8.3f}{fila['mAP50-95']:>10.3f}{fila.get('hilos', '-'):>7}"
+        )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump(filas, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import glob
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+import metricas_deteccion
+import yolo_inferencia
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Fine-tuned weights used by the YOLO ptv() notebook
+ruta_pesos = "Particle-Tracking-Velocimetry/YOLO/Yolo-Model/best.pt"
+
+# Raw Cam 1 frames (the labeled split is resized to 1024x1024, so the ROI does not apply to it)
+carpeta_imagenes = os.path.join("Particle-Tracking-Velocimetry", "Dataset", "800 Fibras", "Cam 1")
+numero_imagenes = 50
+
+# Backend of every mode ("pytorch", "onnxruntime" or "openvino")
+backend = "pytorch"
+hilos = None
+
+# Tiled mode
+tamano_tesela = yolo_inferencia.TAMANO_TESELA
+solape_tesela = yolo_inferencia.SOLAPE_TESELA
+
+# Images run before timing (warm-up)
+n_calentamiento = 3
+
+ruta_reporte = "Particle-Tracking-Velocimetry/yolo_roi_benchmark.json"
+
+# =============================================================================
+# 2) HELPERS
+# =============================================================================
+
+def crear_detector(imgsz, dinamico=False):
+    """
+    Batch predictor (list of BGR images -> list of (boxes, scores, propiedades)) of the configured
+    backend at the given input size.
+    """
+    if backend == "pytorch":
+        from ultralytics import YOLO
+        modelo = YOLO(ruta_pesos)
+        return yolo_inferencia.lote_pytorch(modelo, imgsz)
+    ruta_onnx = yolo_inferencia.exportar_onnx(ruta_pesos, imgsz=imgsz, dinamico=dinamico)
+    return yolo_inferencia.lote_onnx(yolo_inferencia.crear_sesion(ruta_onnx, backend, hilos=hilos, imgsz=imgsz))
+
+
+def medir(detectar, imagenes):
+    """
+    Runs detectar(imagen) -> (boxes, scores) over all images after a warm-up and
+    returns the detections and the per-image latency (ms).
+    """
+    for imagen in imagenes[:n_calentamiento]:
+        detectar(imagen)
+
+    detecciones, latencias = [], []
+    for imagen in imagenes:
+        inicio = time.perf_counter()
+        detecciones.append(detectar(imagen))
+        latencias.append((time.perf_counter() - inicio) * 1e3)
+    return detecciones, np.array(latencias)
+
+
+def dentro_roi(boxes):
+    """
+    True for the boxes whose center falls inside the ROI polygon.
+    """
+    centros, _, _ = yolo_inferencia.propiedades_desde_cajas(boxes)
+    contorno = yolo_inferencia.ROI_FIBRAS.reshape(-1, 1, 2)
+    return np.array(
+        [cv2.pointPolygonTest(contorno, (float(x), float(y)), False) >= 0 for x, y in centros], dtype=bool
+    )
+
+
+def recall_relativo(detecciones, referencia, umbral=0.5):
+    """
+    Fraction of the full-frame detections inside the ROI that the mode also finds
+    (IoU >= umbral, greedy by score).
+    """
+    encontradas, total = 0, 0
+    for (boxes, scores), (boxes_ref, _) in zip(detecciones, referencia):
+        boxes_ref = boxes_ref[dentro_roi(boxes_ref)]
+        total += len(boxes_ref)
+        if len(boxes) and len(boxes_ref):
+            tp = metricas_deteccion.emparejar(
+                metricas_deteccion.iou_cajas(boxes, boxes_ref), np.asarray(scores, dtype=float), umbral
+            )
+            encontradas += int(tp.sum())
+    return encontradas / max(total, 1), total
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    rutas = sorted(
+        p for p in glob.glob(os.path.join(carpeta_imagenes, "*")) if p.lower().endswith((".jpg", ".png", ".bmp"))
+    )[:numero_imagenes]
+    imagenes = [cv2.imread(p) for p in rutas]
+    forma = imagenes[0].shape
+    x0, y0, x1, y1 = yolo_inferencia.ventana_roi(yolo_inferencia.ROI_FIBRAS, forma)
+    print(f"{len(imagenes)} imágenes {forma[1]}x{forma[0]}, ventana ROI {x1 - x0}x{y1 - y0}")
+
+    imgsz_roi = yolo_inferencia.imgsz_equivalente(max(x1 - x0, y1 - y0), forma)
+    imgsz_tesela = yolo_inferencia.imgsz_equivalente(tamano_tesela, forma)
+    teselas = yolo_inferencia.generar_teselas(yolo_inferencia.ROI_FIBRAS, forma, tamano_tesela, solape_tesela)
+
+    # Full frame at the fine-tuning size: the reference for latency and recall
+    completo = crear_detector(yolo_inferencia.IMGSZ)
+    recorte = crear_detector(imgsz_roi)
+    mosaico = crear_detector(imgsz_tesela, dinamico=True)
+
+    modos = [
+        ("completo", yolo_inferencia.IMGSZ, 1, lambda im: completo([im])[0][:2]),
+        ("roi", imgsz_roi, 1, lambda im: yolo_inferencia.predecir_recorte(recorte, im)[:2]),
+        (
+            "teselas",
+            imgsz_tesela,
+            len(teselas),
+            lambda im: yolo_inferencia.predecir_teselas(mosaico, im, tamano=tamano_tesela, solape=solape_tesela)[:2],
+        ),
+    ]
+
+    filas, referencia, base_ms = [], None, None
+    for nombre, imgsz, n_entradas, detectar in modos:
+        detecciones, latencias = medir(detectar, imagenes)
+        if referencia is None:
+            referencia, base_ms = detecciones, float(np.median(latencias))
+        recall, n_ref = recall_relativo(detecciones, referencia)
+        filas.append({
+            "modo": nombre,
+            "imgsz": imgsz,
+            "entradas_por_imagen": n_entradas,
+            "latencia_mediana_ms": float(np.median(latencias)),
+            "latencia_p95_ms": float(np.percentile(latencias, 95)),
+            "reduccion_latencia": 1.0 - float(np.median(latencias)) / base_ms,
+            "recall_vs_completo": recall,
+            "detecciones_referencia": n_ref,
+        })
+
+    print(f"\n{'modo':<10}{'imgsz':>7}{'entradas':>10}{'mediana ms':>12}{'p95 ms':>10}{'reducción':>11}{'recall':>8}")
+    for f in filas:
+        print(
+            f"{f['modo']:<10}{f['imgsz']:>7}{f['entradas_por_imagen']:>10}{f['latencia_mediana_ms']:>12.1f}"
+            f"{f['latencia_p95_ms']:>10.1f}{f['reduccion_latencia']:>10.1%}{f['recall_vs_completo']:>8.3f}"
+        )
+
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({"backend": backend, "forma": list(forma[:2]), "modos": filas}, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,667 @@
+# === YOLO INFERENCE ===
+#
+# CPU inference path for the fine-tuned yolo11s-seg model without PyTorch: the
+# weights are exported once to ONNX (optionally INT8-quantized) and served through
+# ONNX Runtime or OpenVINO. Letterboxing, box decoding and NMS are done in NumPy,
+# and the output is the same centroid / angle / length triple generar_prediccion()
+# builds from the Ultralytics results.
+
+import glob
+import logging
+import os
+import shutil
+from functools import lru_cache
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger("ptv")
+
+# Same defaults as Ultralytics predict()
+IMGSZ = 1024  # Inference size used for fine-tuning (runs/segment/train/args.yaml)
+CONF = 0.25  # Confidence threshold used by generar_prediccion()
+IOU_NMS = 0.7  # IoU threshold of the NMS
+MAX_DET = 300  # Maximum detections kept per image
+COLOR_RELLENO = 114  # Gray used to pad the letterboxed image
+
+# Images used to calibrate the INT8 quantization
+CARPETA_CALIBRACION = os.path.join("Segmentation-Models", "YOLO", "Volumetric_Ilumination-3", "valid", "images")
+
+# --------------------------------------------------------------------------------
+# 1) DETECTION PROPERTIES
+# --------------------------------------------------------------------------------
+
+def propiedades_desde_cajas(boxes):
+    """
+    Computes the centroid, angle and maximum length of each detection from its
+    bounding box, as generar_prediccion() does.
+
+    Args:
+        boxes (np.ndarray): (N, 4) boxes [x1, y1, x2, y2].
+
+    Returns:
+        centroids (np.ndarray): (N, 2) box centers.
+        angles (np.ndarray): (N,) angle of the box diagonal (degrees, in [0, 90]).
+        max_lengths (np.ndarray): (N,) largest side of each box.
+    """
+    boxes = np.asarray(boxes).reshape(-1, 4)
+    x1, y1, x2, y2 = boxes.T
+    width = x2 - x1
+    height = y2 - y1
+    centroids = np.stack([(x1 + x2) / 2.0, (y1 + y2) / 2.0], axis=1)
+    angles = np.degrees(np.arctan2(height, width))
+    max_lengths = np.maximum(width, height)
+    return centroids, angles, max_lengths
+
+
+def tabla_desde_cajas(boxes):
+    """
+    Same as propiedades_desde_cajas() packed as an (N, 4) array [cx, cy, angle, length].
+    """
+    centroids, angles, max_lengths = propiedades_desde_cajas(boxes)
+    return np.column_stack([centroids, angles, max_lengths]).astype(np.float64)
+
+
+def _tabla_desde_momentos(cx, cy, mu20, mu11, mu02):
+    """
+    Centroid, orientation and major-axis length from the area-normalized central
+    moments of each instance.
+
+    The orientation is the direction of the major axis in (-90, 90] degrees (image
+    axes, y down), the same convention as the Hough path. The length is that of a
+    thin rod with the same second moment along the axis, sqrt(12 * lambda_max).
+    """
+    angles = 0.5 * np.degrees(np.arctan2(2.0 * mu11, mu20 - mu02))
+    lambda_max = (mu20 + mu02) / 2.0 + np.sqrt(((mu20 - mu02) / 2.0) ** 2 + mu11 ** 2)
+    max_lengths = np.sqrt(12.0 * np.clip(lambda_max, 0.0, None))
+    return np.column_stack([cx, cy, angles, max_lengths])
+
+
+def propiedades_desde_poligonos(poligonos, boxes, area_minima=1.0):
+    """
+    Centroid, orientation and major-axis length of every instance of a frame from its
+    segmentation polygon (results.masks.xy), using the closed-form polygon moments
+    (Green's theorem) over all vertices at once, without rasterizing any mask.
+
+    Instances with a degenerate polygon (fewer than 3 vertices or an area below
+    area_minima) keep the bounding-box values.
+
+    Args:
+        poligonos (list): One (K, 2) polygon in image pixels per instance.
+        boxes (np.ndarray): (N, 4) boxes [x1, y1, x2, y2] of the same instances.
+        area_minima (float): Minimum polygon area (pixels^2).
+
+    Returns:
+        np.ndarray: (N, 4) array [cx, cy, angle, length].
+    """
+    tabla = tabla_desde_cajas(boxes)
+    tamanos = np.array([len(p) for p in poligonos], dtype=np.int64)
+    validos = np.flatnonzero(tamanos >= 3)
+    if not validos.size:
+        return tabla
+
+    tamanos = tamanos[validos]
+    vertices = np.concatenate([np.asarray(poligonos[i], dtype=np.float64) for i in validos])
+    ids = np.repeat(np.arange(validos.size), tamanos)
+    fin = np.cumsum(tamanos)
+    inicio = fin - tamanos
+
+    # Work relative to the vertex mean of each polygon to limit cancellation
+    mx = np.bincount(ids, vertices[:, 0]) / tamanos
+    my = np.bincount(ids, vertices[:, 1]) / tamanos
+    x = vertices[:, 0] - mx[ids]
+    y = vertices[:, 1] - my[ids]
+
+    # Next vertex of each vertex, closing every polygon on its first vertex
+    siguiente = np.arange(1, len(vertices) + 1)
+    siguiente[fin - 1] = inicio
+    xs, ys = x[siguiente], y[siguiente]
+    cruz = x * ys - xs * y
+
+    area = np.bincount(ids, cruz, minlength=validos.size) / 2.0
+    sx = np.bincount(ids, (x + xs) * cruz, minlength=validos.size) / 6.0
+    sy = np.bincount(ids, (y + ys) * cruz, minlength=validos.size) / 6.0
+    sxx = np.bincount(ids, (x * x + x * xs + xs * xs) * cruz, minlength=validos.size) / 12.0
+    syy = np.bincount(ids, (y * y + y * ys + ys * ys) * cruz, minlength=validos.size) / 12.0
+    sxy = np.bincount(ids, (x * ys + 2 * x * y + 2 * xs * ys + xs * y) * cruz, minlength=validos.size) / 24.0
+
+    ok = np.abs(area) >= area_minima
+    area, sx, sy, sxx, syy, sxy = (v[ok] for v in (area, sx, sy, sxx, syy, sxy))
+    cx, cy = sx / area, sy / area
+    tabla[validos[ok]] = _tabla_desde_momentos(
+        cx + mx[ok], cy + my[ok], sxx / area - cx * cx, sxy / area - cx * cy, syy / area - cy * cy
+    )
+    return tabla
+
+
+def propiedades_desde_mascaras(coeficientes, protos, boxes, escala, relleno, imgsz=IMGSZ, umbral=0.5):
+    """
+    Same properties as propiedades_desde_poligonos() for the exported model, from the
+    mask prototypes: all masks of the frame are assembled with one matrix product on
+    the prototype grid and reduced to their moments with row / column sums.
+
+    Args:
+        coeficientes (np.ndarray): (N, 32) mask coefficients returned by decodificar().
+        protos (np.ndarray): (1, 32, mh, mw) mask prototypes (second model output).
+        boxes (np.ndarray): (N, 4) boxes in original image pixels.
+        escala, relleno: Values returned by letterbox().
+        imgsz (int): Input size of the model.
+        umbral (float): Mask probability threshold.
+
+    Returns:
+        np.ndarray: (N, 4) array [cx, cy, angle, length] in original image pixels.
+    """
+    tabla = tabla_desde_cajas(boxes)
+    if not len(tabla):
+        return tabla
+
+    _, c, mh, mw = protos.shape
+    logits = np.asarray(coeficientes, dtype=np.float32) @ protos[0].reshape(c, -1)
+    mascaras = (logits > np.log(umbral / (1.0 - umbral))).reshape(-1, mh, mw)  # sigmoid(l) > umbral
+
+    # Keep each mask inside its box (as Ultralytics does), in prototype pixels
+    ratio = imgsz / mw
+    cajas = (np.asarray(boxes, dtype=np.float64) * escala + [relleno[0], relleno[1], relleno[0], relleno[1]]) / ratio
+    px = np.arange(mw) + 0.5
+    py = np.arange(mh) + 0.5
+    dentro_x = (px >= cajas[:, 0:1]) & (px < cajas[:, 2:3])
+    dentro_y = (py >= cajas[:, 1:2]) & (py < cajas[:, 3:4])
+    mascaras = (mascaras & dentro_y[:, :, None] & dentro_x[:, None, :]).astype(np.float32)
+
+    columnas = mascaras.sum(axis=1)  # (N, mw)
+    filas = mascaras.sum(axis=2)  # (N, mh)
+    m00 = columnas.sum(axis=1).astype(np.float64)
+    ok = m00 > 0
+    if not ok.any():
+        return tabla
+
+    m00 = m00[ok]
+    cx = columnas[ok] @ px / m00
+    cy = filas[ok] @ py / m00
+    # Each pixel is a unit square: add its own second moment (1/12)
+    mu20 = columnas[ok] @ (px * px) / m00 - cx * cx + 1.0 / 12.0
+    mu02 = filas[ok] @ (py * py) / m00 - cy * cy + 1.0 / 12.0
+    mu11 = np.einsum("nij,i,j->n", mascaras[ok], py, px) / m00 - cx * cy
+
+    # Prototype grid -> letterboxed input -> original image
+    factor = ratio / escala
+    tabla[ok] = _tabla_desde_momentos(
+        (cx * ratio - relleno[0]) / escala,
+        (cy * ratio - relleno[1]) / escala,
+        mu20 * factor ** 2,
+        mu11 * factor ** 2,
+        mu02 * factor ** 2,
+    )
+    return tabla
+
+# --------------------------------------------------------------------------------
+# 2) PRE- AND POST-PROCESSING
+# --------------------------------------------------------------------------------
+
+def letterbox(imagen, imgsz=IMGSZ):
+    """
+    Resizes a BGR image to fit in imgsz x imgsz keeping its aspect ratio and pads
+    the rest, as Ultralytics does for fixed-size exported models.
+
+    Returns:
+        tensor (np.ndarray): (1, 3, imgsz, imgsz) float32 RGB tensor in [0, 1].
+        escala (float): Resize factor applied to the image.
+        relleno (tuple): (left, top) padding in pixels.
+    """
+    alto, ancho = imagen.shape[:2]
+    escala = min(imgsz / alto, imgsz / ancho)
+    nuevo_ancho, nuevo_alto = int(round(ancho * escala)), int(round(alto * escala))
+    if (nuevo_ancho, nuevo_alto) != (ancho, alto):
+        imagen = cv2.resize(imagen, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+
+    dw, dh = (imgsz - nuevo_ancho) / 2, (imgsz - nuevo_alto) / 2
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    imagen = cv2.copyMakeBorder(
+        imagen, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(COLOR_RELLENO,) * 3
+    )
+
+    tensor = imagen[:, :, ::-1].transpose(2, 0, 1)[None]  # BGR HWC -> RGB CHW
+    tensor = np.ascontiguousarray(tensor, dtype=np.float32) / 255.0
+    return tensor, escala, (left, top)
+
+
+def nms(boxes, scores, iou_umbral=IOU_NMS):
+    """
+    Greedy non-maximum suppression.
+
+    Args:
+        boxes (np.ndarray): (N, 4) boxes [x1, y1, x2, y2].
+        scores (np.ndarray): (N,) confidence of each box.
+        iou_umbral (float): Boxes overlapping a kept box above this IoU are dropped.
+
+    Returns:
+        np.ndarray: Indices of the kept boxes, by decreasing score.
+    """
+    x1, y1, x2, y2 = boxes.T
+    areas = (x2 - x1) * (y2 - y1)
+    orden = np.argsort(-scores, kind="stable")
+    keep = []
+    while orden.size:
+        i = orden[0]
+        keep.append(i)
+        resto = orden[1:]
+        ancho = np.clip(np.minimum(x2[i], x2[resto]) - np.maximum(x1[i], x1[resto]), 0, None)
+        alto = np.clip(np.minimum(y2[i], y2[resto]) - np.maximum(y1[i], y1[resto]), 0, None)
+        inter = ancho * alto
+        iou = inter / (areas[i] + areas[resto] - inter + 1e-9)
+        orden = resto[iou <= iou_umbral]
+    return np.array(keep, dtype=np.int64)
+
+
+def decodificar(salida, escala, relleno, forma_original, conf=CONF, iou=IOU_NMS, max_det=MAX_DET):
+    """
+    Decodes the first output of an exported YOLO-seg model into boxes in the
+    coordinates of the original image.
+
+    Args:
+        salida (np.ndarray): (1, 4 + nc + 32, N) raw predictions (xywh, class scores,
+            mask coefficients).
+        escala, relleno: Values returned by letterbox().
+        forma_original (tuple): (alto, ancho) of the original image.
+
+    Returns:
+        boxes (np.ndarray): (M, 4) boxes [x1, y1, x2, y2].
+        scores (np.ndarray): (M,) confidences.
+        coeficientes (np.ndarray): (M, 32) mask coefficients of the kept boxes.
+    """
+    pred = salida[0].T  # (N, 4 + nc + 32)
+    nc = pred.shape[1] - 4 - 32
+    clases = pred[:, 4:4 + nc]
+    scores = clases.max(axis=1)
+    validas = scores > conf
+    pred, scores, clase = pred[validas], scores[validas], clases[validas].argmax(axis=1)
+
+    if not len(pred):
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros((0, 32), np.float32)
+
+    cx, cy, w, h = pred[:, 0], pred[:, 1], pred[:, 2], pred[:, 3]
+    boxes = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+    # Offset boxes by class so the NMS never merges different classes
+    keep = nms(boxes + clase[:, None] * 4096.0, scores, iou)[:max_det]
+    boxes, scores, coeficientes = boxes[keep], scores[keep], pred[keep, 4 + nc:]
+
+    # Undo the letterbox
+    boxes[:, [0, 2]] -= relleno[0]
+    boxes[:, [1, 3]] -= relleno[1]
+    boxes /= escala
+    alto, ancho = forma_original
+    boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, ancho)
+    boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, alto)
+    return boxes, scores, coeficientes
+
+# --------------------------------------------------------------------------------
+# 3) EXPORT AND QUANTIZATION
+# --------------------------------------------------------------------------------
+
+def exportar_onnx(
+    ruta_pesos, imgsz=IMGSZ, int8=False, dinamico=False, carpeta_calibracion=CARPETA_CALIBRACION, n_calibracion=100
+):
+    """
+    Exports the Ultralytics weights to ONNX next to the .pt file, optionally followed by
+    INT8 static quantization calibrated on the validation images.
+
+    Args:
+        ruta_pesos (str): Path to best.pt.
+        imgsz (int): Fixed input size of the exported model.
+        int8 (bool): Also quantize the model (saved as <name>_int8.onnx).
+        dinamico (bool): Export with a dynamic batch dimension (needed to batch tiles).
+        carpeta_calibracion (str): Folder with the calibration images.
+        n_calibracion (int): Maximum number of calibration images.
+
+    Returns:
+        str: Path to the ONNX model to serve.
+    """
+    from ultralytics import YOLO
+
+    # best.onnx for the default export, best_<imgsz>[_dinamico].onnx for the others
+    sufijo = "" if imgsz == IMGSZ and not dinamico else f"_{imgsz}" + ("_dinamico" if dinamico else "")
+    base = os.path.splitext(ruta_pesos)[0] + sufijo
+    ruta_onnx = base + ".onnx"
+    if not os.path.exists(ruta_onnx):
+        logger.info("Exporting %s to ONNX (imgsz=%d, dynamic=%s)", ruta_pesos, imgsz, dinamico)
+        if sufijo:
+            # Ultralytics names the export after the weights file, so export from a copy
+            shutil.copyfile(ruta_pesos, base + ".pt")
+            try:
+                YOLO(base + ".pt").export(format="onnx", imgsz=imgsz, dynamic=dinamico, simplify=True)
+            finally:
+                os.remove(base + ".pt")
+        else:
+            ruta_onnx = YOLO(ruta_pesos).export(format="onnx", imgsz=imgsz, dynamic=False, simplify=True)
+
+    if not int8:
+        return ruta_onnx
+
+    ruta_int8 = os.path.splitext(ruta_onnx)[0] + "_int8.onnx"
+    if os.path.exists(ruta_int8):
+        return ruta_int8
+
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+    import onnxruntime as ort
+
+    imagenes = sorted(
+        glob.glob(os.path.join(carpeta_calibracion, "*.jpg")) + glob.glob(os.path.join(carpeta_calibracion, "*.png"))
+    )[:n_calibracion]
+    nombre_entrada = ort.InferenceSession(ruta_onnx, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+
+    class LectorCalibracion(CalibrationDataReader):
+        """Feeds the letterboxed calibration images one by one."""
+        def __init__(self):
+            self.pendientes = iter(imagenes)
+
+        def get_next(self):
+            ruta = next(self.pendientes, None)
+            if ruta is None:
+                return None
+            return {nombre_entrada: letterbox(cv2.imread(ruta), imgsz)[0]}
+
+    logger.info("Quantizing %s to INT8 with %d calibration images", ruta_onnx, len(imagenes))
+    ruta_preprocesada = os.path.splitext(ruta_onnx)[0] + "_pre.onnx"
+    quant_pre_process(ruta_onnx, ruta_preprocesada)
+    quantize_static(
+        ruta_preprocesada,
+        ruta_int8,
+        LectorCalibracion(),
+        quant_format=QuantFormat.QDQ,
+        per_channel=True,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+    )
+    os.remove(ruta_preprocesada)
+    return ruta_int8
+
+# --------------------------------------------------------------------------------
+# 4) SESSIONS AND PREDICTION
+# --------------------------------------------------------------------------------
+
+def crear_sesion(ruta_onnx, backend="onnxruntime", hilos=None, imgsz=IMGSZ):
+    """
+    Loads an exported model for CPU inference.
+
+    Args:
+        ruta_onnx (str): Path to the .onnx model.
+        backend (str): "onnxruntime" or "openvino".
+        hilos (int): Intra-op threads (defaults to all the CPUs available to the process).
+        imgsz (int): Input size the model was exported with.
+
+    Returns:
+        dict: Session with the backend name, input size and an "inferir" callable that
+        maps a (1, 3, imgsz, imgsz) tensor to the list of model outputs.
+    """
+    if hilos is None:
+        hilos = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+
+    if backend == "onnxruntime":
+        import onnxruntime as ort
+
+        opciones = ort.SessionOptions()
+        opciones.intra_op_num_threads = hilos
+        opciones.inter_op_num_threads = 1
+        opciones.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        opciones.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        sesion = ort.InferenceSession(ruta_onnx, sess_options=opciones, providers=["CPUExecutionProvider"])
+        nombre_entrada = sesion.get_inputs()[0].name
+
+        def inferir(tensor):
+            return sesion.run(None, {nombre_entrada: tensor})
+
+    elif backend == "openvino":
+        import openvino as ov
+
+        core = ov.Core()
+        modelo = core.compile_model(
+            ruta_onnx, "CPU", {"INFERENCE_NUM_THREADS": hilos, "PERFORMANCE_HINT": "LATENCY"}
+        )
+        peticion = modelo.create_infer_request()
+
+        def inferir(tensor):
+            peticion.infer({0: tensor})
+            return [peticion.get_output_tensor(i).data.copy() for i in range(len(modelo.outputs))]
+
+    else:
+        raise ValueError(f"Unknown inference backend: {backend}")
+
+    logger.info("Loaded %s with %s (%d threads)", ruta_onnx, backend, hilos)
+    return {"backend": backend, "imgsz": imgsz, "hilos": hilos, "inferir": inferir}
+
+
+def _propiedades_salida(salidas, b, boxes, coeficientes, escala, relleno, imgsz, mascaras):
+    if mascaras:
+        return propiedades_desde_mascaras(coeficientes, salidas[1][b:b + 1], boxes, escala, relleno, imgsz)
+    return tabla_desde_cajas(boxes)
+
+
+def predecir(sesion, imagen, conf=CONF, mascaras=False):
+    """
+    Runs the exported model on one image.
+
+    Args:
+        sesion (dict): Session created by crear_sesion().
+        imagen (str or np.ndarray): Image path or BGR image.
+        conf (float): Confidence threshold.
+        mascaras (bool): Compute the properties from the segmentation masks instead
+            of the bounding boxes.
+
+    Returns:
+        boxes (np.ndarray): (N, 4) boxes [x1, y1, x2, y2] in image pixels.
+        scores (np.ndarray): (N,) confidences.
+        propiedades (np.ndarray): (N, 4) array [cx, cy, angle, length].
+    """
+    if isinstance(imagen, str):
+        imagen = cv2.imread(imagen)
+    tensor, escala, relleno = letterbox(imagen, sesion["imgsz"])
+    salidas = sesion["inferir"](tensor)
+    boxes, scores, coeficientes = decodificar(salidas[0], escala, relleno, imagen.shape[:2], conf=conf)
+    propiedades = _propiedades_salida(salidas, 0, boxes, coeficientes, escala, relleno, sesion["imgsz"], mascaras)
+    return boxes, scores, propiedades
+
+# --------------------------------------------------------------------------------
+# 5) ROI CROP AND TILES
+# --------------------------------------------------------------------------------
+
+# Useful area of the Cam 1 frames (same polygon as the Hough-Transform ptv())
+ROI_FIBRAS = np.array([
+    [30, 0],
+    [640, 0],
+    [640, 840],
+    [1024, 840],
+    [1024, 980],
+    [20, 970]
+], dtype=np.int32)
+
+# Defaults of the tiled mode (pixels of the original frame)
+TAMANO_TESELA = 512
+SOLAPE_TESELA = 128  # Must exceed the longest fiber so every fiber fits whole in some tile
+MARGEN_BORDE = 2  # Detections closer than this to an inner tile border are left to the neighbor tile
+
+
+def ventana_roi(roi, forma):
+    """
+    Bounding box of the ROI polygon clipped to the image.
+
+    Args:
+        roi (np.ndarray): (K, 2) polygon in pixels.
+        forma (tuple): (alto, ancho) of the image.
+
+    Returns:
+        tuple: (x0, y0, x1, y1), with x1 / y1 exclusive.
+    """
+    alto, ancho = forma[:2]
+    x, y, w, h = cv2.boundingRect(np.asarray(roi, dtype=np.int32))
+    return max(x, 0), max(y, 0), min(x + w, ancho), min(y + h, alto)
+
+
+def imgsz_equivalente(lado, forma, imgsz=IMGSZ, stride=32):
+    """
+    Input size that keeps the pixel scale of full-frame inference at imgsz when
+    feeding a crop whose longest side is lado, rounded up to the model stride.
+    """
+    escala = imgsz / max(forma[:2])
+    return int(np.ceil(lado * escala / stride) * stride)
+
+
+@lru_cache(maxsize=8)
+def _teselas(roi, forma, tamano, solape):
+    x0, y0, x1, y1 = ventana_roi(np.array(roi), forma)
+    mascara = np.zeros(forma[:2], dtype=np.uint8)
+    cv2.fillPoly(mascara, [np.array(roi, dtype=np.int32)], 1)
+
+    def inicios(a, b):
+        paso = tamano - solape
+        if b - a <= tamano:
+            return [a]
+        # The last tile is shifted inward so every tile has the same size
+        return sorted(set(list(range(a, b - tamano, paso)) + [b - tamano]))
+
+    teselas = []
+    for ty in inicios(y0, y1):
+        for tx in inicios(x0, x1):
+            tesela = (tx, ty, min(tx + tamano, x1), min(ty + tamano, y1))
+            # Skip tiles that fall entirely outside the ROI
+            if mascara[tesela[1]:tesela[3], tesela[0]:tesela[2]].any():
+                teselas.append(tesela)
+    return tuple(teselas)
+
+
+def generar_teselas(roi, forma, tamano=TAMANO_TESELA, solape=SOLAPE_TESELA):
+    """
+    Overlapping tiles covering the ROI window, without the tiles that contain no ROI
+    pixel. Cached per (ROI, image shape, tile size, overlap).
+
+    Returns:
+        tuple: (x0, y0, x1, y1) of each tile, x1 / y1 exclusive.
+    """
+    roi = tuple(map(tuple, np.asarray(roi, dtype=int).tolist()))
+    return _teselas(roi, tuple(forma[:2]), tamano, solape)
+
+
+def fusionar_teselas(resultados, teselas, ventana, margen=MARGEN_BORDE, iou=IOU_NMS):
+    """
+    Merges the per-tile detections into frame coordinates.
+
+    A detection touching an inner tile border is cut by it and is dropped, since the
+    overlap guarantees the whole fiber is detected in the neighbor tile. The duplicates
+    left in the overlaps are removed with NMS.
+
+    Args:
+        resultados (list): (boxes, scores, propiedades) of each tile, in tile coordinates.
+        teselas (tuple): Tiles returned by generar_teselas().
+        ventana (tuple): ROI window returned by ventana_roi().
+
+    Returns:
+        boxes (np.ndarray): (N, 4) boxes in frame coordinates.
+        scores (np.ndarray): (N,) confidences.
+        propiedades (np.ndarray): (N, 4) array [cx, cy, angle, length] in frame coordinates.
+    """
+    todas_boxes, todos_scores, todas_propiedades = [], [], []
+    for (boxes, scores, propiedades), (tx0, ty0, tx1, ty1) in zip(resultados, teselas):
+        if not len(boxes):
+            continue
+        boxes = np.asarray(boxes, dtype=np.float32) + np.array([tx0, ty0, tx0, ty0], dtype=np.float32)
+        propiedades = _desplazar(propiedades, tx0, ty0)
+        cortada = np.zeros(len(boxes), dtype=bool)
+        if tx0 > ventana[0]:
+            cortada |= boxes[:, 0] <= tx0 + margen
+        if ty0 > ventana[1]:
+            cortada |= boxes[:, 1] <= ty0 + margen
+        if tx1 < ventana[2]:
+            cortada |= boxes[:, 2] >= tx1 - margen
+        if ty1 < ventana[3]:
+            cortada |= boxes[:, 3] >= ty1 - margen
+        todas_boxes.append(boxes[~cortada])
+        todos_scores.append(np.asarray(scores, dtype=np.float32)[~cortada])
+        todas_propiedades.append(propiedades[~cortada])
+
+    if not todas_boxes:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros((0, 4))
+    boxes, scores = np.concatenate(todas_boxes), np.concatenate(todos_scores)
+    keep = nms(boxes, scores, iou)
+    return boxes[keep], scores[keep], np.concatenate(todas_propiedades)[keep]
+
+
+def _desplazar(propiedades, dx, dy):
+    propiedades = np.array(propiedades, dtype=np.float64).reshape(-1, 4)
+    propiedades[:, 0] += dx
+    propiedades[:, 1] += dy
+    return propiedades
+
+
+def propiedades_ultralytics(resultado, mascaras=False):
+    """
+    (boxes, scores, propiedades) of one Ultralytics result, with the properties taken
+    from the mask polygons (results.masks.xy) or from the boxes.
+    """
+    boxes = resultado.boxes.xyxy.cpu().numpy()
+    scores = resultado.boxes.conf.cpu().numpy()
+    if mascaras and resultado.masks is not None:
+        return boxes, scores, propiedades_desde_poligonos(resultado.masks.xy, boxes)
+    return boxes, scores, tabla_desde_cajas(boxes)
+
+
+def lote_pytorch(model, imgsz, conf=CONF, verbose=False, mascaras=False):
+    """
+    Wraps an Ultralytics model as a batch predictor: list of BGR images -> list of
+    (boxes, scores, propiedades).
+    """
+    def predecir_lote(imagenes):
+        resultados = model.predict(source=imagenes, imgsz=imgsz, conf=conf, verbose=verbose)
+        return [propiedades_ultralytics(r, mascaras) for r in resultados]
+    return predecir_lote
+
+
+def lote_onnx(sesion, conf=CONF, mascaras=False):
+    """
+    Wraps an ONNX session as a batch predictor: list of BGR images -> list of
+    (boxes, scores, propiedades). Images are run in a single call, which needs a model
+    exported with dinamico=True when more than one image is passed.
+    """
+    def predecir_lote(imagenes):
+        entradas = [letterbox(imagen, sesion["imgsz"]) for imagen in imagenes]
+        salidas = sesion["inferir"](np.concatenate([tensor for tensor, _, _ in entradas]))
+        resultados = []
+        for b, ((_, escala, relleno), imagen) in enumerate(zip(entradas, imagenes)):
+            boxes, scores, coeficientes = decodificar(salidas[0][b:b + 1], escala, relleno, imagen.shape[:2], conf=conf)
+            propiedades = _propiedades_salida(
+                salidas, b, boxes, coeficientes, escala, relleno, sesion["imgsz"], mascaras
+            )
+            resultados.append((boxes, scores, propiedades))
+        return resultados
+    return predecir_lote
+
+
+def predecir_recorte(predecir_lote, imagen, roi=ROI_FIBRAS):
+    """
+    Runs the detector on the ROI window only.
+
+    Returns:
+        boxes (np.ndarray): (N, 4) boxes in frame coordinates.
+        scores (np.ndarray): (N,) confidences.
+        propiedades (np.ndarray): (N, 4) array [cx, cy, angle, length] in frame coordinates.
+    """
+    x0, y0, x1, y1 = ventana_roi(roi, imagen.shape)
+    (boxes, scores, propiedades), = predecir_lote([imagen[y0:y1, x0:x1]])
+    boxes = np.asarray(boxes, dtype=np.float32).reshape(-1, 4) + np.array([x0, y0, x0, y0], dtype=np.float32)
+    return boxes, scores, _desplazar(propiedades, x0, y0)
+
+
+def predecir_teselas(predecir_lote, imagen, roi=ROI_FIBRAS, tamano=TAMANO_TESELA, solape=SOLAPE_TESELA):
+    """
+    Runs the detector on the overlapping tiles of the ROI in one batch and merges
+    the detections across tile borders.
+
+    Returns:
+        boxes (np.ndarray): (N, 4) boxes in frame coordinates.
+        scores (np.ndarray): (N,) confidences.
+        propiedades (np.ndarray): (N, 4) array [cx, cy, angle, length] in frame coordinates.
+    """
+    teselas = generar_teselas(roi, imagen.shape, tamano, solape)
+    resultados = predecir_lote([imagen[y0:y1, x0:x1] for x0, y0, x1, y1 in teselas])
+    return fusionar_teselas(resultados, teselas, ventana_roi(roi, imagen.shape))
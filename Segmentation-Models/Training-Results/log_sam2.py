@@ -0,0 +1,179 @@
+# === SAM2 TRAINING-LOG INGESTION ===
+#
+# Incremental parser of the SAM2 training log (sam2.txt). The log is memory-mapped, a
+# plain byte search for "Losses/train_all_loss" (mmap.find) skips the chunks without
+# training lines, and the regular expression runs over the rest of the mapped bytes
+# directly, without splitting and decoding lines. Parsed rows are appended to a columnar
+# store, one raw binary file per column plus a checkpoint with the byte offset reached
+# and the number of rows, so every run parses only what was added to the log since the
+# last one. seguir() keeps ingesting while training writes, and cargar() returns the
+# columns with np.fromfile, without touching the log.
+
+import json
+import mmap
+import os
+import re
+import time
+
+import numpy as np
+
+# "Train Epoch: [EPOCH][  IT/IT_TOTAL] | ... | Losses/train_all_loss: VALOR (PROMEDIO)"
+REGEX_LINEA = re.compile(
+    rb"Train Epoch: \[(\d+)\]\[\s*(\d+)/(\d+)\].*Losses/train_all_loss:\s*([0-9\.e\+\-]+)\s*\(([0-9\.e\+\-]+)\)"
+)
+MARCA = b"Losses/train_all_loss"
+
+COLUMNAS = {
+    "epoch": np.int64,
+    "iteration": np.int64,
+    "iteration_total": np.int64,
+    "current_loss": np.float64,
+    "avg_loss": np.float64,
+}
+
+BYTES_CABECERA = 4096   # Start of the log remembered to detect a new log in the same path
+INTERVALO = 5.0         # Seconds between polls in seguir()
+
+
+# --------------------------------------------------------------------------------
+# 1) PARSING
+# --------------------------------------------------------------------------------
+
+def parsear(datos, inicio=0, fin=None):
+    """
+    Columns of the complete lines of datos[inicio:fin] (bytes or mmap).
+
+    A byte search for MARCA skips chunks without any loss line (most of what is written
+    between two polls in tail mode); otherwise REGEX_LINEA runs over the chunk in one
+    findall() and every column is converted at once. A last line without its newline is
+    left for the next call.
+
+    Returns:
+        tuple: ({column: array}, offset) with offset the position after the last
+        complete line.
+    """
+    fin = len(datos) if fin is None else fin
+    completo = datos.rfind(b"\n", inicio, fin) + 1
+    if completo <= inicio:
+        return {c: np.zeros(0, dtype=t) for c, t in COLUMNAS.items()}, inicio
+    if datos.find(MARCA, inicio, completo) == -1:
+        return {c: np.zeros(0, dtype=t) for c, t in COLUMNAS.items()}, completo
+
+    grupos = REGEX_LINEA.findall(datos, inicio, completo)
+    valores = list(zip(*grupos)) or [()] * len(COLUMNAS)
+    columnas = {}
+    for (columna, dtype), v in zip(COLUMNAS.items(), valores):
+        convertir = int if np.issubdtype(dtype, np.integer) else float
+        columnas[columna] = np.fromiter(map(convertir, v), dtype=dtype, count=len(grupos))
+    return columnas, completo
+
+
+# --------------------------------------------------------------------------------
+# 2) COLUMNAR STORE
+# --------------------------------------------------------------------------------
+
+def _ruta_checkpoint(directorio):
+    return os.path.join(directorio, "checkpoint.json")
+
+
+def _ruta_columna(directorio, columna):
+    return os.path.join(directorio, f"{columna}.bin")
+
+
+def _leer_checkpoint(directorio):
+    try:
+        with open(_ruta_checkpoint(directorio), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {"offset": 0, "filas": 0, "cabecera": ""}
+
+
+def _escribir_checkpoint(directorio, checkpoint):
+    # Written to a temporary file and renamed, so a crash never leaves half a checkpoint
+    temporal = _ruta_checkpoint(directorio) + ".tmp"
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(temporal, _ruta_checkpoint(directorio))
+
+
+def _reiniciar(directorio):
+    for columna in COLUMNAS:
+        open(_ruta_columna(directorio, columna), "wb").close()
+    return {"offset": 0, "filas": 0, "cabecera": ""}
+
+
+def ingerir(ruta_log, directorio):
+    """
+    Parses what was appended to the log since the last call and appends its rows to the
+    store. The store starts over when the log was truncated or replaced.
+
+    Returns:
+        int: New rows.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    checkpoint = _leer_checkpoint(directorio)
+    # Columns longer than the checkpoint (a run interrupted while appending) are cut back
+    for columna, dtype in COLUMNAS.items():
+        ruta = _ruta_columna(directorio, columna)
+        largo = checkpoint["filas"] * np.dtype(dtype).itemsize
+        if not os.path.exists(ruta) or os.path.getsize(ruta) < largo:
+            checkpoint = _reiniciar(directorio)
+            break
+        if os.path.getsize(ruta) > largo:
+            with open(ruta, "r+b") as f:
+                f.truncate(largo)
+
+    if os.path.getsize(ruta_log) == 0:
+        return 0
+    with open(ruta_log, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+        cabecera = datos[:BYTES_CABECERA].hex()
+        if len(datos) < checkpoint["offset"] or not cabecera.startswith(checkpoint["cabecera"]):
+            checkpoint = _reiniciar(directorio)
+        columnas, offset = parsear(datos, checkpoint["offset"])
+
+    nuevas = len(columnas["epoch"])
+    if nuevas:
+        for columna, valores in columnas.items():
+            with open(_ruta_columna(directorio, columna), "ab") as f:
+                valores.tofile(f)
+    _escribir_checkpoint(directorio, {
+        "offset": offset,
+        "filas": checkpoint["filas"] + nuevas,
+        # Only the part of the header already read can be compared on later runs
+        "cabecera": cabecera[:2 * offset],
+    })
+    return nuevas
+
+
+def cargar(directorio):
+    """
+    Columns of the store ({column: array}), as far as the checkpoint.
+    """
+    filas = _leer_checkpoint(directorio)["filas"]
+    salida = {}
+    for columna, dtype in COLUMNAS.items():
+        ruta = _ruta_columna(directorio, columna)
+        salida[columna] = np.fromfile(ruta, dtype=dtype, count=filas) if filas else np.zeros(0, dtype=dtype)
+    return salida
+
+
+def seguir(ruta_log, directorio, intervalo=INTERVALO, al_ingerir=None):
+    """
+    Tail mode: ingests the log every `intervalo` seconds until interrupted (Ctrl+C).
+
+    Args:
+        al_ingerir (callable): Called with the number of new rows after every poll that
+            found some (e.g. to redraw the curves).
+    """
+    tamano = None
+    try:
+        while True:
+            actual = os.path.getsize(ruta_log) if os.path.exists(ruta_log) else None
+            if actual is not None and actual != tamano:
+                nuevas = ingerir(ruta_log, directorio)
+                tamano = actual
+                if nuevas and al_ingerir is not None:
+                    al_ingerir(nuevas)
+            time.sleep(intervalo)
+    except KeyboardInterrupt:
+        pass
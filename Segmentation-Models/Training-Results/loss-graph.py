@@ -1,27 +1,31 @@
 import csv
+import os
+import sys
+
 import matplotlib.pyplot as plt
-from collections import defaultdict
+import numpy as np
 
-#### 1) Procesar CSV de SAM ####
-# Archivo que contiene las métricas de SAM:
-csv_file_sam = "Segmentation-Models/Training-Results/sam2_losses.csv"
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import log_sam2
 
-# Usamos diccionarios para acumular la suma y el conteo de 'avg_loss' por época.
-sam_epoch_sums = defaultdict(float)
-sam_epoch_counts = defaultdict(int)
+#### 1) Procesar métricas de SAM ####
+# Log de entrenamiento de SAM y almacén columnar que mantiene sam2-data-filter.py;
+# ingerir() solo parsea lo agregado al log desde la última vez, así que la curva
+# está al día aunque el entrenamiento siga escribiendo.
+logfile_sam = "Segmentation-Models/Training-Results/sam2.txt"
+directorio_metricas_sam = "Segmentation-Models/Training-Results/sam2_metrics"
 
-with open(csv_file_sam, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        epoch = int(row["epoch"])
-        avg_loss = float(row["avg_loss"])
-        sam_epoch_sums[epoch] += avg_loss
-        sam_epoch_counts[epoch] += 1
+log_sam2.ingerir(logfile_sam, directorio_metricas_sam)
+sam = log_sam2.cargar(directorio_metricas_sam)
+
+# Suma y conteo de 'avg_loss' por época en una pasada (bincount sobre el número de época)
+sam_epoch_sums = np.bincount(sam["epoch"], weights=sam["avg_loss"])
+sam_epoch_counts = np.bincount(sam["epoch"])
 
-# Ordenamos las épocas
-sam_epochs = sorted(sam_epoch_sums.keys())
+# Épocas presentes, en orden
+sam_epochs = np.flatnonzero(sam_epoch_counts)
 # Calculamos el valor promedio de loss por época para SAM
-sam_avg_losses = [sam_epoch_sums[e] / sam_epoch_counts[e] for e in sam_epochs]
+sam_avg_losses = sam_epoch_sums[sam_epochs] / sam_epoch_counts[sam_epochs]
 
 #### 2) Procesar CSV de YOLO ####
 # Archivo que contiene las métricas de YOLO:
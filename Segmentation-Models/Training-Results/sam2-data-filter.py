@@ -1,41 +1,65 @@
-import re
 import csv
+import os
+import sys
 
-# Regex para extraer la información de cada línea de entrenamiento donde aparece:
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import log_sam2
+
+# El parseo del log vive en log_sam2.py: el log se mapea en memoria, una búsqueda de
+# bytes descarta los tramos sin "Losses/train_all_loss" y la regex corre sobre el resto.
+# Cada línea de entrenamiento tiene la forma:
 # "Train Epoch: [EPOCH][  IT/IT_TOTAL] | ... | Losses/train_all_loss: VALOR (PROMEDIO)"
 # 
 # Ejemplo de línea:
 # INFO 2025-01-21 13:26:19,065 train_utils.py: 271: Train Epoch: [0][  0/609] | ... | Losses/train_all_loss: 3.73e+00 (3.73e+00)
 
-regex_line = re.compile(
-    r"Train Epoch: \[(\d+)\]\[\s*(\d+)/(\d+)\].*Losses/train_all_loss:\s*([0-9\.e\+\-]+)\s*\(([0-9\.e\+\-]+)\)"
-)
-
 # Cambia esta ruta al archivo .txt que contiene tus logs:
-logfile = "Segmentation-Models\Training-Results\sam2.txt"
+logfile = "Segmentation-Models/Training-Results/sam2.txt"
 
-# Lista donde almacenaremos los datos extraídos
-data = []
+# Almacén columnar (un .bin por columna + checkpoint con el offset de bytes ya leído).
+# Cada ejecución solo parsea lo que se agregó al log desde la anterior.
+directorio_metricas = "Segmentation-Models/Training-Results/sam2_metrics"
 
-with open(logfile, "r", encoding="utf-8") as f:
-    for line in f:
-        match = regex_line.search(line)
-        if match:
-            epoch = int(match.group(1))
-            iteration = int(match.group(2))
-            total_iter = int(match.group(3))
-            current_loss = float(match.group(4))   # Valor actual de la pérdida
-            avg_loss = float(match.group(5))       # Valor promedio de la pérdida
+# Si quieres guardar en CSV
+csv_file = "Segmentation-Models/Training-Results/sam2_losses.csv"
 
-            data.append((epoch, iteration, total_iter, current_loss, avg_loss))
+# True para seguir el log mientras el entrenamiento escribe (Ctrl+C para terminar)
+seguir = False
+intervalo = log_sam2.INTERVALO  # Segundos entre lecturas en modo seguir
 
-# Si quieres guardar en CSV
-csv_file = "Segmentation-Models\Training-Results\sam2_losses.csv"
-with open(csv_file, "w", newline="", encoding="utf-8") as f:
-    writer = csv.writer(f)
-    # Cabecera
-    writer.writerow(["epoch", "iteration", "iteration_total", "current_loss", "avg_loss"])
-    # Filas
-    writer.writerows(data)
-
-print(f"Se extrajeron {len(data)} filas de datos. Guardado en {csv_file}.")
+
+def exportar_csv():
+    """
+    Agrega al CSV las filas del almacén que todavía no tiene (lo reescribe si el
+    almacén empezó de nuevo y tiene menos filas que el CSV).
+    """
+    columnas = log_sam2.cargar(directorio_metricas)
+    total = len(columnas["epoch"])
+
+    filas_csv = -1
+    if os.path.exists(csv_file):
+        with open(csv_file, "rb") as f:
+            filas_csv = f.read().count(b"\n") - 1  # Sin la cabecera
+    modo = "a" if 0 <= filas_csv <= total else "w"
+    desde = filas_csv if modo == "a" else 0
+
+    with open(csv_file, modo, newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if modo == "w":
+            # Cabecera
+            writer.writerow(list(log_sam2.COLUMNAS))
+        # Filas
+        writer.writerows(zip(*(v[desde:].tolist() for v in columnas.values())))
+    return total - desde
+
+
+nuevas = log_sam2.ingerir(logfile, directorio_metricas)
+exportadas = exportar_csv()
+print(f"Se extrajeron {nuevas} filas nuevas de datos ({exportadas} agregadas a {csv_file}).")
+
+if seguir:
+    print(f"Siguiendo {logfile} cada {intervalo} s...")
+    log_sam2.seguir(
+        logfile, directorio_metricas, intervalo,
+        al_ingerir=lambda n: print(f"+{n} filas ({exportar_csv()} agregadas a {csv_file})"),
+    )
@@ -0,0 +1,279 @@
+# === PREPROCESSED DATASET CACHE ===
+#
+# Decodes and letterboxes every image of the Roboflow YOLO dataset
+# (Volumetric_Ilumination-3/{train,valid,test}) once into a memory-mapped uint8 array
+# (N, imgsz, imgsz, 3) per split, and parses the YOLO polygon label files into flat
+# arrays with offsets (polygons per image, vertices per polygon), with the vertices
+# moved into the letterboxed frame. lotes() serves shuffled batches from the cache with
+# a background thread that gathers the next batches while the current one is used, so
+# an epoch never decodes a JPG again. It serves custom training loops; the yolo CLI
+# training of fine-tunning.ipynb cannot take an external loader and uses the
+# ultralytics disk cache (cache=disk) instead.
+
+import json
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+from numpy.lib.format import open_memmap
+
+SPLITS = ("train", "valid", "test")
+IMGSZ = 1024
+RELLENO = 114                      # Gray of the letterbox borders (as ultralytics)
+EXTENSIONES = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# --------------------------------------------------------------------------------
+# 1) IMAGES AND LABELS
+# --------------------------------------------------------------------------------
+
+def letterbox(imagen, tamano=IMGSZ, relleno=RELLENO):
+    """
+    Resizes an image to fit a tamano x tamano square keeping its aspect ratio and pads
+    the rest evenly on both sides.
+
+    Returns:
+        tuple: (letterboxed image, scale, (pad_x, pad_y)).
+    """
+    alto, ancho = imagen.shape[:2]
+    escala = min(tamano / alto, tamano / ancho)
+    nuevo_ancho, nuevo_alto = round(ancho * escala), round(alto * escala)
+    if (nuevo_ancho, nuevo_alto) != (ancho, alto):
+        imagen = cv2.resize(imagen, (nuevo_ancho, nuevo_alto), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (tamano - nuevo_ancho) / 2, (tamano - nuevo_alto) / 2
+    arriba, izquierda = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    abajo, derecha = tamano - nuevo_alto - arriba, tamano - nuevo_ancho - izquierda
+    if arriba or abajo or izquierda or derecha:
+        imagen = cv2.copyMakeBorder(imagen, arriba, abajo, izquierda, derecha, cv2.BORDER_CONSTANT,
+                                    value=(relleno, relleno, relleno))
+    return imagen, escala, (izquierda, arriba)
+
+
+def leer_etiquetas(ruta):
+    """
+    Polygons of one YOLO segmentation label file ("class x1 y1 x2 y2 ..." per line,
+    normalized coordinates).
+
+    Returns:
+        tuple: (classes (P,), vertex counts (P,), vertices (V, 2) float32).
+    """
+    clases, cuentas, vertices = [], [], []
+    if os.path.exists(ruta):
+        with open(ruta, "r", encoding="utf-8") as f:
+            for linea in f:
+                valores = linea.split()
+                if len(valores) < 3:
+                    continue
+                clases.append(int(valores[0]))
+                puntos = np.asarray(valores[1:1 + 2 * ((len(valores) - 1) // 2)], dtype=np.float32)
+                cuentas.append(len(puntos) // 2)
+                vertices.append(puntos.reshape(-1, 2))
+    return (
+        np.asarray(clases, dtype=np.int64),
+        np.asarray(cuentas, dtype=np.int64),
+        np.concatenate(vertices) if vertices else np.zeros((0, 2), dtype=np.float32),
+    )
+
+
+def listar(directorio_split):
+    """
+    Sorted image paths of a split and the label path of each.
+    """
+    carpeta = os.path.join(directorio_split, "images")
+    imagenes = sorted(
+        os.path.join(carpeta, nombre) for nombre in os.listdir(carpeta)
+        if nombre.lower().endswith(EXTENSIONES)
+    )
+    etiquetas = [
+        os.path.join(directorio_split, "labels", os.path.splitext(os.path.basename(r))[0] + ".txt")
+        for r in imagenes
+    ]
+    return imagenes, etiquetas
+
+
+# --------------------------------------------------------------------------------
+# 2) CACHE
+# --------------------------------------------------------------------------------
+
+def _ruta_imagenes(destino, split):
+    return os.path.join(destino, split, "imagenes.npy")
+
+
+def _ruta_etiquetas(destino, split):
+    return os.path.join(destino, split, "etiquetas.npz")
+
+
+def _firma(rutas):
+    # Names, sizes and modification times of the source files
+    return [[os.path.basename(r), os.path.getsize(r), os.stat(r).st_mtime_ns] for r in rutas]
+
+
+def preparar_split(directorio_split, destino, split, imgsz=IMGSZ, hilos=None):
+    """
+    Builds the cache of one split (skipped when it is up to date with its source files).
+
+    Returns:
+        bool: True when the cache was (re)built.
+    """
+    imagenes, etiquetas = listar(directorio_split)
+    manifiesto = {
+        "imgsz": imgsz,
+        "imagenes": _firma(imagenes),
+        "etiquetas": _firma([r for r in etiquetas if os.path.exists(r)]),
+    }
+    ruta_manifiesto = os.path.join(destino, split, "manifiesto.json")
+    if os.path.exists(ruta_manifiesto) and os.path.exists(_ruta_imagenes(destino, split)):
+        with open(ruta_manifiesto, "r", encoding="utf-8") as f:
+            if json.load(f) == manifiesto:
+                return False
+    os.makedirs(os.path.join(destino, split), exist_ok=True)
+
+    pixeles = open_memmap(_ruta_imagenes(destino, split), mode="w+", dtype=np.uint8,
+                          shape=(len(imagenes), imgsz, imgsz, 3))
+    escalas = np.ones(len(imagenes))
+    pads = np.zeros((len(imagenes), 2), dtype=np.int64)
+    originales = np.zeros((len(imagenes), 2), dtype=np.int64)
+
+    def decodificar(i):
+        # cv2 releases the GIL while decoding and resizing, so threads run in parallel
+        imagen = cv2.imread(imagenes[i], cv2.IMREAD_COLOR)
+        if imagen is None:
+            raise ValueError(f"Could not read image: {imagenes[i]}")
+        originales[i] = imagen.shape[1], imagen.shape[0]
+        pixeles[i], escalas[i], pads[i] = letterbox(imagen, imgsz)
+
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        list(pool.map(decodificar, range(len(imagenes))))
+    pixeles.flush()
+    del pixeles
+
+    # Labels: normalized vertices of the original image -> normalized letterboxed frame
+    clases, cuentas, vertices, por_imagen = [], [], [], []
+    for i, ruta in enumerate(etiquetas):
+        c, n, v = leer_etiquetas(ruta)
+        v = (v * originales[i] * escalas[i] + pads[i]) / imgsz
+        clases.append(c), cuentas.append(n), vertices.append(v.astype(np.float32)), por_imagen.append(len(c))
+    cuentas = np.concatenate(cuentas) if cuentas else np.zeros(0, dtype=np.int64)
+    np.savez(
+        _ruta_etiquetas(destino, split),
+        nombres=np.array([os.path.basename(r) for r in imagenes], dtype=str),
+        clases=np.concatenate(clases) if clases else np.zeros(0, dtype=np.int64),
+        offsets_poligonos=np.concatenate([[0], np.cumsum(cuentas)]).astype(np.int64),
+        offsets_imagenes=np.concatenate([[0], np.cumsum(por_imagen)]).astype(np.int64),
+        vertices=np.concatenate(vertices) if vertices else np.zeros((0, 2), dtype=np.float32),
+        escalas=escalas,
+        pads=pads,
+    )
+    with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f)
+    return True
+
+
+def preparar(directorio_dataset, destino, imgsz=IMGSZ, splits=SPLITS, hilos=None):
+    """
+    Builds the cache of every split of the dataset that is missing or out of date.
+
+    Returns:
+        dict: split -> True when rebuilt.
+    """
+    return {
+        split: preparar_split(os.path.join(directorio_dataset, split), destino, split, imgsz, hilos)
+        for split in splits if os.path.isdir(os.path.join(directorio_dataset, split, "images"))
+    }
+
+
+def cargar(destino, split):
+    """
+    Cache of one split.
+
+    Returns:
+        dict: imagenes (N, imgsz, imgsz, 3) uint8 memmap (read-only) and the label
+        arrays: nombres, clases (P,), offsets_poligonos (P + 1,), offsets_imagenes
+        (N + 1,), vertices (V, 2) normalized to the letterboxed frame, escalas, pads.
+    """
+    with np.load(_ruta_etiquetas(destino, split)) as archivo:
+        cache = {k: archivo[k] for k in archivo.files}
+    cache["imagenes"] = np.load(_ruta_imagenes(destino, split), mmap_mode="r")
+    return cache
+
+
+def etiquetas_de(cache, indices):
+    """
+    Labels of the given images as flat arrays.
+
+    Returns:
+        tuple: (image position in `indices` (Q,), classes (Q,), vertex offsets (Q + 1,),
+        vertices (V', 2)) of their Q polygons.
+    """
+    indices = np.asarray(indices, dtype=np.int64)
+    oi, op = cache["offsets_imagenes"], cache["offsets_poligonos"]
+    n = oi[indices + 1] - oi[indices]
+    poligonos = np.repeat(oi[indices] - np.concatenate([[0], np.cumsum(n)[:-1]]), n) + np.arange(n.sum())
+    m = op[poligonos + 1] - op[poligonos]
+    filas = np.repeat(op[poligonos] - np.concatenate([[0], np.cumsum(m)[:-1]]), m) + np.arange(m.sum())
+    return (
+        np.repeat(np.arange(len(indices)), n),
+        cache["clases"][poligonos],
+        np.concatenate([[0], np.cumsum(m)]).astype(np.int64),
+        cache["vertices"][filas],
+    )
+
+
+# --------------------------------------------------------------------------------
+# 3) LOADER
+# --------------------------------------------------------------------------------
+
+def lotes(cache, tamano_lote=16, barajar=True, semilla=None, previos=2):
+    """
+    Batches of one epoch from a cache, gathered by a background thread up to `previos`
+    batches ahead.
+
+    Yields:
+        tuple: (images (B, imgsz, imgsz, 3) uint8, labels as etiquetas_de(), indices (B,)).
+
+    Raises:
+        Exception: Whatever the background thread raised, after the batches it made.
+    """
+    n = len(cache["imagenes"])
+    orden = np.random.default_rng(semilla).permutation(n) if barajar else np.arange(n)
+    cola = queue.Queue(maxsize=max(previos, 1))
+    fin = object()
+    detener = threading.Event()
+
+    def productor():
+        error = None
+        try:
+            for a in range(0, n, tamano_lote):
+                if detener.is_set():
+                    return
+                # Sorted rows read the memmap front to back; the batch keeps the shuffled order
+                indices = orden[a:a + tamano_lote]
+                secuencia = np.argsort(indices)
+                imagenes = np.empty((len(indices), *cache["imagenes"].shape[1:]), dtype=np.uint8)
+                imagenes[secuencia] = cache["imagenes"][indices[secuencia]]
+                cola.put((imagenes, etiquetas_de(cache, indices), indices))
+        except Exception as e:   # Re-raised by the consumer instead of ending the epoch early
+            error = e
+        finally:
+            cola.put((fin, error))
+
+    hilo = threading.Thread(target=productor, daemon=True)
+    hilo.start()
+    try:
+        while True:
+            lote = cola.get()
+            if lote[0] is fin:
+                if lote[1] is not None:
+                    raise lote[1]
+                break
+            yield lote
+    finally:
+        detener.set()
+        while hilo.is_alive():
+            try:
+                cola.get_nowait()
+            except queue.Empty:
+                hilo.join(0.01)
@@ -0,0 +1,113 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import cache_dataset
+
+# =============================================================================
+# 1) PARAMETERS
+# =============================================================================
+# Epochs served by the JPG loader (decode + letterbox + label parsing on every epoch,
+# what the training does with cache=False) and by the memmap cache loader. The
+# training step is simulated by a sleep of PASO_S seconds per batch (GPU time proxy);
+# the stall is the time the step waits for its batch.
+directorio_dataset = "Segmentation-Models/YOLO/Volumetric_Ilumination-3"
+directorio_cache = "Segmentation-Models/YOLO/cache"
+SPLIT = "train"
+IMGSZ = cache_dataset.IMGSZ
+
+TAMANO_LOTE = 16
+EPOCAS = 2
+PASOS_S = [0.0, 0.25]   # Simulated training step per batch (seconds)
+HILOS = None            # Decoding threads (None = ThreadPoolExecutor default)
+SEMILLA = 0
+
+ruta_reporte = "Segmentation-Models/YOLO/dataset_cache_benchmark.json"
+
+# =============================================================================
+# 2) LOADERS
+# =============================================================================
+
+def lotes_jpg(imagenes, etiquetas, tamano_lote, semilla, pool):
+    """
+    Batches of one epoch decoded from the JPGs, with the label files parsed again.
+    """
+    orden = np.random.default_rng(semilla).permutation(len(imagenes))
+
+    def cargar(i):
+        imagen, _, _ = cache_dataset.letterbox(cv2.imread(imagenes[i], cv2.IMREAD_COLOR), IMGSZ)
+        return imagen, cache_dataset.leer_etiquetas(etiquetas[i])
+
+    for a in range(0, len(orden), tamano_lote):
+        indices = orden[a:a + tamano_lote]
+        muestras = list(pool.map(cargar, indices))
+        yield np.stack([m[0] for m in muestras]), [m[1] for m in muestras], indices
+
+
+def medir(lotes, paso_s):
+    """
+    Runs one epoch of batches with a simulated step.
+
+    Returns:
+        dict: epoch seconds, stall seconds (waiting for batches) and batches.
+    """
+    inicio = time.perf_counter()
+    espera = 0.0
+    n = 0
+    t = time.perf_counter()
+    for _ in lotes:
+        espera += time.perf_counter() - t
+        n += 1
+        if paso_s:
+            time.sleep(paso_s)
+        t = time.perf_counter()
+    return {"segundos_epoca": time.perf_counter() - inicio, "segundos_espera": espera, "lotes": n}
+
+# =============================================================================
+# 3) MAIN
+# =============================================================================
+
+def main():
+    inicio = time.perf_counter()
+    reconstruidos = cache_dataset.preparar(directorio_dataset, directorio_cache, IMGSZ, hilos=HILOS)
+    segundos_preparacion = time.perf_counter() - inicio
+    print(f"Cache en {directorio_cache} ({segundos_preparacion:.1f} s, reconstruidos: "
+          f"{[s for s, r in reconstruidos.items() if r] or 'ninguno'})")
+
+    imagenes, etiquetas = cache_dataset.listar(os.path.join(directorio_dataset, SPLIT))
+    cache = cache_dataset.cargar(directorio_cache, SPLIT)
+
+    resultados = []
+    with ThreadPoolExecutor(max_workers=HILOS) as pool:
+        for paso_s in PASOS_S:
+            for epoca in range(EPOCAS):
+                semilla = SEMILLA + epoca
+                jpg = medir(lotes_jpg(imagenes, etiquetas, TAMANO_LOTE, semilla, pool), paso_s)
+                memmap = medir(cache_dataset.lotes(cache, TAMANO_LOTE, semilla=semilla), paso_s)
+                resultados.append({"paso_s": paso_s, "epoca": epoca, "jpg": jpg, "cache": memmap})
+                print(
+                    f"paso={paso_s:.2f} s epoca {epoca}: "
+                    f"JPG {jpg['segundos_epoca']:6.2f} s (espera {jpg['segundos_espera']:6.2f} s) | "
+                    f"cache {memmap['segundos_epoca']:6.2f} s (espera {memmap['segundos_espera']:6.2f} s)"
+                )
+
+    os.makedirs(os.path.dirname(ruta_reporte), exist_ok=True)
+    with open(ruta_reporte, "w", encoding="utf-8") as f:
+        json.dump({
+            "split": SPLIT,
+            "imagenes": len(imagenes),
+            "imgsz": IMGSZ,
+            "tamano_lote": TAMANO_LOTE,
+            "segundos_preparacion": segundos_preparacion,
+            "resultados": resultados,
+        }, f, indent=4)
+    print(f"Reporte guardado en: {ruta_reporte}")
+
+if __name__ == "__main__":
+    main()